@@ -0,0 +1,467 @@
+"""
+Account registry and multi-account publishing.
+
+The registry maps each brand account to its token, its queue sheets and its languages.
+It is a JSON file (ACCOUNTS_PATH, default accounts.json next to this module):
+
+    {"accounts": [
+        {"name": "brand-en", "token_env": "BRAND_EN_TOKEN", "languages": ["English"],
+         "posts_per_hour": 6},
+        {"name": "brand-es", "token_env": "BRAND_ES_TOKEN", "sheets": ["스페인어"]}
+    ]}
+
+Tokens are never stored in the file, only the name of the environment variable that holds
+them. Without a registry file there is one "default" account on LONG_LIVED_ACCESS_TOKEN
+and the '쓰레드' sheet, which is what the single-account tools always used.
+
+MultiAccountPublisher serves every account from one process. Accounts are dispatched
+round-robin to a shared thread pool running _post_text_to_threads, each account has its
+own posting budget (posts/hour) and at most one post in flight, so posts of one account
+keep their order while different accounts publish in parallel.
+
+    python accounts.py list
+    python accounts.py publish --accounts brand-en,brand-es --workers 8
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+import google_sheets
+from rate_limit import TokenBucket
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REGISTRY_PATH = os.getenv("ACCOUNTS_PATH", os.path.join(BASE_DIR, "accounts.json"))
+
+DEFAULT_TOKEN_ENV = "LONG_LIVED_ACCESS_TOKEN"
+DEFAULT_POSTS_PER_HOUR = 10
+
+# Queue sheet of each translation language (see the translation tab of the app).
+LANGUAGE_SHEETS = {
+    "Korean": "쓰레드",
+    "English": "영어",
+    "Spanish": "스페인어",
+}
+
+Logger = Optional[Callable[[str], None]]
+
+
+class Account:
+    """One Threads account: where its token lives, which queues it posts and how fast."""
+
+    def __init__(
+        self,
+        name: str,
+        token_env: str = DEFAULT_TOKEN_ENV,
+        sheets: Optional[List[str]] = None,
+        languages: Optional[List[str]] = None,
+        posts_per_hour: float = DEFAULT_POSTS_PER_HOUR,
+        burst: int = 1,
+    ):
+        if not name:
+            raise ValueError("계정 이름(name)이 필요합니다.")
+        if posts_per_hour <= 0:
+            raise ValueError("posts_per_hour는 0보다 커야 합니다.")
+        languages = list(languages or [])
+        unknown = [language for language in languages if language not in LANGUAGE_SHEETS]
+        if unknown:
+            raise ValueError(f"알 수 없는 언어: {unknown} (지원: {list(LANGUAGE_SHEETS)})")
+        self.name = name
+        self.token_env = token_env
+        self.languages = languages
+        # Explicit sheets win; otherwise the queues of the account's languages are used.
+        self.sheets = list(sheets or [LANGUAGE_SHEETS[language] for language in languages] or [google_sheets.SHEET_NAME])
+        self.posts_per_hour = posts_per_hour
+        self.burst = burst
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Account":
+        return cls(
+            name=data.get("name"),
+            token_env=data.get("token_env", DEFAULT_TOKEN_ENV),
+            sheets=data.get("sheets"),
+            languages=data.get("languages"),
+            posts_per_hour=data.get("posts_per_hour", DEFAULT_POSTS_PER_HOUR),
+            burst=data.get("burst", 1),
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "token_env": self.token_env,
+            "sheets": self.sheets,
+            "languages": self.languages,
+            "posts_per_hour": self.posts_per_hour,
+            "burst": self.burst,
+        }
+
+    def token(self) -> str:
+        token = os.getenv(self.token_env)
+        if not token:
+            raise ValueError(f"{self.token_env}이 환경 변수에 설정되지 않았습니다. (계정: {self.name})")
+        return token.strip().strip('"').strip("'")
+
+    def __repr__(self) -> str:
+        return f"Account({self.name!r}, token_env={self.token_env!r}, sheets={self.sheets!r})"
+
+
+class AccountRegistry:
+    """Accounts by name, loaded from and saved to a JSON file."""
+
+    def __init__(self, accounts: Iterable[Account] = (), path=None):
+        self.path = path
+        self._accounts: Dict[str, Account] = {}
+        for account in accounts:
+            self.add(account)
+
+    @classmethod
+    def load(cls, path=DEFAULT_REGISTRY_PATH) -> "AccountRegistry":
+        """Reads the registry file, or returns the single default account when it does not exist."""
+        if not os.path.exists(path):
+            return cls([Account("default")], path=path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([Account.from_dict(item) for item in data.get("accounts", [])], path=path)
+
+    def save(self, path=None) -> None:
+        path = path or self.path or DEFAULT_REGISTRY_PATH
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"accounts": [account.to_dict() for account in self]}, f, ensure_ascii=False, indent=2)
+        self.path = path
+
+    def add(self, account: Account) -> None:
+        if account.name in self._accounts:
+            raise ValueError(f"이미 등록된 계정입니다: {account.name}")
+        self._accounts[account.name] = account
+
+    def remove(self, name: str) -> None:
+        self._accounts.pop(name, None)
+
+    def get(self, name: str) -> Account:
+        try:
+            return self._accounts[name]
+        except KeyError:
+            raise KeyError(f"등록되지 않은 계정입니다: {name} (등록된 계정: {list(self._accounts)})") from None
+
+    def select(self, names: Optional[Iterable[str]] = None) -> List[Account]:
+        """The named accounts in the given order, or all of them."""
+        if not names:
+            return list(self)
+        return [self.get(name) for name in names]
+
+    def __iter__(self):
+        return iter(self._accounts.values())
+
+    def __len__(self) -> int:
+        return len(self._accounts)
+
+
+def load_registry(path=DEFAULT_REGISTRY_PATH) -> AccountRegistry:
+    return AccountRegistry.load(path)
+
+
+class _AccountState:
+    def __init__(self, account: Account):
+        self.account = account
+        # Capacity `burst` lets an idle account post that many times back to back.
+        self.budget = TokenBucket(account.posts_per_hour / 60.0, capacity=account.burst)
+        self.tasks = deque()
+        self.busy = False
+        self.sheet_counter = 0
+        self.stats = {"posted": 0, "failed": 0, "errors": 0}
+
+
+class MultiAccountPublisher:
+    """
+    Publishes for many accounts from one thread pool.
+
+    Work is queued per account. A dispatcher thread walks the accounts round-robin and
+    hands the next task of an account to the pool when the account has no post in flight
+    and its posting budget allows one, so a busy account cannot starve the others and
+    throughput grows with the number of accounts up to max_workers.
+
+        with MultiAccountPublisher(load_registry()) as publisher:
+            publisher.submit("brand-en", "Hello").result()
+            publisher.publish_queues()
+    """
+
+    def __init__(self, registry: AccountRegistry, max_workers: int = 8, logger: Logger = None,
+                 post: Optional[Callable] = None):
+        self.registry = registry
+        self.logger = logger
+        # Injected for tests and benchmarks; defaults to the synchronous single-post flow.
+        self._post = post
+        self._states: Dict[str, _AccountState] = {}
+        self._rotation = deque()
+        self._lock = threading.Condition()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="account-post")
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="account-dispatch", daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _log(self, account: Account, message: str) -> None:
+        line = f"[{account.name}] {message}"
+        if self.logger:
+            self.logger(line)
+        else:
+            print(line)
+
+    def _state(self, name: str) -> _AccountState:
+        """Caller holds the lock."""
+        state = self._states.get(name)
+        if state is None:
+            state = self._states[name] = _AccountState(self.registry.get(name))
+            self._rotation.append(name)
+        return state
+
+    def _enqueue(self, name: str, task: Callable[[], object], future: Future) -> Future:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MultiAccountPublisher가 이미 종료되었습니다.")
+            self._state(name).tasks.append((task, future))
+            self._lock.notify_all()
+        return future
+
+    # --- dispatching ---
+
+    def _next_ready(self):
+        """Returns (state, task, future) of the first ready account in rotation, or (None, wait). Caller holds the lock."""
+        wait = None
+        for _ in range(len(self._rotation)):
+            name = self._rotation[0]
+            self._rotation.rotate(-1)
+            state = self._states[name]
+            if state.busy or not state.tasks:
+                continue
+            delay = state.budget.reserve(1)
+            if delay > 0:
+                state.budget.give_back(1)
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            task, future = state.tasks.popleft()
+            state.busy = True
+            return state, task, future
+        return None, wait
+
+    def _dispatch_loop(self) -> None:
+        while True:
+            with self._lock:
+                while True:
+                    if self._closed and not any(s.tasks or s.busy for s in self._states.values()):
+                        return
+                    picked = self._next_ready()
+                    if picked[0] is not None:
+                        break
+                    self._lock.wait(timeout=picked[1])
+            state, task, future = picked
+            if not future.set_running_or_notify_cancel():
+                self._release(state)
+                continue
+            self._executor.submit(self._run_task, state, task, future)
+
+    def _release(self, state: _AccountState) -> None:
+        with self._lock:
+            state.busy = False
+            self._lock.notify_all()
+
+    def _run_task(self, state: _AccountState, task: Callable[[], object], future: Future) -> None:
+        try:
+            future.set_result(task())
+        except BaseException as e:
+            state.stats["errors"] += 1
+            future.set_exception(e)
+        finally:
+            self._release(state)
+
+    # --- posting ---
+
+    def _identity(self, account: Account):
+        """(token, Threads user id) of the account; me() is cached per token."""
+        from post_to_threads import me
+
+        token = account.token()
+        return token, me(token=token)["id"]
+
+    def _publish(self, account: Account, text: str) -> Optional[dict]:
+        """
+        Posts one text as the account. Returns the _post_text_to_threads result, or None on failure.
+        The permalink is looked up after publishing, so a failed lookup leaves it None instead
+        of reporting a live post as failed.
+        """
+        from post_to_threads import _post_text_to_threads, fill_permalinks
+
+        token, user_id = self._identity(account)
+        logger = lambda message: self._log(account, message)
+        post = self._post or _post_text_to_threads
+        result = post(user_id, text, token, logger=logger, fetch_permalink=False)
+        if result:
+            fill_permalinks([result], token=token, logger=logger)
+            result["account"] = account.name
+        return result
+
+    def submit(self, account_name: str, text: str) -> Future:
+        """Queues one post for an account; the future resolves to the post result (None on failure)."""
+        account = self.registry.get(account_name)
+        return self._enqueue(account_name, lambda: self._publish(account, text), Future())
+
+    def _pop_next(self, state: _AccountState):
+        """Round-robin over the account's sheets, skipping empty ones. Returns (sheet, text, row_index)."""
+        # One batched read of all the account's sheets; the pick and the pop both use it.
+        snapshot = google_sheets.queue_snapshot(state.account.sheets)
+        sheet, skipped = snapshot.next_sheet(state.sheet_counter)
+        if sheet is None:
+            return None, None, None
+        state.sheet_counter += skipped + 1
+        text, row_index = google_sheets.pop_from_queue(sheet_name=sheet, snapshot=snapshot)
+        return sheet, text, row_index
+
+    def _schedule_step(self, name: str, done: Future, deadline: Optional[float]) -> None:
+        """Queues the next pop-and-post of an account; an unexpected error ends its run."""
+        def _forward_error(future: Future) -> None:
+            if not done.done() and not future.cancelled() and future.exception() is not None:
+                done.set_exception(future.exception())
+
+        future = Future()
+        future.add_done_callback(_forward_error)
+        self._enqueue(name, lambda: self._queue_step(name, done, deadline), future)
+
+    def _queue_step(self, name: str, done: Future, deadline: Optional[float]) -> None:
+        state = self._states[name]
+        account = state.account
+        try:
+            self._identity(account)
+        except Exception as e:
+            # Configuration errors (missing token, rejected token) stop this account only,
+            # before anything is popped from its sheets.
+            self._log(account, f"❌ 계정 오류로 중단합니다: {e}")
+            state.stats["errors"] += 1
+            done.set_result(dict(state.stats))
+            return
+
+        sheet, text, row_index = self._pop_next(state)
+        if not text:
+            self._log(account, "모든 시트의 콘텐츠가 소진되었습니다.")
+            done.set_result(dict(state.stats))
+            return
+
+        self._log(account, f"[{sheet}] 게시 중: {text[:30]}...")
+        result = self._publish(account, text)
+        if result:
+            google_sheets.ack_item(sheet, row_index)
+            state.stats["posted"] += 1
+            self._log(account, f"✅ [{sheet}] 게시 성공! Link: {result.get('permalink')}")
+        else:
+            if row_index:
+                google_sheets.mark_as_failed(sheet, row_index)
+            state.stats["failed"] += 1
+            self._log(account, f"❌ [{sheet}] 게시 실패. (시트에 실패로 표시합니다)")
+
+        if deadline is not None and time.time() >= deadline:
+            done.set_result(dict(state.stats))
+            return
+        self._schedule_step(name, done, deadline)
+
+    def publish_queues(self, names: Optional[Iterable[str]] = None, max_seconds: Optional[float] = None) -> Dict[str, dict]:
+        """
+        Drains the queue sheets of the given accounts (default: all), each at its own budget.
+        Blocks until every account's sheets are empty (or max_seconds passed) and returns
+        {account: {"posted", "failed", "errors"}}.
+        """
+        deadline = time.time() + max_seconds if max_seconds else None
+        done = {}
+        for account in self.registry.select(names):
+            done[account.name] = Future()
+            self._schedule_step(account.name, done[account.name], deadline)
+
+        summary = {}
+        for name, future in done.items():
+            try:
+                summary[name] = future.result()
+            except Exception as e:
+                self._log(self.registry.get(name), f"❌ 오류 발생: {e}")
+                summary[name] = dict(self._states[name].stats)
+        return summary
+
+    def close(self, wait: bool = True) -> None:
+        """Stops accepting work; with wait=True, finishes the queued posts first."""
+        with self._lock:
+            self._closed = True
+            if not wait:
+                for state in self._states.values():
+                    while state.tasks:
+                        state.tasks.popleft()[1].cancel()
+            self._lock.notify_all()
+        if wait:
+            self._dispatcher.join()
+        self._executor.shutdown(wait=wait)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Threads 멀티 계정 관리 및 게시")
+    parser.add_argument("--registry", default=DEFAULT_REGISTRY_PATH, help="계정 레지스트리 JSON 경로")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("list", help="계정 목록")
+
+    add_parser = sub.add_parser("add", help="계정 등록")
+    add_parser.add_argument("name", help="계정 이름")
+    add_parser.add_argument("--token-env", required=True, help="토큰이 들어 있는 환경 변수 이름")
+    add_parser.add_argument("--sheets", help="쉼표로 구분한 시트 이름 (미입력 시 언어별 시트)")
+    add_parser.add_argument("--languages", help=f"쉼표로 구분한 언어 ({', '.join(LANGUAGE_SHEETS)})")
+    add_parser.add_argument("--posts-per-hour", type=float, default=DEFAULT_POSTS_PER_HOUR, help="계정별 시간당 최대 게시 수")
+
+    remove_parser = sub.add_parser("remove", help="계정 삭제")
+    remove_parser.add_argument("name")
+
+    publish_parser = sub.add_parser("publish", help="계정별 대기열을 모두 게시")
+    publish_parser.add_argument("--accounts", help="쉼표로 구분한 계정 이름 (미입력 시 전체)")
+    publish_parser.add_argument("--workers", type=int, default=8, help="동시에 게시하는 최대 계정 수")
+    publish_parser.add_argument("--max-minutes", type=float, help="최대 실행 시간(분)")
+
+    args = parser.parse_args(argv)
+    _split = lambda value: [item.strip() for item in value.split(",") if item.strip()] if value else None
+
+    if args.command == "publish":
+        registry = load_registry(args.registry)
+        with MultiAccountPublisher(registry, max_workers=args.workers) as publisher:
+            summary = publisher.publish_queues(
+                _split(args.accounts), max_seconds=args.max_minutes * 60 if args.max_minutes else None
+            )
+        for name, stats in summary.items():
+            print(f"{name}: 성공 {stats['posted']} · 실패 {stats['failed']} · 오류 {stats['errors']}")
+        return
+
+    if args.command == "list":
+        for account in load_registry(args.registry):
+            print(f"{account.name} 토큰={account.token_env} 시트={','.join(account.sheets)} "
+                  f"언어={','.join(account.languages) or '-'} 시간당={account.posts_per_hour:g}")
+        return
+
+    # Without a registry file, add/remove start from an empty registry, not the default account.
+    registry = load_registry(args.registry) if os.path.exists(args.registry) else AccountRegistry(path=args.registry)
+    if args.command == "add":
+        registry.add(Account(
+            args.name, token_env=args.token_env, sheets=_split(args.sheets),
+            languages=_split(args.languages), posts_per_hour=args.posts_per_hour,
+        ))
+        registry.save()
+        print(f"✅ 계정 {args.name} 등록 완료")
+    elif args.command == "remove":
+        registry.remove(args.name)
+        registry.save()
+        print(f"✅ 계정 {args.name} 삭제 완료")
+
+
+if __name__ == "__main__":
+    main()
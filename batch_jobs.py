@@ -0,0 +1,523 @@
+"""
+Bulk offline generation through the provider batch APIs.
+
+Restocking a queue does not need interactive latency: instead of N sequential chat turns,
+ContentGenerator.submit_bulk() sends N independent requests as one batch (OpenAI Batch API
+or Gemini batch mode, both billed at batch pricing and outside the interactive rate
+limits). Batches and their items are tracked in a SQLite job store, so submitting,
+polling and collecting can happen in different processes (e.g. submit at night from
+cron, collect in the morning):
+
+    python batch_jobs.py submit --prompt-file brief.txt --count 100 --model gpt-4o
+    python batch_jobs.py list
+    python batch_jobs.py collect --wait          # every unfinished batch
+    python batch_jobs.py cancel 3
+
+Finished results are streamed into a SheetWriter as they are read; each item is marked
+written by a flush listener once the append_rows holding its row has succeeded, so an
+interrupted collection resumes where it stopped without writing anything twice, even when
+the writer's context manager flushes the remaining rows after an error. Near-duplicates
+are skipped by the writer.
+
+BatchProvider is an abstract base class (submit/status/results/cancel); the OpenAI and
+Gemini providers implement it and provider_for() picks one for a model. collect() and
+refresh_status() only call those methods, so tests and benchmarks can pass a duck-typed
+fake instead.
+"""
+
+import abc
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+import google_sheets
+from metrics import record_tokens, timer
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.getenv("BATCH_DB_PATH", os.path.join(BASE_DIR, "batch_jobs.sqlite3"))
+
+# Normalized batch states; "collected" is local (all results written to the sheet).
+BATCH_RUNNING = "running"
+BATCH_COMPLETED = "completed"
+BATCH_FAILED = "failed"
+BATCH_EXPIRED = "expired"
+BATCH_CANCELLED = "cancelled"
+BATCH_COLLECTED = "collected"
+# States after which the provider will not produce more results.
+FINAL_STATES = (BATCH_COMPLETED, BATCH_FAILED, BATCH_EXPIRED, BATCH_CANCELLED)
+
+ITEM_PENDING = "pending"
+ITEM_WRITTEN = "written"
+ITEM_SKIPPED = "skipped"
+ITEM_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    provider TEXT NOT NULL,
+    model TEXT NOT NULL,
+    remote_id TEXT,
+    sheet TEXT NOT NULL,
+    status TEXT NOT NULL,
+    requested INTEGER NOT NULL,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_items (
+    batch_id INTEGER NOT NULL,
+    custom_id TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    status TEXT NOT NULL,
+    text TEXT,
+    error TEXT,
+    PRIMARY KEY (batch_id, custom_id)
+);
+"""
+
+
+class BatchResult(NamedTuple):
+    custom_id: str
+    text: Optional[str]
+    error: Optional[str] = None
+    tokens: Optional[int] = None
+
+
+class BatchProvider(abc.ABC):
+    """
+    Interface of a batch backend. Requests are provider-neutral dicts:
+        {"custom_id": str, "system": str | None, "messages": [{"role", "content"}, ...],
+         "max_tokens": int, "temperature": float}
+    """
+
+    name = "batch"
+
+    @abc.abstractmethod
+    def submit(self, requests: List[dict], display_name: str) -> str:
+        """Creates the batch and returns the provider's batch ID."""
+
+    @abc.abstractmethod
+    def status(self, remote_id: str) -> str:
+        """One of BATCH_RUNNING or FINAL_STATES."""
+
+    @abc.abstractmethod
+    def results(self, remote_id: str, custom_ids: List[str]) -> Iterator[BatchResult]:
+        """Results available so far for a batch in a final state, in any order."""
+
+    @abc.abstractmethod
+    def cancel(self, remote_id: str) -> None:
+        """Asks the provider to stop the batch; finished results stay available."""
+
+
+class OpenAIBatchProvider(BatchProvider):
+    """Batch API: a JSONL file of /v1/chat/completions requests, 24h completion window."""
+
+    name = "openai"
+    _STATES = {
+        "validating": BATCH_RUNNING, "in_progress": BATCH_RUNNING, "finalizing": BATCH_RUNNING,
+        "cancelling": BATCH_RUNNING, "completed": BATCH_COMPLETED, "failed": BATCH_FAILED,
+        "expired": BATCH_EXPIRED, "cancelled": BATCH_CANCELLED,
+    }
+
+    def __init__(self, client, model: str = "gpt-4o", completion_window: str = "24h"):
+        self.client = client
+        self.model = model
+        self.completion_window = completion_window
+
+    def submit(self, requests: List[dict], display_name: str) -> str:
+        lines = []
+        for request in requests:
+            system = [{"role": "system", "content": request["system"]}] if request.get("system") else []
+            lines.append(json.dumps({
+                "custom_id": request["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": self.model,
+                    "messages": system + request["messages"],
+                    "max_tokens": request.get("max_tokens", 500),
+                    "temperature": request.get("temperature", 0.7),
+                },
+            }, ensure_ascii=False))
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        uploaded = self.client.files.create(file=(f"{display_name}.jsonl", data), purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window=self.completion_window,
+            metadata={"display_name": display_name},
+        )
+        return batch.id
+
+    def status(self, remote_id: str) -> str:
+        return self._STATES.get(self.client.batches.retrieve(remote_id).status, BATCH_RUNNING)
+
+    def results(self, remote_id: str, custom_ids: List[str]) -> Iterator[BatchResult]:
+        batch = self.client.batches.retrieve(remote_id)
+        # Expired and cancelled batches still have an output file with what finished in time.
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in self.client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                response = record.get("response") or {}
+                body = response.get("body") or {}
+                if response.get("status_code") == 200 and body.get("choices"):
+                    usage = body.get("usage") or {}
+                    yield BatchResult(record["custom_id"], body["choices"][0]["message"]["content"],
+                                      tokens=usage.get("total_tokens"))
+                else:
+                    error = record.get("error") or body.get("error") or response.get("status_code")
+                    yield BatchResult(record["custom_id"], None, str(error))
+
+    def cancel(self, remote_id: str) -> None:
+        self.client.batches.cancel(remote_id)
+
+
+class GeminiBatchProvider(BatchProvider):
+    """Gemini batch mode with inline requests; responses come back in request order."""
+
+    name = "gemini"
+    _STATES = {
+        "JOB_STATE_SUCCEEDED": BATCH_COMPLETED, "JOB_STATE_FAILED": BATCH_FAILED,
+        "JOB_STATE_CANCELLED": BATCH_CANCELLED, "JOB_STATE_EXPIRED": BATCH_EXPIRED,
+    }
+
+    def __init__(self, client, model: str = "gemini-2.5-flash"):
+        self.client = client
+        self.model = model
+
+    def submit(self, requests: List[dict], display_name: str) -> str:
+        inline = []
+        for request in requests:
+            config = {"max_output_tokens": request.get("max_tokens", 1000), "temperature": request.get("temperature", 0.7)}
+            if request.get("system"):
+                config["system_instruction"] = request["system"]
+            contents = [
+                {"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+                for m in request["messages"]
+            ]
+            inline.append({"contents": contents, "config": config})
+        job = self.client.batches.create(model=self.model, src=inline, config={"display_name": display_name})
+        return job.name
+
+    def status(self, remote_id: str) -> str:
+        state = self.client.batches.get(name=remote_id).state
+        return self._STATES.get(getattr(state, "name", str(state)), BATCH_RUNNING)
+
+    def results(self, remote_id: str, custom_ids: List[str]) -> Iterator[BatchResult]:
+        job = self.client.batches.get(name=remote_id)
+        responses = getattr(getattr(job, "dest", None), "inlined_responses", None) or []
+        for custom_id, item in zip(custom_ids, responses):
+            if getattr(item, "error", None):
+                yield BatchResult(custom_id, None, str(item.error))
+                continue
+            usage = getattr(item.response, "usage_metadata", None)
+            yield BatchResult(custom_id, item.response.text, tokens=getattr(usage, "total_token_count", None))
+
+    def cancel(self, remote_id: str) -> None:
+        self.client.batches.cancel(name=remote_id)
+
+
+def provider_for(model: str, client) -> BatchProvider:
+    """SDK batch provider for a model, on an already built client (see create_llm_client)."""
+    if model.startswith("gemini"):
+        return GeminiBatchProvider(client, model)
+    if model.startswith("gpt"):
+        return OpenAIBatchProvider(client, model)
+    raise ValueError(f"배치 생성을 지원하지 않는 모델입니다: {model}")
+
+
+class BatchJobStore:
+    """SQLite store of submitted batches and their items."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def add_batch(self, provider: str, model: str, sheet: str, requests: List[dict]) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO batches (provider, model, sheet, status, requested, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (provider, model, sheet, BATCH_RUNNING, len(requests), now, now),
+            )
+            batch_id = cursor.lastrowid
+            self._conn.executemany(
+                "INSERT INTO batch_items (batch_id, custom_id, prompt, status) VALUES (?, ?, ?, ?)",
+                [(batch_id, r["custom_id"], r["messages"][-1]["content"], ITEM_PENDING) for r in requests],
+            )
+            return batch_id
+
+    def update_batch(self, batch_id: int, **fields) -> None:
+        columns = {**fields, "updated_at": time.time()}
+        assignments = ", ".join(f"{key} = ?" for key in columns)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE batches SET {assignments} WHERE id = ?", (*columns.values(), batch_id))
+
+    def get_batch(self, batch_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM batches WHERE id = ?", (batch_id,)).fetchone()
+        return dict(row) if row else None
+
+    def list_batches(self, unfinished: bool = False) -> List[dict]:
+        query = "SELECT * FROM batches"
+        if unfinished:
+            query += f" WHERE status NOT IN ('{BATCH_COLLECTED}', '{BATCH_FAILED}')"
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id").fetchall()
+        return [dict(row) for row in rows]
+
+    def custom_ids(self, batch_id: int) -> List[str]:
+        """Item IDs in submission order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT custom_id FROM batch_items WHERE batch_id = ? ORDER BY rowid", (batch_id,)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def pending_ids(self, batch_id: int) -> set:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT custom_id FROM batch_items WHERE batch_id = ? AND status = ?", (batch_id, ITEM_PENDING)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def mark_items(self, batch_id: int, items: List[tuple]) -> None:
+        """items: (custom_id, status, text, error) tuples."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "UPDATE batch_items SET status = ?, text = ?, error = ? WHERE batch_id = ? AND custom_id = ?",
+                [(status, text, error, batch_id, custom_id) for custom_id, status, text, error in items],
+            )
+
+    def item_counts(self, batch_id: int) -> dict:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM batch_items WHERE batch_id = ? GROUP BY status", (batch_id,)
+            ).fetchall()
+        return {row[0]: row[1] for row in rows}
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def submit(store: BatchJobStore, provider: BatchProvider, model: str, requests: List[dict],
+           sheet_name: str = google_sheets.SHEET_NAME) -> int:
+    """Records the requests, submits them as one batch and returns the local batch ID."""
+    if not requests:
+        raise ValueError("배치에 보낼 요청이 없습니다.")
+    batch_id = store.add_batch(provider.name, model, sheet_name, requests)
+    try:
+        with timer("llm.batch_submit"):
+            remote_id = provider.submit(requests, display_name=f"threads-bulk-{batch_id}")
+    except Exception as e:
+        store.update_batch(batch_id, status=BATCH_FAILED, error=str(e))
+        raise
+    store.update_batch(batch_id, remote_id=remote_id)
+    return batch_id
+
+
+def refresh_status(store: BatchJobStore, provider: BatchProvider, batch_id: int) -> str:
+    """Asks the provider for the batch state and stores it; collected batches are left alone."""
+    batch = store.get_batch(batch_id)
+    if batch is None:
+        raise ValueError(f"배치 #{batch_id}를 찾을 수 없습니다.")
+    if batch["status"] in (BATCH_COLLECTED,) + FINAL_STATES:
+        return batch["status"]
+    with timer("llm.batch_status"):
+        status = provider.status(batch["remote_id"])
+    if status != batch["status"]:
+        store.update_batch(batch_id, status=status)
+    return status
+
+
+def wait_for_batch(
+    store: BatchJobStore,
+    provider: BatchProvider,
+    batch_id: int,
+    poll_interval: float = 30.0,
+    max_interval: float = 300.0,
+    timeout: Optional[float] = None,
+    logger: Optional[Callable[[str], None]] = None,
+) -> str:
+    """
+    Polls until the batch reaches a final state, starting at poll_interval and backing
+    off by 1.5x up to max_interval. Returns the state, or BATCH_RUNNING on timeout.
+    """
+    log = logger or print
+    deadline = None if timeout is None else time.monotonic() + timeout
+    interval = poll_interval
+    while True:
+        status = refresh_status(store, provider, batch_id)
+        if status != BATCH_RUNNING:
+            return status
+        if deadline is not None and time.monotonic() + interval > deadline:
+            return status
+        log(f"⏳ 배치 #{batch_id} 처리 중... {interval:.0f}초 후 다시 확인합니다.")
+        time.sleep(interval)
+        interval = min(max_interval, interval * 1.5)
+
+
+def collect(
+    store: BatchJobStore,
+    provider: BatchProvider,
+    batch_id: int,
+    writer: google_sheets.SheetWriter,
+    clean: Callable[[str], str] = str.strip,
+    logger: Optional[Callable[[str], None]] = None,
+) -> dict:
+    """
+    Streams the results of a finished batch into writer (the batch's sheet). An item is
+    marked written when the flush that wrote its row succeeds, whichever flush that is
+    (including one by the writer's context manager after collect has raised); skipped and
+    failed items are marked as they are read. Items without a result are marked failed
+    once the provider has finished. Returns the item counts by status.
+    """
+    log = logger or print
+    batch = store.get_batch(batch_id)
+    status = refresh_status(store, provider, batch_id)
+    if status == BATCH_COLLECTED:
+        return store.item_counts(batch_id)
+    if status == BATCH_RUNNING:
+        raise RuntimeError(f"배치 #{batch_id}가 아직 처리 중입니다.")
+
+    pending = store.pending_ids(batch_id)
+    awaiting = {}  # text -> custom IDs appended to the writer but not flushed yet
+    decided = []   # skipped / failed items
+
+    def _on_flush(sheet_name, rows):
+        if sheet_name != batch["sheet"]:
+            return
+        written = []
+        for (text,) in rows:
+            custom_ids = awaiting.get(text)
+            if custom_ids:
+                written.append((custom_ids.pop(0), ITEM_WRITTEN, text, None))
+                if not custom_ids:
+                    del awaiting[text]
+        if written:
+            store.mark_items(batch_id, written)
+
+    writer.flush_listeners.append(_on_flush)
+    try:
+        if status != BATCH_FAILED:
+            with timer("llm.batch_results"):
+                for result in provider.results(batch["remote_id"], store.custom_ids(batch_id)):
+                    if result.custom_id not in pending:
+                        continue
+                    pending.discard(result.custom_id)
+                    record_tokens(f"{provider.name}.batch", result.tokens)
+                    if result.text is None:
+                        decided.append((result.custom_id, ITEM_FAILED, None, result.error))
+                        continue
+                    text = clean(result.text.strip())
+                    # Registered first: append() may flush this very row.
+                    awaiting.setdefault(text, []).append(result.custom_id)
+                    # The per-item source lets a resumed collect write items whose earlier
+                    # flush failed after they had been added to the dedupe index.
+                    if not writer.append(text, sheet_name=batch["sheet"], source=f"batch:{batch_id}:{result.custom_id}"):
+                        awaiting[text].remove(result.custom_id)
+                        if not awaiting[text]:
+                            del awaiting[text]
+                        decided.append((result.custom_id, ITEM_SKIPPED, text, None))
+        writer.flush()
+    finally:
+        store.mark_items(batch_id, decided)
+
+    # The provider is done with the batch: whatever is still pending will never arrive.
+    store.mark_items(batch_id, [(custom_id, ITEM_FAILED, None, f"no result ({status})") for custom_id in pending])
+    store.update_batch(batch_id, status=BATCH_COLLECTED if status != BATCH_FAILED else BATCH_FAILED)
+    counts = store.item_counts(batch_id)
+    log(f"✅ 배치 #{batch_id} 수집 완료: 저장 {counts.get(ITEM_WRITTEN, 0)}개, "
+        f"중복 {counts.get(ITEM_SKIPPED, 0)}개, 실패 {counts.get(ITEM_FAILED, 0)}개")
+    return counts
+
+
+def _generator_for(model: str):
+    # Stateless helper generator: only its client and clean-up are used.
+    from post_to_threads import ContentGenerator
+    return ContentGenerator(model=model, use_cache=False, use_dedupe=False, use_prompt_cache=False)
+
+
+def main(argv=None) -> None:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=DEFAULT_DB_PATH, help="배치 작업 저장소 SQLite 경로")
+    parser = argparse.ArgumentParser(description="배치 API로 콘텐츠 대량 생성")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    submit_parser = sub.add_parser("submit", parents=[common], help="배치 제출")
+    prompt_group = submit_parser.add_mutually_exclusive_group(required=True)
+    prompt_group.add_argument("--prompt", help="생성 프롬프트")
+    prompt_group.add_argument("--prompt-file", help="생성 프롬프트가 담긴 파일")
+    submit_parser.add_argument("--count", type=int, default=100, help="생성할 게시글 수")
+    submit_parser.add_argument("--model", default="gpt-4o", choices=["gpt-4o", "gemini-2.5-flash"])
+    submit_parser.add_argument("--sheet", default=google_sheets.SHEET_NAME, help="결과를 저장할 시트")
+    submit_parser.add_argument("--wait", action="store_true", help="완료될 때까지 기다렸다가 바로 수집")
+
+    collect_parser = sub.add_parser("collect", parents=[common], help="완료된 배치 결과를 시트에 저장")
+    collect_parser.add_argument("batch_ids", type=int, nargs="*", help="배치 번호 (생략 시 미완료 배치 전체)")
+    collect_parser.add_argument("--wait", action="store_true", help="처리 중인 배치는 완료될 때까지 대기")
+    collect_parser.add_argument("--poll", type=float, default=30.0, help="상태 확인 주기(초)")
+
+    sub.add_parser("list", parents=[common], help="배치 목록")
+    sub.add_parser("cancel", parents=[common]).add_argument("batch_id", type=int)
+
+    args = parser.parse_args(argv)
+    store = BatchJobStore(args.db)
+    try:
+        if args.command == "submit":
+            prompt = args.prompt
+            if args.prompt_file:
+                with open(args.prompt_file, encoding="utf-8") as f:
+                    prompt = f.read()
+            generator = _generator_for(args.model)
+            batch_id = generator.submit_bulk(prompt, args.count, sheet_name=args.sheet, store=store)
+            print(f"✅ 배치 #{batch_id} 제출 완료 ({args.count}개, {args.model})")
+            if args.wait:
+                generator.collect_bulk(batch_id, store=store, wait=True)
+        elif args.command == "collect":
+            batch_ids = args.batch_ids or [b["id"] for b in store.list_batches(unfinished=True)]
+            for batch_id in batch_ids:
+                batch = store.get_batch(batch_id)
+                if batch is None:
+                    print(f"❌ 배치 #{batch_id}를 찾을 수 없습니다.")
+                    continue
+                generator = _generator_for(batch["model"])
+                try:
+                    generator.collect_bulk(batch_id, store=store, wait=args.wait, poll_interval=args.poll)
+                except RuntimeError as e:
+                    print(f"⏳ {e}")
+        elif args.command == "list":
+            for batch in store.list_batches():
+                counts = store.item_counts(batch["id"])
+                created = time.strftime("%Y-%m-%d %H:%M", time.localtime(batch["created_at"]))
+                print(f"#{batch['id']} {batch['model']} [{batch['status']}] 시트={batch['sheet']} "
+                      f"요청={batch['requested']} 저장={counts.get(ITEM_WRITTEN, 0)} "
+                      f"중복={counts.get(ITEM_SKIPPED, 0)} 실패={counts.get(ITEM_FAILED, 0)} 제출={created}"
+                      + (f" ⚠️ {batch['error']}" if batch["error"] else ""))
+        else:
+            batch = store.get_batch(args.batch_id)
+            if batch is None or not batch["remote_id"]:
+                print(f"❌ 배치 #{args.batch_id}를 찾을 수 없습니다.")
+                return
+            generator = _generator_for(batch["model"])
+            provider_for(batch["model"], generator.client).cancel(batch["remote_id"])
+            print(f"✅ 배치 #{args.batch_id} 취소 요청 완료 (끝난 항목은 collect로 저장할 수 있습니다)")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
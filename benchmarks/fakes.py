@@ -0,0 +1,680 @@
+"""
+Local stand-ins for the Threads Graph API, Google Sheets and the LLM SDKs.
+
+All of them share a FaultInjector, so every benchmark can add latency, random
+errors and 429 throttling to any backend:
+
+- FakeThreadsServer is a real HTTP server (ThreadingHTTPServer) that follows the
+  container lifecycle: create -> IN_PROGRESS for ready_after seconds -> FINISHED ->
+  publish -> permalink, including multi-ID (?ids=) lookups and Retry-After on 429.
+- FakeSpreadsheet / FakeWorksheet implement the gspread calls google_sheets uses
+  (col_values, get, batch_get, update, update_cell, batch_update, append_rows, format)
+  and raise gspread APIError on injected failures. Latency can grow with the number of
+  cells transferred, so full-column reads get slower as the queue grows.
+- FakeLLMClient answers both the OpenAI (chat.completions.create, incl. stream=True) and
+  the google-genai (models.generate_content[_stream]) call shapes, including the JSON
+  batch translation prompt.
+- FakeBatchProvider stands in for the OpenAI/Gemini batch APIs behind batch_jobs: a
+  batch finishes complete_after seconds after submission and is answered by a
+  FakeLLMClient.
+"""
+
+import itertools
+import json
+import random
+import re
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class FaultInjector:
+    """
+    Latency and failure model for one fake backend.
+
+    latency: base seconds per call, jitter: extra uniform seconds,
+    slow_rate / slow_latency: probability of a call taking slow_latency extra seconds (tail),
+    per_item: seconds per transferred item (cells for Sheets, characters for LLM output),
+    error_rate / throttle_rate: probability of a 5xx / 429 per call,
+    retry_after: Retry-After seconds sent with 429 responses (None to omit the header).
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, per_item: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0,
+                 retry_after: Optional[float] = 1.0, seed: Optional[int] = None,
+                 slow_rate: float = 0.0, slow_latency: float = 0.0):
+        self.latency = latency
+        self.jitter = jitter
+        self.per_item = per_item
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.calls = 0
+        self.errors = 0
+        self.throttles = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self, items: int = 0) -> None:
+        wait = self.latency + self.per_item * items
+        if self.jitter or self.slow_rate:
+            with self._lock:
+                wait += self._random.uniform(0, self.jitter)
+                if self.slow_rate and self._random.random() < self.slow_rate:
+                    wait += self.slow_latency
+        if wait > 0:
+            time.sleep(wait)
+
+    def outcome(self) -> Optional[int]:
+        """HTTP status to fail with (429 or 503), or None for success."""
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            if roll < self.throttle_rate:
+                self.throttles += 1
+                return 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.errors += 1
+                return 503
+        return None
+
+
+# --- Threads Graph API ---
+
+class FakeThreadsServer:
+    """
+    In-process Graph API server on 127.0.0.1. Use as a context manager:
+
+        with FakeThreadsServer(FaultInjector(latency=0.05), ready_after=0.5) as server:
+            client = ThreadsClient(base_url=server.url)
+    """
+
+    def __init__(self, faults: Optional[FaultInjector] = None, ready_after: float = 0.0,
+                 container_error_rate: float = 0.0, port: int = 0):
+        self.faults = faults or FaultInjector()
+        self.ready_after = ready_after
+        self.container_error_rate = container_error_rate
+        self.containers = {}
+        self.media = {}
+        self.published = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeThreadsServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-threads", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _status_of(self, container_id: str) -> dict:
+        container = self.containers.get(container_id)
+        if container is None:
+            return {"error": {"message": "Unknown container", "code": 100}}
+        if container["failed"]:
+            return {"id": container_id, "status": "ERROR", "error_message": "Injected container error"}
+        ready = time.monotonic() - container["created_at"] >= self.ready_after
+        return {"id": container_id, "status": "FINISHED" if ready else "IN_PROGRESS"}
+
+    def _media_of(self, media_id: str) -> dict:
+        return {"id": media_id, "permalink": f"https://www.threads.net/@bench/post/{media_id}",
+                "timestamp": self.media.get(media_id, {}).get("timestamp"), "shortcode": media_id}
+
+    def handle(self, method: str, path: str, params: dict, body: dict):
+        """Returns (status, payload) for one request."""
+        parts = [p for p in path.split("/") if p]
+        if method == "GET" and parts == ["me"]:
+            return 200, {"id": "1000", "username": "bench"}
+
+        if method == "POST" and len(parts) == 2 and parts[1] == "threads":
+            with self._lock:
+                container_id = f"c{next(self._ids)}"
+                self.containers[container_id] = {
+                    "text": body.get("text", ""),
+                    "created_at": time.monotonic(),
+                    "failed": random.random() < self.container_error_rate,
+                }
+            return 200, {"id": container_id}
+
+        if method == "POST" and len(parts) == 2 and parts[1] == "threads_publish":
+            container_id = body.get("creation_id")
+            status = self._status_of(container_id)
+            if status.get("status") != "FINISHED":
+                return 400, {"error": {"message": "Container not ready", "code": 24}}
+            with self._lock:
+                media_id = f"m{next(self._ids)}"
+                self.media[media_id] = {"container_id": container_id, "timestamp": time.time()}
+                self.published.append(media_id)
+            return 200, {"id": media_id}
+
+        if method == "GET" and not parts and "ids" in params:
+            ids = params["ids"].split(",")
+            if "permalink" in params.get("fields", ""):
+                return 200, {i: self._media_of(i) for i in ids}
+            return 200, {i: self._status_of(i) for i in ids}
+
+        if method == "GET" and len(parts) == 1:
+            object_id = parts[0]
+            if object_id in self.media:
+                return 200, self._media_of(object_id)
+            status = self._status_of(object_id)
+            return (404, status) if "error" in status else (200, status)
+
+        return 404, {"error": {"message": f"Unsupported {method} {path}", "code": 100}}
+
+    def _handler(self):
+        server = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, keep-alive
+            # connections add a ~40 ms delayed-ACK stall to every response.
+            disable_nagle_algorithm = True
+
+            def _respond(self, status: int, payload: dict, headers: Optional[dict] = None):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _dispatch(self, method: str):
+                parsed = urlparse(self.path)
+                params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length).decode("utf-8") if length else ""
+                if raw and "json" in (self.headers.get("Content-Type") or ""):
+                    body = json.loads(raw)
+                else:
+                    body = {k: v[0] for k, v in parse_qs(raw).items()}
+
+                server.faults.delay()
+                failure = server.faults.outcome()
+                if failure == 429:
+                    headers = {}
+                    if server.faults.retry_after is not None:
+                        headers["Retry-After"] = f"{server.faults.retry_after:g}"
+                    self._respond(429, {"error": {"message": "Rate limited", "code": 4}}, headers)
+                    return
+                if failure:
+                    self._respond(failure, {"error": {"message": "Injected server error", "code": 2}})
+                    return
+                status, payload = server.handle(method, parsed.path, params, body)
+                self._respond(status, payload)
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def log_message(self, format, *args):
+                pass
+
+        return _Handler
+
+
+# --- Google Sheets ---
+
+def _column_number(letters: str) -> int:
+    number = 0
+    for ch in letters:
+        number = number * 26 + ord(ch) - 64
+    return number
+
+
+def _parse_range(ref: str):
+    """A1 range -> (row1, col1, row2, col2); row2 None means 'to the last row'."""
+    match = re.fullmatch(r"([A-Z]+)(\d*)(?::([A-Z]+)(\d*))?", ref)
+    if not match:
+        raise ValueError(f"Unsupported range: {ref}")
+    c1, r1, c2, r2 = match.groups()
+    col1 = _column_number(c1)
+    col2 = _column_number(c2) if c2 else col1
+    row1 = int(r1) if r1 else 1
+    if c2:
+        row2 = int(r2) if r2 else None
+    else:
+        row2 = row1 if r1 else None
+    return row1, col1, row2, col2
+
+
+class _FakeResponse:
+    """Just enough of requests.Response for gspread.exceptions.APIError."""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        self.status_code = status
+        self.headers = {"Retry-After": f"{retry_after:g}"} if retry_after else {}
+        self.text = json.dumps(self.json())
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": "Injected error", "status": "FAKE"}}
+
+
+class FakeWorksheet:
+    """Column-oriented in-memory worksheet with gspread-like read/write semantics."""
+
+    def __init__(self, title: str, faults: Optional[FaultInjector] = None):
+        self.title = title
+        self.faults = faults or FaultInjector()
+        self.columns = {}
+        self.formats = {}
+        self.requests = 0
+        self.revision = 0
+        self._lock = threading.Lock()
+
+    # Helpers
+
+    def _call(self, cells: int) -> None:
+        self.requests += 1
+        self.faults.delay(cells)
+        failure = self.faults.outcome()
+        if failure:
+            import gspread
+            raise gspread.exceptions.APIError(_FakeResponse(failure, self.faults.retry_after))
+
+    def _column(self, col: int) -> list:
+        return self.columns.setdefault(col, [])
+
+    def _last_row(self, col1: int, col2: int) -> int:
+        return max([len(self.columns.get(c, [])) for c in range(col1, col2 + 1)] + [0])
+
+    def _read(self, ref: str) -> list:
+        row1, col1, row2, col2 = _parse_range(ref)
+        if row2 is None:
+            row2 = self._last_row(col1, col2)
+        rows = []
+        for r in range(row1, row2 + 1):
+            row = []
+            for c in range(col1, col2 + 1):
+                column = self.columns.get(c, [])
+                row.append(column[r - 1] if r - 1 < len(column) else "")
+            while row and row[-1] == "":
+                row.pop()
+            rows.append(row)
+        while rows and not rows[-1]:
+            rows.pop()
+        return rows
+
+    def _write(self, ref: str, values: list) -> int:
+        row1, col1, _, _ = _parse_range(ref)
+        self.revision += 1
+        cells = 0
+        for r_offset, row in enumerate(values):
+            for c_offset, value in enumerate(row):
+                column = self._column(col1 + c_offset)
+                index = row1 + r_offset - 1
+                if index >= len(column):
+                    column.extend([""] * (index + 1 - len(column)))
+                column[index] = "" if value is None else str(value)
+                cells += 1
+        for column in self.columns.values():
+            while column and column[-1] == "":
+                column.pop()
+        return cells
+
+    # gspread API
+
+    def col_values(self, col: int) -> list:
+        with self._lock:
+            values = list(self.columns.get(col, []))
+        self._call(len(values))
+        return values
+
+    def get(self, ref: str) -> list:
+        with self._lock:
+            rows = self._read(ref)
+        self._call(sum(len(r) for r in rows))
+        return rows
+
+    def batch_get(self, refs: list) -> list:
+        with self._lock:
+            results = [self._read(ref) for ref in refs]
+        self._call(sum(len(r) for rows in results for r in rows))
+        return results
+
+    def update(self, range_name: str = None, values: list = None, **kwargs) -> None:
+        self._call(sum(len(r) for r in values))
+        with self._lock:
+            self._write(range_name, values)
+
+    def update_cell(self, row: int, col: int, value) -> None:
+        self._call(1)
+        with self._lock:
+            self.revision += 1
+            column = self._column(col)
+            if row - 1 >= len(column):
+                column.extend([""] * (row - len(column)))
+            column[row - 1] = "" if value is None else str(value)
+            while column and column[-1] == "":
+                column.pop()
+
+    def batch_update(self, data: list, **kwargs) -> None:
+        self._call(sum(len(r) for item in data for r in item["values"]))
+        with self._lock:
+            for item in data:
+                self._write(item["range"], item["values"])
+
+    def append_row(self, values: list, **kwargs) -> None:
+        self.append_rows([values])
+
+    def append_rows(self, values: list, **kwargs) -> None:
+        self._call(sum(len(r) for r in values))
+        with self._lock:
+            self.revision += 1
+            start = self._last_row(1, max(len(r) for r in values)) + 1
+            for offset, row in enumerate(values):
+                for c_offset, value in enumerate(row):
+                    column = self._column(1 + c_offset)
+                    index = start + offset - 1
+                    if index >= len(column):
+                        column.extend([""] * (index + 1 - len(column)))
+                    column[index] = str(value)
+
+    def format(self, ref: str, fmt: dict) -> None:
+        self._call(1)
+        with self._lock:
+            self.formats[ref] = fmt
+
+    # Benchmark helpers
+
+    def fill_queue(self, items: list) -> None:
+        """Replaces Column A with items and clears everything else (no request is counted)."""
+        with self._lock:
+            self.columns = {1: list(items)}
+            self.formats = {}
+            self.revision += 1
+
+    def read_column(self, ref: str) -> list:
+        """Values of a one-column range in COLUMNS major dimension (no request is counted)."""
+        with self._lock:
+            return [row[0] if row else "" for row in self._read(ref)]
+
+
+class FakeSpreadsheet:
+    def __init__(self, faults: Optional[FaultInjector] = None):
+        self.faults = faults or FaultInjector()
+        self.sheets = {}
+        self.requests = 0
+
+    def _call(self, cells: int) -> None:
+        self.requests += 1
+        self.faults.delay(cells)
+        failure = self.faults.outcome()
+        if failure:
+            import gspread
+            raise gspread.exceptions.APIError(_FakeResponse(failure, self.faults.retry_after))
+
+    def values_batch_get(self, ranges: list, params: Optional[dict] = None) -> dict:
+        """Only "'<sheet>'!<range>" ranges in COLUMNS major dimension are supported."""
+        value_ranges = []
+        for item in ranges:
+            title, _, ref = item.rpartition("!")
+            column = self.sheets[title.strip("'").replace("''", "'")].read_column(ref)
+            while column and column[-1] == "":
+                column.pop()
+            value_ranges.append({"range": item, "values": [column]} if column else {"range": item})
+        self._call(sum(len(r.get("values", [[]])[0]) for r in value_ranges))
+        return {"valueRanges": value_ranges}
+
+    def get_lastUpdateTime(self) -> str:
+        self._call(1)
+        return str(sum(sheet.revision for sheet in self.sheets.values()))
+
+    def worksheet(self, title: str) -> FakeWorksheet:
+        if title not in self.sheets:
+            import gspread
+            raise gspread.WorksheetNotFound(title)
+        return self.sheets[title]
+
+    def add_worksheet(self, title: str, rows: int = 1000, cols: int = 26) -> FakeWorksheet:
+        self.sheets[title] = FakeWorksheet(title, self.faults)
+        return self.sheets[title]
+
+    def worksheets(self) -> list:
+        return list(self.sheets.values())
+
+
+def install_fake_spreadsheet(spreadsheet: FakeSpreadsheet) -> None:
+    """Points google_sheets' handle cache at the fake spreadsheet (no OAuth, no network)."""
+    import google_sheets
+    google_sheets.invalidate_cache()
+    with google_sheets._cache_lock:
+        google_sheets._client_cache["client"] = object()
+        google_sheets._client_cache["spreadsheet"] = spreadsheet
+        google_sheets._client_cache["created_at"] = time.monotonic()
+
+
+# --- LLM SDKs ---
+
+class FakeLLMError(Exception):
+    """Raised for injected failures; carries status_code like the SDK errors."""
+
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"Error code: {status} - injected")
+        self.status_code = status
+        self.response = types.SimpleNamespace(
+            status_code=status,
+            headers={"Retry-After": f"{retry_after:g}"} if retry_after else {},
+        )
+
+
+_WORDS = ("오늘", "커피", "습관", "주말", "산책", "생각", "친구", "하루", "작은", "변화",
+          "아침", "저녁", "책", "음악", "여행", "기록", "운동", "감사", "시간", "마음")
+
+
+class FakeLLMClient:
+    """
+    Answers OpenAI- and google-genai-shaped calls with synthetic text.
+
+    Generated posts are random word sequences of about reply_chars characters; the
+    translation prompts are answered in the expected format. Latency is
+    faults.latency + faults.per_item * output characters + prompt_char_latency * prompt
+    characters not served from a prompt cache (a Gemini cachedContents entry, or an
+    OpenAI prompt_cache_key seen before with the same leading messages).
+    """
+
+    def __init__(
+        self,
+        faults: Optional[FaultInjector] = None,
+        reply_chars: int = 300,
+        chunk_chars: int = 20,
+        prompt_char_latency: float = 0.0,
+    ):
+        self.faults = faults or FaultInjector()
+        self.reply_chars = reply_chars
+        self.chunk_chars = chunk_chars
+        self.prompt_char_latency = prompt_char_latency
+        self.requests = 0
+        self.caches_created = 0
+        self.cached_chars = 0
+        self._gemini_caches = {}
+        self._openai_prefixes = {}
+        self._random = random.Random(0)
+        self._lock = threading.Lock()
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._openai_create))
+        self.models = types.SimpleNamespace(
+            generate_content=self._gemini_generate,
+            generate_content_stream=self._gemini_stream,
+        )
+        self.caches = types.SimpleNamespace(create=self._gemini_cache_create)
+
+    def _post(self) -> str:
+        with self._lock:
+            words = []
+            while sum(len(w) + 1 for w in words) < self.reply_chars:
+                words.append(self._random.choice(_WORDS))
+        return " ".join(words)
+
+    def reply(self, prompt: str) -> str:
+        if "Input:\n" in prompt and '"languages"' in prompt:
+            payload = json.loads(prompt.split("Input:\n", 1)[1])
+            return json.dumps({"items": [
+                {"id": item["id"], "translations": {lang: f"[{lang}] {item['text']}" for lang in payload["languages"]}}
+                for item in payload["items"]
+            ]}, ensure_ascii=False)
+        match = re.search(r"Translate the following text to (.+?)\.", prompt)
+        if match:
+            return f"[{match.group(1)}] " + prompt.rsplit("Text to translate:", 1)[-1].strip()
+        return self._post()
+
+    def _read_prompt(self, total_chars: int, cached_chars: int) -> None:
+        with self._lock:
+            self.cached_chars += cached_chars
+        if self.prompt_char_latency:
+            time.sleep(self.prompt_char_latency * (total_chars - cached_chars))
+
+    def _respond(self, prompt: str) -> str:
+        self.requests += 1
+        failure = self.faults.outcome()
+        if failure:
+            self.faults.delay()
+            raise FakeLLMError(failure, self.faults.retry_after if failure == 429 else None)
+        text = self.reply(prompt)
+        self.faults.delay(len(text))
+        return text
+
+    def _chunks(self, text: str):
+        for start in range(0, len(text), self.chunk_chars):
+            yield text[start:start + self.chunk_chars]
+
+    # OpenAI shape
+
+    def _openai_cached_chars(self, messages, extra_body) -> int:
+        """Like OpenAI's automatic caching: the system prompt + first user message are reused once seen."""
+        key = (extra_body or {}).get("prompt_cache_key")
+        prefix = tuple(m["content"] for m in messages[:2])
+        if key is None or len(messages) < 2:
+            return 0
+        with self._lock:
+            seen = self._openai_prefixes.get(key) == prefix
+            self._openai_prefixes[key] = prefix
+        return sum(len(part) for part in prefix) if seen and len(messages) > 2 else 0
+
+    def _openai_create(self, model=None, messages=None, stream=False, extra_body=None, **kwargs):
+        total = sum(len(m["content"]) for m in messages)
+        cached = self._openai_cached_chars(messages, extra_body)
+        self._read_prompt(total, cached)
+        text = self._respond(messages[-1]["content"])
+        usage = types.SimpleNamespace(
+            total_tokens=total + len(text),
+            prompt_tokens_details=types.SimpleNamespace(cached_tokens=cached),
+        )
+        if not stream:
+            message = types.SimpleNamespace(content=text)
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+        return (
+            types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=chunk))])
+            for chunk in self._chunks(text)
+        )
+
+    # google-genai shape
+
+    @staticmethod
+    def _contents_chars(contents) -> int:
+        return sum(len(part["text"]) for content in contents or [] for part in content["parts"])
+
+    def _gemini_cache_create(self, model=None, config=None):
+        chars = self._contents_chars(config["contents"]) + len(config.get("system_instruction") or "")
+        with self._lock:
+            self.caches_created += 1
+            name = f"cachedContents/{self.caches_created}"
+            self._gemini_caches[name] = chars
+        self._read_prompt(chars, 0)
+        return types.SimpleNamespace(name=name, model=model)
+
+    def _gemini_read(self, contents, config) -> int:
+        config = config or {}
+        cached = 0
+        if config.get("cached_content"):
+            cached = self._gemini_caches.get(config["cached_content"])
+            if cached is None:
+                raise FakeLLMError(404)
+        total = self._contents_chars(contents) + len(config.get("system_instruction") or "") + cached
+        self._read_prompt(total, cached)
+        return cached
+
+    def _gemini_generate(self, model=None, contents=None, config=None):
+        cached = self._gemini_read(contents, config)
+        text = self._respond(contents[-1]["parts"][0]["text"])
+        usage = types.SimpleNamespace(total_token_count=len(text), cached_content_token_count=cached)
+        return types.SimpleNamespace(text=text, usage_metadata=usage)
+
+    def _gemini_stream(self, model=None, contents=None, config=None):
+        self._gemini_read(contents, config)
+        text = self._respond(contents[-1]["parts"][0]["text"])
+        return (types.SimpleNamespace(text=chunk) for chunk in self._chunks(text))
+
+
+class FakeBatchProvider:
+    """
+    batch_jobs provider (submit/status/results/cancel) answered by FakeLLMClient.reply.
+    Every fail_every-th request of a batch fails; a cancelled batch only returns the
+    first half of its results, like a provider that had finished those before the cancel.
+    """
+
+    name = "fake"
+
+    def __init__(self, llm: Optional[FakeLLMClient] = None, complete_after: float = 0.0, fail_every: int = 0):
+        self.llm = llm or FakeLLMClient()
+        self.complete_after = complete_after
+        self.fail_every = fail_every
+        self.requests = 0
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def submit(self, requests, display_name):
+        with self._lock:
+            self.requests += 1
+            remote_id = f"batch_{len(self._batches) + 1}"
+            self._batches[remote_id] = {"requests": list(requests), "at": time.monotonic(), "cancelled": False}
+        return remote_id
+
+    def status(self, remote_id):
+        self.requests += 1
+        batch = self._batches[remote_id]
+        if batch["cancelled"]:
+            return "cancelled"
+        return "completed" if time.monotonic() - batch["at"] >= self.complete_after else "running"
+
+    def results(self, remote_id, custom_ids):
+        self.requests += 1
+        batch = self._batches[remote_id]
+        requests = batch["requests"]
+        if batch["cancelled"]:
+            requests = requests[:len(requests) // 2]
+        for index, request in enumerate(requests):
+            if self.fail_every and (index + 1) % self.fail_every == 0:
+                yield types.SimpleNamespace(custom_id=request["custom_id"], text=None, error="injected", tokens=None)
+                continue
+            text = self.llm.reply(request["messages"][-1]["content"])
+            yield types.SimpleNamespace(custom_id=request["custom_id"], text=text, error=None, tokens=len(text))
+
+    def cancel(self, remote_id):
+        self.requests += 1
+        self._batches[remote_id]["cancelled"] = True
@@ -0,0 +1,95 @@
+"""
+Import-time budget check.
+
+Imports each module in a fresh interpreter with -X importtime and fails when its
+cumulative import time exceeds the budget, or when importing it loads an SDK that
+should only be imported on first use (openai, google-genai, requests, gspread,
+google-auth, streamlit, aiohttp).
+
+Usage (from the repository root):
+  python benchmarks/import_time.py              # exit 1 on a violation
+  python benchmarks/import_time.py --runs 5 --scale 2
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets in milliseconds, measured on a warm file cache.
+BUDGETS = {
+    "post_to_threads": 80,
+    "google_sheets": 60,
+    "sheet_mirror": 60,
+    "scheduler": 150,
+    "accounts": 60,
+    "batch_jobs": 60,
+    "llm_failover": 90,
+    "dedupe": 40,
+    "llm_cache": 40,
+    "prompt_cache": 30,
+    "metrics": 30,
+    "rate_limit": 30,
+}
+
+# Modules that must not be loaded as a side effect of importing the ones above.
+LAZY_MODULES = ("openai", "google.genai", "requests", "gspread", "google.oauth2", "streamlit", "aiohttp")
+
+_PROBE = """
+import json, sys
+import {module}
+print(json.dumps(sorted(m for m in {lazy!r} if m in sys.modules)))
+"""
+
+
+def measure(module: str):
+    """Returns (cumulative import time in ms, lazy modules that were loaded)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    cumulative = None
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)$", line)
+        if match and match.group(2) == module:
+            cumulative = int(match.group(1)) / 1000
+    return cumulative, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check import time budgets")
+    parser.add_argument("--runs", type=int, default=3, help="runs per module (the fastest one counts)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget, e.g. on slow CI machines")
+    args = parser.parse_args(argv)
+
+    violations = []
+    print(f"{'module':<18}{'ms':>8}{'budget':>8}  eager SDKs")
+    for module, budget in BUDGETS.items():
+        timings = []
+        loaded = []
+        for _ in range(args.runs):
+            elapsed, loaded = measure(module)
+            timings.append(elapsed)
+        best = min(timings)
+        limit = budget * args.scale
+        print(f"{module:<18}{best:>8.1f}{limit:>8.0f}  {', '.join(loaded) or '-'}")
+        if best > limit:
+            violations.append(f"{module}: {best:.1f} ms > {limit:.0f} ms")
+        if loaded:
+            violations.append(f"{module}: imports {', '.join(loaded)} eagerly")
+
+    if violations:
+        print("\nImport budget violations:")
+        for line in violations:
+            print(f"  {line}")
+        return 1
+    print("\nAll modules within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
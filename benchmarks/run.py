@@ -0,0 +1,463 @@
+"""
+Offline benchmarks for the generation, translation and posting pipelines.
+
+Every backend is a local stand-in from fakes.py (no accounts or network needed), with
+configurable latency, 5xx and 429 injection. For each scenario and queue size the
+sheet is preloaded with that many items, then --ops items are processed through the
+real code paths:
+
+  generate       ContentGenerator.generate -> SheetWriter.append (--brief-chars: the first
+                 prompt is a long brief, served from the prompt cache on later turns
+                 unless --no-prompt-cache)
+  generate-failover  generate on FailoverGenerator: --model as primary (with the
+                 --llm-slow-rate tail), the other model as hedge/failover backend
+  generate-batch ContentGenerator.submit_bulk -> wait_for_batch -> collect_bulk into a
+                 SheetWriter (FakeBatchProvider, done --batch-complete-after seconds later)
+  translate      ContentGenerator.translate_batch (chunks of 20) -> SheetWriter.append
+  publish        pop_from_queue -> _post_text_to_threads -> ack_item / mark_as_failed
+  publish-async  pop_from_queue x ops -> AsyncPublisher.publish_many -> ack_item
+  publish-multi  round-robin over two sheets as in the app's "둘 다" mode: one
+                 queue_snapshot per tick, pop from the snapshot (--no-snapshot: the old
+                 pop + has_pending per sheet)
+
+Usage (from the repository root):
+  python benchmarks/run.py --scenario publish --sizes 10,1000,100000 --mode cursor
+  python benchmarks/run.py --json baseline.json
+  python benchmarks/run.py --baseline baseline.json --tolerance 0.2   # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Keep benchmarks away from the on-disk caches and real credentials.
+os.environ.setdefault("DEDUPE_DISABLED", "1")
+os.environ.setdefault("LLM_CACHE_DISABLED", "1")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark")
+
+from fakes import (  # noqa: E402
+    FakeBatchProvider,
+    FakeLLMClient,
+    FakeSpreadsheet,
+    FakeThreadsServer,
+    FaultInjector,
+    install_fake_spreadsheet,
+)
+
+SCENARIOS = ("generate", "generate-failover", "generate-batch", "translate", "publish", "publish-async", "publish-multi")
+SHEET = "benchmark"
+SHEET_2 = "benchmark-2"
+TOKEN = "benchmark-token"
+
+
+def _quiet(message: str) -> None:
+    pass
+
+
+def percentile(values, q: float):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _unlimited_quotas() -> None:
+    """Lifts the shared rate limiters so the fakes' latency is what gets measured."""
+    import rate_limit
+    for provider in ("openai", "gemini", "sheets", "threads"):
+        rate_limit.configure(provider, 1e9, None, adaptive=False)
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.sheets_faults = FaultInjector(
+            latency=args.sheets_latency, per_item=args.sheets_cell_latency,
+            throttle_rate=args.throttle_rate, error_rate=args.error_rate, seed=1,
+        )
+        self.llm_faults = FaultInjector(
+            latency=args.llm_latency, per_item=args.llm_char_latency,
+            throttle_rate=args.throttle_rate, error_rate=args.error_rate, retry_after=0.5, seed=2,
+            slow_rate=args.llm_slow_rate, slow_latency=args.llm_slow_latency,
+        )
+        # Backend without the slow tail, for generate-failover.
+        self.fallback_faults = FaultInjector(
+            latency=args.llm_latency, per_item=args.llm_char_latency,
+            throttle_rate=args.throttle_rate, error_rate=args.error_rate, retry_after=0.5, seed=4,
+        )
+        self.threads_faults = FaultInjector(
+            latency=args.threads_latency, throttle_rate=args.throttle_rate,
+            error_rate=args.error_rate, retry_after=0.5, seed=3,
+        )
+        self.spreadsheet = FakeSpreadsheet(self.sheets_faults)
+        self.worksheet = self.spreadsheet.add_worksheet(SHEET)
+        self.worksheet_2 = self.spreadsheet.add_worksheet(SHEET_2)
+        self.failures = 0
+        self.llm_client = None
+
+    def _prepare(self, size: int) -> None:
+        install_fake_spreadsheet(self.spreadsheet)
+        self.worksheet.fill_queue([f"queued item {i}" for i in range(size)])
+        # The second sheet only holds half as many items, so multi-sheet runs also hit an empty sheet.
+        self.worksheet_2.fill_queue([f"second sheet item {i}" for i in range(size // 2)])
+        self.worksheet.requests = self.worksheet_2.requests = self.spreadsheet.requests = 0
+        self.failures = 0
+        self.llm_client = None
+        for faults in (self.sheets_faults, self.llm_faults, self.fallback_faults, self.threads_faults):
+            faults.calls = faults.errors = faults.throttles = 0
+        from metrics import get_registry
+        get_registry().reset()
+
+    def _generator(self):
+        from post_to_threads import ContentGenerator
+        from prompt_cache import PromptCacheRegistry
+        self.llm_client = FakeLLMClient(
+            self.llm_faults, reply_chars=self.args.reply_chars,
+            prompt_char_latency=self.args.llm_prompt_char_latency,
+        )
+        # A fresh registry per run, so every run pays for creating its cache.
+        return ContentGenerator(
+            model=self.args.model, logger=_quiet, use_cache=False, use_dedupe=False,
+            client=self.llm_client,
+            prompt_cache=None if self.args.no_prompt_cache else PromptCacheRegistry(),
+            use_prompt_cache=not self.args.no_prompt_cache,
+        )
+
+    # Scenarios: each returns a list of per-operation latencies (seconds).
+
+    def generate(self, size: int, ops: int, generator=None):
+        import google_sheets
+        generator = generator or self._generator()
+        first_prompt = "벤치마크용 글을 하나 써줘."
+        if self.args.brief_chars:
+            first_prompt += "\n브랜드 가이드: " + "톤은 친근하게, 문장은 짧게. " * (self.args.brief_chars // 17 + 1)
+        latencies = []
+        with google_sheets.SheetWriter(dedupe=False) as writer:
+            for i in range(ops):
+                start = time.perf_counter()
+                try:
+                    text = generator.generate(first_prompt if i == 0 else "하나 더 써줘.")
+                    writer.append(text, sheet_name=SHEET)
+                except Exception:
+                    self.failures += 1
+                latencies.append(time.perf_counter() - start)
+        return latencies
+
+    def generate_failover(self, size: int, ops: int):
+        from llm_failover import FailoverGenerator
+        from post_to_threads import ContentGenerator
+        primary = self._generator()
+        primary.max_retries = 1
+        fallback_model = "gpt-4o" if primary.model.startswith("gemini") else "gemini-2.5-flash"
+        fallback = ContentGenerator(
+            model=fallback_model, logger=_quiet, use_cache=False, use_dedupe=False, use_prompt_cache=False,
+            max_retries=1, client=FakeLLMClient(self.fallback_faults, reply_chars=self.args.reply_chars),
+        )
+        with FailoverGenerator([primary, fallback], hedge_min_delay=self.args.hedge_min_delay,
+                               initial_hedge_delay=self.args.initial_hedge_delay, logger=_quiet) as generator:
+            return self.generate(size, ops, generator=generator)
+
+    def generate_batch(self, size: int, ops: int):
+        import tempfile
+
+        import batch_jobs
+        import google_sheets
+        generator = self._generator()
+        provider = FakeBatchProvider(self.llm_client, complete_after=self.args.batch_complete_after)
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory() as tmp:
+            store = batch_jobs.BatchJobStore(os.path.join(tmp, "batch.sqlite3"))
+            try:
+                batch_id = generator.submit_bulk("벤치마크용 글을 써줘.", ops, sheet_name=SHEET, store=store, provider=provider)
+                with google_sheets.SheetWriter(dedupe=False) as writer:
+                    counts = generator.collect_bulk(batch_id, writer=writer, store=store, provider=provider,
+                                                    wait=True, poll_interval=0.1)
+            finally:
+                store.close()
+        self.failures += counts.get(batch_jobs.ITEM_FAILED, 0)
+        # Every item of the batch waits for the whole batch.
+        return [time.perf_counter() - start] * ops
+
+    def translate(self, size: int, ops: int):
+        import google_sheets
+        generator = self._generator()
+        texts = [f"번역할 글 {i} " + "가나다라 " * 20 for i in range(ops)]
+        languages = ["English", "Spanish"]
+        latencies = []
+        with google_sheets.SheetWriter(dedupe=False) as writer:
+            for start_index in range(0, len(texts), 20):
+                chunk = texts[start_index:start_index + 20]
+                start = time.perf_counter()
+                try:
+                    for translated in generator.translate_batch(chunk, languages):
+                        for lang in languages:
+                            writer.append(translated[lang], sheet_name=SHEET)
+                except Exception:
+                    self.failures += len(chunk)
+                # Per-item latency of the chunk, so runs with different chunk sizes compare.
+                latencies.extend([(time.perf_counter() - start) / len(chunk)] * len(chunk))
+        return latencies
+
+    def publish(self, size: int, ops: int):
+        import google_sheets
+        import post_to_threads
+        mode = self.args.mode
+        latencies = []
+        with FakeThreadsServer(self.threads_faults, ready_after=self.args.ready_after) as server:
+            post_to_threads._default_client = post_to_threads.ThreadsClient(base_url=server.url)
+            user_id = post_to_threads.me(TOKEN, refresh=True)["id"]
+            for _ in range(ops):
+                start = time.perf_counter()
+                try:
+                    text, row_index = google_sheets.pop_from_queue(SHEET, mode=mode)
+                    if not text:
+                        break
+                    result = post_to_threads._post_text_to_threads(user_id, text, TOKEN, logger=_quiet)
+                    if result:
+                        google_sheets.ack_item(SHEET, row_index, mode=mode)
+                    else:
+                        self.failures += 1
+                        if row_index:
+                            google_sheets.mark_as_failed(SHEET, row_index, mode=mode)
+                except Exception:
+                    # Same as the posting loops: count it and move on to the next item.
+                    self.failures += 1
+                latencies.append(time.perf_counter() - start)
+            post_to_threads._default_client = None
+        return latencies
+
+    def publish_multi(self, size: int, ops: int):
+        import google_sheets
+        import post_to_threads
+        mode = self.args.mode
+        sheets = [SHEET, SHEET_2]
+        latencies = []
+        count = 0
+        with FakeThreadsServer(self.threads_faults, ready_after=self.args.ready_after) as server:
+            post_to_threads._default_client = post_to_threads.ThreadsClient(base_url=server.url)
+            user_id = post_to_threads.me(TOKEN, refresh=True)["id"]
+            for _ in range(ops):
+                start = time.perf_counter()
+                try:
+                    if self.args.no_snapshot:
+                        sheet = sheets[count % len(sheets)]
+                        text, row_index = google_sheets.pop_from_queue(sheet, mode=mode)
+                        if not text:
+                            if not any(google_sheets.has_pending(name, mode=mode) for name in sheets):
+                                break
+                            count += 1
+                            sheet = sheets[count % len(sheets)]
+                            text, row_index = google_sheets.pop_from_queue(sheet, mode=mode)
+                    else:
+                        snapshot = google_sheets.queue_snapshot(sheets, mode=mode)
+                        sheet, skipped = snapshot.next_sheet(count)
+                        if sheet is None:
+                            break
+                        count += skipped
+                        text, row_index = google_sheets.pop_from_queue(sheet, mode=mode, snapshot=snapshot)
+                    count += 1
+                    result = post_to_threads._post_text_to_threads(user_id, text, TOKEN, logger=_quiet)
+                    if result:
+                        google_sheets.ack_item(sheet, row_index, mode=mode)
+                    else:
+                        self.failures += 1
+                        if row_index:
+                            google_sheets.mark_as_failed(sheet, row_index, mode=mode)
+                except Exception:
+                    self.failures += 1
+                latencies.append(time.perf_counter() - start)
+            post_to_threads._default_client = None
+        return latencies
+
+    def publish_async(self, size: int, ops: int):
+        import asyncio
+        import google_sheets
+        from threads_async import AsyncPublisher, AsyncThreadsClient
+        mode = self.args.mode
+
+        items = []
+        for _ in range(ops):
+            try:
+                text, row_index = google_sheets.pop_from_queue(SHEET, mode=mode)
+            except Exception:
+                self.failures += 1
+                continue
+            if not text:
+                break
+            items.append((text, row_index))
+
+        async def _run():
+            async with AsyncThreadsClient(base_url=server.url, max_concurrency=self.args.concurrency) as client:
+                user_id = (await client.me(TOKEN))["id"]
+                publisher = AsyncPublisher(client)
+
+                async def _one(text):
+                    start = time.perf_counter()
+                    result = await publisher.publish(user_id, text, TOKEN, logger=_quiet)
+                    return result, time.perf_counter() - start
+
+                return await asyncio.gather(*[_one(text) for text, _ in items])
+
+        with FakeThreadsServer(self.threads_faults, ready_after=self.args.ready_after) as server:
+            outcomes = asyncio.run(_run())
+        for (text, row_index), (result, _) in zip(items, outcomes):
+            try:
+                if result:
+                    google_sheets.ack_item(SHEET, row_index, mode=mode)
+                else:
+                    self.failures += 1
+                    if row_index:
+                        google_sheets.mark_as_failed(SHEET, row_index, mode=mode)
+            except Exception:
+                self.failures += 1
+        return [elapsed for _, elapsed in outcomes]
+
+    def run(self, scenario: str, size: int) -> dict:
+        self._prepare(size)
+        ops = min(self.args.ops, size) if scenario.startswith("publish") else self.args.ops
+        started = time.perf_counter()
+        latencies = getattr(self, scenario.replace("-", "_"))(size, ops)
+        elapsed = time.perf_counter() - started
+
+        from metrics import get_registry
+        return {
+            "scenario": scenario,
+            "size": size,
+            "mode": self.args.mode,
+            "ops": len(latencies),
+            "failed": self.failures,
+            "seconds": elapsed,
+            "throughput": len(latencies) / elapsed if elapsed else None,
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies) if latencies else None,
+            "sheets_requests": self.worksheet.requests + self.worksheet_2.requests + self.spreadsheet.requests,
+            "llm_requests": self.llm_faults.calls + self.fallback_faults.calls,
+            "threads_requests": self.threads_faults.calls,
+            "llm_cached_chars": self.llm_client.cached_chars if self.llm_client else 0,
+            "throttled": self.sheets_faults.throttles + self.llm_faults.throttles + self.threads_faults.throttles,
+            "stages": get_registry().snapshot(),
+        }
+
+
+def _format_ms(value) -> str:
+    return "-" if value is None else f"{value * 1000:9.1f}"
+
+
+def print_table(results) -> None:
+    header = f"{'scenario':<14}{'size':>8}{'ops':>6}{'fail':>6}{'ops/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'sheets':>8}{'llm':>6}{'threads':>8}{'429':>5}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(
+            f"{r['scenario']:<14}{r['size']:>8}{r['ops']:>6}{r['failed']:>6}{(r['throughput'] or 0):>9.2f}"
+            f"{_format_ms(r['p50']):>10}{_format_ms(r['p95']):>10}{_format_ms(r['p99']):>10}"
+            f"{r['sheets_requests']:>8}{r['llm_requests']:>6}{r['threads_requests']:>8}{r['throttled']:>5}"
+        )
+
+
+def print_stages(result) -> None:
+    print(f"\n  {result['scenario']} @ {result['size']}: per-stage latency")
+    for row in sorted(result["stages"], key=lambda r: -(r["mean"] or 0) * r["calls"]):
+        print(
+            f"    {row['stage']:<22}{row['calls']:>7} calls  p50 {_format_ms(row['p50'])} ms"
+            f"  p95 {_format_ms(row['p95'])} ms  retries {row['retries']}  errors {row['errors']}"
+        )
+
+
+def compare(results, baseline, tolerance: float):
+    """Returns regressions: lower throughput or higher p95 than the baseline beyond tolerance."""
+    previous = {(b["scenario"], b["size"], b.get("mode")): b for b in baseline}
+    regressions = []
+    for r in results:
+        base = previous.get((r["scenario"], r["size"], r["mode"]))
+        if not base:
+            continue
+        if base["throughput"] and r["throughput"] < base["throughput"] * (1 - tolerance):
+            regressions.append(f"{r['scenario']}@{r['size']}: throughput {r['throughput']:.2f} < {base['throughput']:.2f} ops/s")
+        if base["p95"] and r["p95"] > base["p95"] * (1 + tolerance):
+            regressions.append(f"{r['scenario']}@{r['size']}: p95 {r['p95'] * 1000:.1f} > {base['p95'] * 1000:.1f} ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmarks with fake Threads/Sheets/LLM backends")
+    parser.add_argument("--scenario", default="all", help=f"{', '.join(SCENARIOS)} or all (comma-separated)")
+    parser.add_argument("--sizes", default="10,100,1000,10000,100000", help="queue sizes (comma-separated)")
+    parser.add_argument("--ops", type=int, default=50, help="items processed per run")
+    parser.add_argument("--mode", choices=["move", "cursor"], default="cursor", help="sheet queue layout")
+    parser.add_argument("--model", default="gpt-4o", help="gpt-4o or gemini-2.5-flash (call shape of the fake)")
+    parser.add_argument("--concurrency", type=int, default=10, help="publish-async concurrency")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--llm-char-latency", type=float, default=0.0001, help="seconds per generated character")
+    parser.add_argument("--llm-slow-rate", type=float, default=0.0, help="probability of a slow LLM call (tail latency)")
+    parser.add_argument("--llm-slow-latency", type=float, default=2.0, help="extra seconds of a slow LLM call")
+    parser.add_argument("--hedge-min-delay", type=float, default=0.2, help="generate-failover: lower bound of the hedge delay")
+    parser.add_argument("--initial-hedge-delay", type=float, default=1.0, help="generate-failover: hedge delay before p95 is known")
+    parser.add_argument("--llm-prompt-char-latency", type=float, default=0.0, help="seconds per uncached prompt character")
+    parser.add_argument("--reply-chars", type=int, default=300)
+    parser.add_argument("--brief-chars", type=int, default=0, help="generate: length of the first (brief) prompt")
+    parser.add_argument("--batch-complete-after", type=float, default=0.5, help="generate-batch: seconds until a batch is done")
+    parser.add_argument("--no-prompt-cache", action="store_true", help="generate without provider prompt caching")
+    parser.add_argument("--sheets-latency", type=float, default=0.02)
+    parser.add_argument("--sheets-cell-latency", type=float, default=0.000002, help="seconds per transferred cell")
+    parser.add_argument("--threads-latency", type=float, default=0.02)
+    parser.add_argument("--ready-after", type=float, default=0.1, help="seconds until a container is FINISHED")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="probability of a 429 per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of a 503 per call")
+    parser.add_argument("--no-snapshot", action="store_true", help="publish-multi without queue_snapshot (for comparison)")
+    parser.add_argument("--respect-quotas", action="store_true", help="keep the default rate limiter quotas")
+    parser.add_argument("--stages", action="store_true", help="print per-stage latency breakdown")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="compare with a previous --json output")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    scenarios = SCENARIOS if args.scenario == "all" else [s.strip() for s in args.scenario.split(",")]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    if not args.respect_quotas:
+        _unlimited_quotas()
+    bench = Bench(args)
+
+    results = []
+    for scenario in scenarios:
+        for size in sizes:
+            result = bench.run(scenario, size)
+            results.append(result)
+            print(f"{scenario} @ {size}: {result['ops']} ops in {result['seconds']:.2f}s", file=sys.stderr)
+
+    print()
+    print_table(results)
+    if args.stages:
+        for result in results:
+            print_stages(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+"""
+Persistent near-duplicate index for generated and posted texts.
+
+Each text is normalized (lowercase, letters and digits only) and split into character
+shingles, and a MinHash signature of SIGNATURE_SIZE values is computed with one-
+permutation hashing: every shingle hash lands in one bin and each bin keeps its minimum,
+so a signature costs one hash per shingle. The share of equal bins between two
+signatures estimates the Jaccard similarity of the shingle sets, which stays high for
+reworded or re-punctuated copies.
+
+Signatures are stored in SQLite and indexed in memory by BANDS groups of bins (LSH), so
+a lookup only compares against texts that share at least one band instead of the whole
+history. Several processes (Streamlit, the scheduler daemon) can share one index file;
+rows added by another process are picked up on the next lookup.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+from typing import List, NamedTuple, Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_INDEX_PATH = os.getenv("DEDUPE_INDEX_PATH", os.path.join(BASE_DIR, "dedupe_index.sqlite3"))
+
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS_PER_BAND = SIGNATURE_SIZE // BANDS
+SHINGLE_SIZE = 3
+
+_NON_WORD = re.compile(r"[\W_]+")
+_PACK = struct.Struct(f">{SIGNATURE_SIZE}Q")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS signatures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    digest TEXT NOT NULL UNIQUE,
+    signature BLOB NOT NULL,
+    text TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+"""
+
+
+def _normalize(text: str) -> str:
+    return _NON_WORD.sub("", text.lower())
+
+
+def minhash(text: str, shingle_size: int = SHINGLE_SIZE) -> List[int]:
+    """One-permutation MinHash signature of the text's character shingles."""
+    normalized = _normalize(text)
+    shingles = {normalized[i:i + shingle_size] for i in range(max(1, len(normalized) - shingle_size + 1))}
+
+    bins = [None] * SIGNATURE_SIZE
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        slot, rank = value % SIGNATURE_SIZE, value >> 6
+        if bins[slot] is None or rank < bins[slot]:
+            bins[slot] = rank
+
+    # Short texts leave bins empty: borrow the next filled bin, tagged with the distance,
+    # so both texts of a pair fill the same empty bin the same way.
+    signature = []
+    for slot in range(SIGNATURE_SIZE):
+        if bins[slot] is not None:
+            signature.append(bins[slot] << 6)
+            continue
+        for offset in range(1, SIGNATURE_SIZE):
+            borrowed = bins[(slot + offset) % SIGNATURE_SIZE]
+            if borrowed is not None:
+                signature.append(borrowed << 6 | offset)
+                break
+        else:
+            signature.append(0)
+    return signature
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(a == b for a, b in zip(first, second)) / SIGNATURE_SIZE
+
+
+def _band_keys(signature: List[int]):
+    return [
+        (band, tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]))
+        for band in range(BANDS)
+    ]
+
+
+class Match(NamedTuple):
+    id: int
+    text: str
+    source: str
+    similarity: float
+
+
+class DuplicateIndex:
+    """
+    MinHash/LSH index of texts that were already generated, queued or posted.
+
+    A text is a near-duplicate when its estimated shingle similarity with a stored text
+    is at least threshold. With 16 bands of 4 bins, pairs above ~0.6 similarity share a
+    band (and are compared) with more than 90% probability.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, threshold: float = 0.6):
+        self.path = path
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._bands = {}
+        self._signatures = {}
+        self._digests = set()
+        self._last_id = 0
+        self._data_version = None
+        self._refresh()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self._signatures)
+
+    def _refresh(self) -> None:
+        """Loads rows added since the last lookup (by this or another process). Caller holds the lock."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        rows = self._conn.execute(
+            "SELECT id, digest, signature FROM signatures WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        for row_id, digest, packed in rows:
+            if row_id not in self._signatures:
+                self._remember(row_id, digest, packed)
+            self._last_id = row_id
+        self._data_version = version
+
+    def _remember(self, row_id: int, digest: str, packed: bytes) -> None:
+        self._signatures[row_id] = packed
+        self._digests.add(digest)
+        for key in _band_keys(_PACK.unpack(packed)):
+            self._bands.setdefault(key, []).append(row_id)
+
+    def _nearest(self, signature: List[int]):
+        best = None
+        seen = set()
+        for key in _band_keys(signature):
+            for row_id in self._bands.get(key, ()):
+                if row_id in seen:
+                    continue
+                seen.add(row_id)
+                score = similarity(signature, _PACK.unpack(self._signatures[row_id]))
+                if score >= self.threshold and (best is None or score > best[1]):
+                    best = (row_id, score)
+        return best
+
+    def find(self, text: str) -> Optional[Match]:
+        """Returns the most similar stored text at or above threshold, or None."""
+        signature = minhash(text)
+        with self._lock:
+            self._refresh()
+            nearest = self._nearest(signature)
+            if nearest is None:
+                return None
+            row_id, score = nearest
+            stored, source = self._conn.execute(
+                "SELECT text, source FROM signatures WHERE id = ?", (row_id,)
+            ).fetchone()
+        return Match(row_id, stored, source, score)
+
+    def is_duplicate(self, text: str) -> bool:
+        return self.find(text) is not None
+
+    def add(self, text: str, source: str = "generated") -> None:
+        """Records a text. Exact repeats (after normalization) are ignored."""
+        digest = hashlib.sha1(_normalize(text).encode("utf-8")).hexdigest()
+        packed = _PACK.pack(*minhash(text))
+        with self._lock:
+            self._refresh()
+            if digest in self._digests:
+                return
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO signatures (digest, signature, text, source, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (digest, packed, text, source, time.time()),
+                )
+            if cursor.rowcount:
+                self._remember(cursor.lastrowid, digest, packed)
+
+    def check_and_add(self, text: str, source: str = "generated") -> Optional[Match]:
+        """Adds the text unless it is a near-duplicate; returns the match that blocked it, if any."""
+        match = self.find(text)
+        if match is None:
+            self.add(text, source)
+        return match
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_default_index: Optional[DuplicateIndex] = None
+_default_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[DuplicateIndex]:
+    """Process-wide index, or None when disabled with DEDUPE_DISABLED=1."""
+    global _default_index
+    if os.getenv("DEDUPE_DISABLED") == "1":
+        return None
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = DuplicateIndex()
+        return _default_index
+
+
+def record_posted(text: str) -> None:
+    """Adds a published text to the shared index (no-op when disabled or on error)."""
+    try:
+        index = get_index()
+        if index is not None:
+            index.add(text, source="posted")
+    except Exception as e:
+        print(f"Failed to record posted text in the duplicate index: {e}")
@@ -1,7 +1,16 @@
-import gspread
-from google.oauth2.service_account import Credentials
+import hashlib
+import json
 import os
-import streamlit as st
+import random
+import sys
+import threading
+import time
+
+# gspread and google-auth are imported on first use. streamlit is only used to read
+# st.secrets and is never imported when running headless without a secrets.toml.
+from dedupe import get_index
+from metrics import error_class, observe, record_retry
+from rate_limit import get_limiter
 
 # Constants
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -14,12 +23,73 @@ SCOPES = [
     'https://www.googleapis.com/auth/drive'
 ]
 
-def get_worksheet(sheet_name=SHEET_NAME):
-    """Authenticates and returns the worksheet object."""
+# Queue layout.
+# "move"  : pop takes A1, appends it to the bottom of Column C and shifts Column A up.
+# "cursor": items stay in Column A, Column B holds a status/lease per row and
+#           HEAD_CELL stores the 1-based row of the next pending item, so a pop
+#           touches a constant number of cells. compact_queue() converts the
+#           consumed rows back to the "move" layout.
+QUEUE_MODE = os.getenv("SHEETS_QUEUE_MODE", "move")
+HEAD_CELL = "Z1"
+STATUS_LEASED = "LEASED"
+STATUS_DONE = "DONE"
+STATUS_FAILED = "FAILED"
+# Rows read past the head per pop, so blank cells left by manual edits are skipped.
+POP_LOOKAHEAD = 10
+
+FAILED_FORMAT = {
+    "backgroundColor": {
+        "red": 1.0,
+        "green": 0.8,
+        "blue": 0.8
+    }
+}
+
+# Handle cache: authorizing and opening the spreadsheet costs several OAuth and
+# metadata round-trips, so the client, spreadsheet and worksheets are reused
+# process-wide and only rebuilt after HANDLE_TTL_SECONDS or an auth failure.
+HANDLE_TTL_SECONDS = int(os.getenv("SHEETS_HANDLE_TTL_SECONDS", "1800"))
+
+_cache_lock = threading.RLock()
+_client_cache = {"client": None, "spreadsheet": None, "created_at": 0.0}
+_worksheet_cache = {}
+_head_cache = {}
+_snapshot_cache = {}
+# Bumped by every write of this process, so a queue snapshot knows it is out of date
+# without asking the spreadsheet.
+_local_writes = [0]
+# Serializes this process's pops per sheet, across threads and snapshots.
+_pop_locks = {}
+# Set when Drive metadata cannot be read (e.g. no Drive scope); revision checks are
+# then skipped until the handles are rebuilt.
+_revision_state = {"unavailable": False}
+
+
+def _streamlit():
+    """The streamlit module if it is running or a secrets.toml exists, otherwise None."""
+    if "streamlit" not in sys.modules:
+        candidates = [
+            os.path.join(os.getcwd(), ".streamlit", "secrets.toml"),
+            os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml"),
+        ]
+        if not any(os.path.isfile(path) for path in candidates):
+            return None
+    try:
+        import streamlit
+    except ImportError:
+        return None
+    return streamlit
+
+
+def _load_credentials():
+    """Builds service account credentials from Streamlit secrets or the local key file."""
+    from google.oauth2.service_account import Credentials
+
     credentials = None
+    st = _streamlit()
     
     # 1. Try Streamlit Secrets (Best for Cloud)
-    if "gcp_service_account" in st.secrets:
+    if st is not None and "gcp_service_account" in st.secrets:
         try:
             # st.secrets returns a AttrDict, convert to standard dict for google-auth
             creds_dict = dict(st.secrets["gcp_service_account"])
@@ -41,45 +111,560 @@ def get_worksheet(sheet_name=SHEET_NAME):
             "Streamlit Secrets에 'gcp_service_account'를 설정하거나 "
             "로컬에 JSON 키 파일이 있는지 확인해주세요."
         )
+    return credentials
 
-    gc = gspread.authorize(credentials)
-    sh = gc.open_by_key(SPREADSHEET_ID)
-    try:
-        worksheet = sh.worksheet(sheet_name)
-    except gspread.WorksheetNotFound:
-        # Try to create if not found, or list available
+
+def invalidate_cache():
+    """Drops the cached client, spreadsheet and worksheet handles."""
+    with _cache_lock:
+        _client_cache["client"] = None
+        _client_cache["spreadsheet"] = None
+        _client_cache["created_at"] = 0.0
+        _worksheet_cache.clear()
+        _head_cache.clear()
+        _snapshot_cache.clear()
+        _revision_state["unavailable"] = False
+
+
+def get_spreadsheet():
+    """
+    Returns the cached spreadsheet handle, re-authorizing when the TTL has expired.
+    Opening the spreadsheet counts against the "sheets" rate limiter; call it through
+    _with_spreadsheet / _with_worksheet so 401 and 429 errors are retried.
+    """
+    import gspread
+
+    with _cache_lock:
+        age = time.monotonic() - _client_cache["created_at"]
+        if _client_cache["spreadsheet"] is None or age > HANDLE_TTL_SECONDS:
+            _worksheet_cache.clear()
+            gc = gspread.authorize(_load_credentials())
+            get_limiter("sheets").acquire()
+            _client_cache["client"] = gc
+            _client_cache["spreadsheet"] = gc.open_by_key(SPREADSHEET_ID)
+            _client_cache["created_at"] = time.monotonic()
+        return _client_cache["spreadsheet"]
+
+
+def get_worksheet(sheet_name=SHEET_NAME):
+    """Authenticates (once per TTL) and returns the cached worksheet object."""
+    import gspread
+
+    with _cache_lock:
+        sh = get_spreadsheet()
+        worksheet = _worksheet_cache.get(sheet_name)
+        if worksheet is not None:
+            return worksheet
+
+        limiter = get_limiter("sheets")
+        limiter.acquire()
         try:
-            worksheet = sh.add_worksheet(title=sheet_name, rows=1000, cols=26)
-        except Exception:
-            available_sheets = [s.title for s in sh.worksheets()]
-            raise ValueError(f"Worksheet '{sheet_name}' not found and could not be created. Available sheets: {available_sheets}")
-        
-    return worksheet
+            worksheet = sh.worksheet(sheet_name)
+        except gspread.WorksheetNotFound:
+            # Try to create if not found, or list available
+            try:
+                limiter.acquire()
+                worksheet = sh.add_worksheet(title=sheet_name, rows=1000, cols=26)
+            except Exception:
+                limiter.acquire()
+                available_sheets = [s.title for s in sh.worksheets()]
+                raise ValueError(f"Worksheet '{sheet_name}' not found and could not be created. Available sheets: {available_sheets}")
+
+        _worksheet_cache[sheet_name] = worksheet
+        return worksheet
+
+
+def _note_local_write():
+    with _cache_lock:
+        _local_writes[0] += 1
+
+
+def _status_code(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _is_auth_error(error):
+    return _status_code(error) == 401
+
+
+def _with_worksheet(sheet_name, operation, requests=1, retry_on_throttle=True, stage="sheets.read"):
+    """
+    Runs operation(worksheet) on the cached handle, timing each attempt under `stage`.
+
+    The operation first acquires `requests` slots from the shared "sheets" rate limiter.
+    On a 401 the cache is dropped and the operation retried once with fresh credentials.
+    On a 429 the limiter is slowed down and the operation retried with backoff, unless
+    retry_on_throttle is False (operations that may have partially applied).
+    """
+    if stage != "sheets.read":
+        _note_local_write()
+    return _with_handle(lambda: get_worksheet(sheet_name), operation, requests, retry_on_throttle, stage)
+
+
+def _with_spreadsheet(operation, requests=1, retry_on_throttle=True, stage="sheets.read"):
+    """Like _with_worksheet, for operations on the spreadsheet itself (e.g. values_batch_get)."""
+    return _with_handle(get_spreadsheet, operation, requests, retry_on_throttle, stage)
+
+
+def _with_handle(resolve, operation, requests, retry_on_throttle, stage):
+    import gspread
+
+    limiter = get_limiter("sheets")
+    max_retries = 4
+    reauthorized = False
+
+    for attempt in range(max_retries + 1):
+        for _ in range(requests):
+            limiter.acquire()
+        start = time.perf_counter()
+        try:
+            result = operation(resolve())
+        except Exception as e:
+            observe(stage, time.perf_counter() - start, error_class(e))
+            if not isinstance(e, gspread.exceptions.APIError):
+                raise
+            if _is_auth_error(e) and not reauthorized:
+                invalidate_cache()
+                reauthorized = True
+                record_retry(stage, "reauth")
+                continue
+            if _status_code(e) == 429 and retry_on_throttle and attempt < max_retries:
+                record_retry(stage, "429")
+                limiter.on_throttle()
+                time.sleep(min(60, 2 ** attempt + random.random()))
+                continue
+            raise
+        observe(stage, time.perf_counter() - start)
+        limiter.on_success()
+        return result
 
 def append_to_sheet(text: str, sheet_name=SHEET_NAME):
     """Appends the given text to the next available row in Column A of the specified sheet."""
-    ws = get_worksheet(sheet_name)
-    ws.append_row([text])
+    _with_worksheet(sheet_name, lambda ws: ws.append_row([text]), stage="sheets.write")
 
-def get_all_from_queue():
-    """Reads all items from Column A of the default Thread sheet."""
-    ws = get_worksheet(SHEET_NAME)
-    col_a = ws.col_values(1)
-    return col_a
+class SheetWriter:
+    """
+    Buffers rows per target sheet and writes them with a single append_rows call
+    once max_rows rows are pending or max_delay seconds have passed since the last flush.
+    Use it as a context manager so the remaining rows are flushed on exit, including on errors.
+    Texts that are near-duplicates of anything already queued or posted (see dedupe.py)
+    are skipped; pass dedupe=False to write everything. Callables in flush_listeners are
+    called with (sheet_name, rows) for every append_rows that succeeded, whichever flush
+    (automatic, explicit or on exit) wrote them.
 
-def pop_from_queue(sheet_name=SHEET_NAME):
+    Example:
+        with SheetWriter() as writer:
+            writer.append(text)
+            writer.append(translated, sheet_name="영어")
     """
-    Reads the top item from Column A of the specified sheet, 
-    moves it to the bottom of Column C,
-    and shifts Column A up (deleting the processed item from A).
+
+    def __init__(self, max_rows=50, max_delay=10.0, dedupe=True):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.rows_written = 0
+        self.rows_skipped = 0
+        # An explicit index is kept even when empty (DuplicateIndex defines __len__).
+        self.dedupe = get_index() if dedupe is True else (None if dedupe is False else dedupe)
+        self.flush_listeners = []
+        self._buffers = {}
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def append(self, text: str, sheet_name=SHEET_NAME, source=None) -> bool:
+        """
+        Queues text for Column A of the specified sheet, flushing if a threshold is reached.
+        Returns False if the text was skipped as a near-duplicate.
+
+        The text is indexed as "queued" unless source names the item (e.g. "batch:3:post-7"):
+        a match recorded under that same source is the item's own entry from an earlier run
+        whose flush failed, so the item is written instead of skipped.
+        """
+        if self.dedupe is not None:
+            match = self.dedupe.check_and_add(text, source=source or "queued")
+            if match is not None and (source is None or match.source != source):
+                self.rows_skipped += 1
+                return False
+        with self._lock:
+            self._buffers.setdefault(sheet_name, []).append([text])
+            pending = sum(len(rows) for rows in self._buffers.values())
+        if pending >= self.max_rows or time.monotonic() - self._last_flush >= self.max_delay:
+            self.flush()
+        return True
+
+    def flush(self):
+        """Writes every buffered row, one append_rows request per sheet."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            self._last_flush = time.monotonic()
+
+        items = list(buffers.items())
+        written = []
+        try:
+            for index, (sheet_name, rows) in enumerate(items):
+                try:
+                    _with_worksheet(sheet_name, lambda ws: ws.append_rows(rows), stage="sheets.write")
+                except Exception:
+                    # Put back the failed sheet's rows and those of every sheet not written yet,
+                    # so a later flush can retry them.
+                    with self._lock:
+                        for name, unwritten in items[index:]:
+                            self._buffers[name] = unwritten + self._buffers.get(name, [])
+                    raise
+                self.rows_written += len(rows)
+                written.append((sheet_name, rows))
+        finally:
+            # Listeners run after the buffers are consistent, also for the sheets written
+            # before a failure.
+            for sheet_name, rows in written:
+                for listener in list(self.flush_listeners):
+                    listener(sheet_name, rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.flush()
+        except Exception as e:
+            # Do not mask the original error with a flush failure.
+            if exc_type is None:
+                raise
+            unsent = sum(len(rows) for rows in self._buffers.values())
+            print(f"Failed to flush {unsent} buffered rows: {e}")
+        return False
+
+def get_all_from_queue(sheet_name=SHEET_NAME, mode=None):
+    """Reads all pending items from Column A of the specified sheet (the default Thread sheet)."""
+    if (mode or QUEUE_MODE) == "cursor":
+        def _pending(ws):
+            col_a = ws.col_values(1)
+            head = _read_head(ws)
+            return [text for text in col_a[head - 1:] if text]
+        return _with_worksheet(sheet_name, _pending, requests=2)
+    return _with_worksheet(sheet_name, lambda ws: ws.col_values(1))
+
+def has_pending(sheet_name=SHEET_NAME, mode=None):
+    """Returns True if the specified sheet still has items waiting in Column A."""
+    if (mode or QUEUE_MODE) == "cursor":
+        def _peek(ws):
+            head = _read_head(ws)
+            window = ws.get(f"A{head}:A{head + POP_LOOKAHEAD - 1}")
+            return any(row and row[0] for row in window)
+        return _with_worksheet(sheet_name, _peek, requests=2)
+    return bool(_with_worksheet(sheet_name, lambda ws: ws.col_values(1)))
+
+def _quote_sheet(sheet_name):
+    return "'" + sheet_name.replace("'", "''") + "'"
+
+
+class SheetQueue:
+    """Queue state of one sheet inside a QueueSnapshot."""
+
+    def __init__(self, name, col_a, col_c=None, head=1):
+        self.name = name
+        self.col_a = col_a
+        self.col_c = col_c or []
+        self.head = head
+
+    def pending(self):
+        return [text for text in self.col_a[self.head - 1:] if text]
+
+    def has_pending(self):
+        return any(self.col_a[self.head - 1:])
+
+    def next_item(self):
+        """(text, row) of the next pending item, or (None, None)."""
+        for row in range(self.head, len(self.col_a) + 1):
+            if self.col_a[row - 1]:
+                return self.col_a[row - 1], row
+        return None, None
+
+
+class QueueSnapshot:
+    """
+    Column A (plus Column C or the head cell) of several queue sheets, read in one
+    values_batch_get request. revision is the spreadsheet's Drive modifiedTime (None if
+    Drive metadata is unavailable) and checksum a digest of the values; changed is False
+    when the values are identical to the previous snapshot of the same sheets.
+    """
+
+    def __init__(self, sheets, mode, revision=None, checksum=None, changed=True):
+        self.sheets = sheets
+        self.mode = mode
+        self.revision = revision
+        self.checksum = checksum
+        self.changed = changed
+        self.fetched_at = time.time()
+        self.local_writes = _local_writes[0]
+        # Pops through the same snapshot are serialized so each one sees the previous.
+        self.lock = threading.Lock()
+
+    def __getitem__(self, sheet_name):
+        return self.sheets[sheet_name]
+
+    def pending(self, sheet_name):
+        return self.sheets[sheet_name].pending()
+
+    def has_pending(self, sheet_name):
+        return self.sheets[sheet_name].has_pending()
+
+    def is_empty(self):
+        return not any(queue.has_pending() for queue in self.sheets.values())
+
+    def next_sheet(self, start=0, order=None):
+        """
+        Round-robin choice: the first sheet with pending items, starting at position
+        `start` of `order` (default: the snapshot's sheet order). Returns (sheet, offset)
+        where offset is how many sheets were skipped, or (None, len(order)) when all are empty.
+        """
+        order = list(order or self.sheets)
+        for offset in range(len(order)):
+            name = order[(start + offset) % len(order)]
+            if self.sheets[name].has_pending():
+                return name, offset
+        return None, len(order)
+
+
+def _parse_snapshot(sheet_names, mode, value_ranges):
+    sheets = {}
+    columns = iter(value_ranges)
+    for name in sheet_names:
+        col_a = next(columns).get("values", [[]])[0]
+        if mode == "cursor":
+            head = _parse_head(next(columns).get("values", []))
+            sheets[name] = SheetQueue(name, col_a, head=head)
+            _head_cache[name] = head
+        else:
+            sheets[name] = SheetQueue(name, col_a, col_c=next(columns).get("values", [[]])[0])
+    return sheets
+
+
+def _spreadsheet_revision():
+    """The spreadsheet's Drive modifiedTime, or None if it cannot be read (e.g. missing Drive scope)."""
+    if _revision_state["unavailable"]:
+        return None
+    try:
+        return _with_spreadsheet(lambda sh: sh.get_lastUpdateTime(), stage="sheets.revision")
+    except Exception as e:
+        _revision_state["unavailable"] = True
+        print(f"Spreadsheet revision unavailable, queue snapshots are always re-read: {e}")
+        return None
+
+
+def queue_snapshot(sheet_names=(SHEET_NAME,), mode=None, refresh=False):
+    """
+    Returns the queue state of the given sheets, reading them all in one request.
+
+    The previous snapshot of the same sheets is reused (no values read) when this process
+    has not written to the spreadsheet since and its Drive revision is unchanged. After a
+    write of our own the values are re-read directly, without a revision check, so a
+    posting tick costs one read and an idle tick one small metadata request. Use
+    refresh=True to always re-read. Pass the snapshot to pop_from_queue(snapshot=...) so
+    the pop itself needs no reads.
+    """
+    mode = mode or QUEUE_MODE
+    sheet_names = tuple(sheet_names)
+    key = (sheet_names, mode)
+    with _cache_lock:
+        previous = _snapshot_cache.get(key)
+    if previous is not None and not refresh and previous.local_writes == _local_writes[0]:
+        if previous.revision is not None and _spreadsheet_revision() == previous.revision:
+            previous.changed = False
+            return previous
+
+    # Worksheets are resolved (and created if missing) first: batchGet fails on unknown sheets.
+    for name in sheet_names:
+        if name not in _worksheet_cache:
+            _with_handle(lambda: get_worksheet(name), lambda ws: ws, 0, True, "sheets.open")
+    ranges = []
+    for name in sheet_names:
+        ranges.append(f"{_quote_sheet(name)}!A:A")
+        ranges.append(f"{_quote_sheet(name)}!{HEAD_CELL}" if mode == "cursor" else f"{_quote_sheet(name)}!C:C")
+
+    # The revision is read before the values, so a later equal revision means nothing changed since.
+    wrote = previous is not None and previous.local_writes != _local_writes[0]
+    revision = None if wrote else _spreadsheet_revision()
+    response = _with_spreadsheet(
+        lambda sh: sh.values_batch_get(ranges, params={"majorDimension": "COLUMNS"}), stage="sheets.snapshot"
+    )
+    value_ranges = response.get("valueRanges", [])
+    checksum = hashlib.sha1(json.dumps(value_ranges, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+    snapshot = QueueSnapshot(
+        _parse_snapshot(sheet_names, mode, value_ranges), mode, revision=revision, checksum=checksum,
+        changed=previous is None or previous.checksum != checksum,
+    )
+    with _cache_lock:
+        _snapshot_cache[key] = snapshot
+    return snapshot
+
+
+def pop_from_queue(sheet_name=SHEET_NAME, mode=None, snapshot=None):
+    """
+    Reads the top item from Column A of the specified sheet.
+
+    In "move" mode the item is moved to the bottom of Column C
+    and Column A is shifted up (deleting the processed item from A).
+    In "cursor" mode the item stays in place, its Column B status is set to a lease
+    and the head pointer is advanced in a single batched write.
     
+    With a QueueSnapshot (see queue_snapshot) that holds the sheet, the item and the
+    rows to rewrite are taken from the snapshot after one small read confirming it still
+    matches the sheet (otherwise the sheet is read again), and the snapshot is updated
+    to reflect the pop. Pops of the same sheet are serialized within the process.
+
     Returns:
-        tuple: (text, row_index_in_C) or (None, None)
+        tuple: (text, row_index) or (None, None).
+        row_index is the row in Column C ("move") or Column A ("cursor").
     """
-    ws = get_worksheet(sheet_name)
-    
-    # 1. Read all values from Column A
-    col_a = ws.col_values(1)
+    if snapshot is not None and sheet_name in snapshot.sheets:
+        return _pop_from_snapshot(sheet_name, snapshot)
+    with _pop_lock(sheet_name):
+        if (mode or QUEUE_MODE) == "cursor":
+            return _with_worksheet(sheet_name, _pop_with_cursor, requests=2, stage="sheets.pop")
+        return _with_worksheet(sheet_name, _pop_and_move, requests=5, retry_on_throttle=False, stage="sheets.pop")
+
+def _pop_lock(sheet_name):
+    with _cache_lock:
+        return _pop_locks.setdefault(sheet_name, threading.Lock())
+
+def _cell_value(values):
+    return values[0][0] if values and values[0] else ""
+
+def _pop_from_snapshot(sheet_name, snapshot):
+    with snapshot.lock, _pop_lock(sheet_name):
+        return _pop_from_snapshot_locked(sheet_name, snapshot)
+
+def _pop_from_snapshot_locked(sheet_name, snapshot):
+    # The snapshot may be stale (another process popped or the sheet was edited since it
+    # was read), so the cells the pop relies on are re-read in one small request first;
+    # on a mismatch the pop falls back to the regular read-then-write path.
+    queue = snapshot[sheet_name]
+    if snapshot.mode == "cursor":
+        text, row = queue.next_item()
+        if text is None:
+            return None, None
+        def _lease(ws):
+            head_values, current = ws.batch_get([HEAD_CELL, f"A{row}"])
+            persisted_head = _parse_head(head_values)
+            if persisted_head != queue.head or _cell_value(current) != text:
+                _head_cache[ws.title] = persisted_head
+                return _pop_with_cursor(ws)
+            lease = f"{STATUS_LEASED} {time.strftime('%Y-%m-%dT%H:%M:%S')}"
+            ws.batch_update([
+                {"range": f"B{row}", "values": [[lease]]},
+                {"range": HEAD_CELL, "values": [[row + 1]]},
+            ])
+            _head_cache[ws.title] = row + 1
+            return text, row
+        result = _with_worksheet(sheet_name, _lease, requests=2, stage="sheets.pop")
+        queue.head = _head_cache.get(sheet_name, queue.head)
+    else:
+        if not queue.col_a:
+            return None, None
+        def _move(ws):
+            col_a, col_c = list(queue.col_a), list(queue.col_c)
+            last = len(col_a)
+            first, tail = ws.batch_get(["A1", f"A{last}:A{last + 1}"])
+            # A1 and the end of Column A (nothing appended past it) must match the snapshot.
+            if _cell_value(first) != col_a[0] or [r[0] if r else "" for r in tail] != [col_a[-1]]:
+                record_retry("sheets.pop", "stale_snapshot")
+                col_a, col_c = ws.col_values(1), ws.col_values(3)
+            return _pop_and_move(ws, col_a, col_c), col_a, col_c
+        result, col_a, col_c = _with_worksheet(
+            sheet_name, _move, requests=4, retry_on_throttle=False, stage="sheets.pop",
+        )
+        if result[0] is not None:
+            queue.col_a = col_a[1:]
+            queue.col_c = col_c + [result[0]]
+        else:
+            queue.col_a, queue.col_c = [], col_c
+    # The pop is applied to the snapshot so callers can keep using it within this tick;
+    # the next queue_snapshot() call re-reads because of the write.
+    return result
+
+def _parse_head(values):
+    try:
+        return max(1, int(values[0][0]))
+    except (IndexError, TypeError, ValueError):
+        return 1
+
+def _read_head(ws):
+    head = _parse_head(ws.get(HEAD_CELL))
+    _head_cache[ws.title] = head
+    return head
+
+def _pop_with_cursor(ws):
+    # The cached head lets the head cell and the item window share one read.
+    # If another process advanced the head in the meantime, read again from there.
+    head = _head_cache.get(ws.title, 1)
+    head_values, window = ws.batch_get([HEAD_CELL, f"A{head}:A{head + POP_LOOKAHEAD - 1}"])
+    persisted_head = _parse_head(head_values)
+    if persisted_head != head:
+        head = persisted_head
+        window = ws.get(f"A{head}:A{head + POP_LOOKAHEAD - 1}")
+
+    for offset, row in enumerate(window):
+        if row and row[0]:
+            row_index = head + offset
+            lease = f"{STATUS_LEASED} {time.strftime('%Y-%m-%dT%H:%M:%S')}"
+            ws.batch_update([
+                {"range": f"B{row_index}", "values": [[lease]]},
+                {"range": HEAD_CELL, "values": [[row_index + 1]]},
+            ])
+            _head_cache[ws.title] = row_index + 1
+            return row[0], row_index
+
+    _head_cache[ws.title] = head
+    return None, None
+
+def ack_item(sheet_name, row_index, mode=None):
+    """Marks a popped cursor-mode item as posted. No-op in "move" mode."""
+    if (mode or QUEUE_MODE) != "cursor" or not row_index:
+        return
+    _with_worksheet(sheet_name, lambda ws: ws.update(range_name=f"B{row_index}", values=[[STATUS_DONE]]), stage="sheets.write")
+
+def compact_queue(sheet_name=SHEET_NAME):
+    """
+    Converts consumed cursor-mode rows to the "move" layout:
+    rows above the head are appended to Column C (failed ones in red),
+    the pending rows are shifted to the top of Columns A:B and the head is reset.
+
+    Returns:
+        int: number of rows moved to Column C.
+    """
+    def _compact(ws):
+        rows, col_c, head_values = ws.batch_get(["A:B", "C:C", HEAD_CELL])
+        head = _parse_head(head_values)
+        consumed = rows[:head - 1]
+        if not consumed:
+            return 0
+
+        pending = rows[head - 1:]
+        padded = [(list(row) + ["", ""])[:2] for row in pending]
+        padded += [["", ""]] * len(consumed)
+        start_c = len(col_c) + 1
+        moved = [[(row[0] if row else "")] for row in consumed]
+
+        ws.batch_update([
+            {"range": f"A1:B{len(padded)}", "values": padded},
+            {"range": f"C{start_c}:C{start_c + len(moved) - 1}", "values": moved},
+            {"range": HEAD_CELL, "values": [[1]]},
+        ])
+        _head_cache[ws.title] = 1
+
+        if hasattr(ws, 'format'):
+            for offset, row in enumerate(consumed):
+                if len(row) > 1 and row[1] == STATUS_FAILED:
+                    ws.format(f"C{start_c + offset}", FAILED_FORMAT)
+        return len(consumed)
+
+    return _with_worksheet(sheet_name, _compact, requests=2, retry_on_throttle=False, stage="sheets.write")
+
+def _pop_and_move(ws, col_a=None, col_c=None):
+    # 1. Read all values from Column A (unless a snapshot already has them)
+    if col_a is None:
+        col_a = ws.col_values(1)
     
     if not col_a:
         return None, None
@@ -88,7 +673,8 @@ def pop_from_queue(sheet_name=SHEET_NAME):
     
     # 2. Append to Column C
     # Find the first empty row in Column C
-    col_c = ws.col_values(3)
+    if col_c is None:
+        col_c = ws.col_values(3)
     next_row_c = len(col_c) + 1
     ws.update_cell(next_row_c, 3, text)
     
@@ -109,23 +695,24 @@ def pop_from_queue(sheet_name=SHEET_NAME):
         
     return text, next_row_c
 
-def mark_as_failed(sheet_name, row_index):
-    """Marks the cell at Column C, row_index as failed (Red background)."""
+def mark_as_failed(sheet_name, row_index, mode=None):
+    """
+    Marks a popped item as failed (Red background).
+    "move" mode formats Column C at row_index; "cursor" mode also sets the Column B status
+    and formats the item in Column A.
+    """
+    cursor = (mode or QUEUE_MODE) == "cursor"
     try:
-        ws = get_worksheet(sheet_name)
-        # Light red background
-        fmt = {
-            "backgroundColor": {
-                "red": 1.0,
-                "green": 0.8,
-                "blue": 0.8
-            }
-        }
-        # Check if format method exists (gspread v6+)
-        if hasattr(ws, 'format'):
-            ws.format(f"C{row_index}", fmt)
-        else:
-            # Fallback or ignore if not supported
-            pass
+        def _format(ws):
+            if cursor:
+                ws.update(range_name=f"B{row_index}", values=[[STATUS_FAILED]])
+            # Check if format method exists (gspread v6+)
+            if hasattr(ws, 'format'):
+                ws.format(f"{'A' if cursor else 'C'}{row_index}", FAILED_FORMAT)
+            else:
+                # Fallback or ignore if not supported
+                pass
+
+        _with_worksheet(sheet_name, _format, requests=2, stage="sheets.write")
     except Exception as e:
         print(f"Failed to format cell: {e}")
@@ -0,0 +1,111 @@
+"""
+Persistent, content-addressed cache for LLM results.
+
+Entries are keyed by a SHA-256 of (kind, text, target language, model, prompt version),
+so a re-run of the translation tab over items that were already translated is served
+from disk instead of the LLM. Entries older than max_age_seconds are ignored and pruned,
+and the least recently used entries are evicted once max_entries is exceeded.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(BASE_DIR, "llm_cache.sqlite3"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+"""
+
+
+def cache_key(kind: str, text: str, target: str, model: str, prompt_version: str) -> str:
+    """Content address of one LLM result."""
+    digest = hashlib.sha256()
+    for part in (kind, text, target, model, prompt_version):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class LLMCache:
+    """SQLite-backed key/value store for LLM outputs with size and age based eviction."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries: int = 50000, max_age_seconds: float = 90 * 24 * 3600):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self.prune()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str, kind: str = "") -> None:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, kind, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, value, now, now),
+            )
+            self._writes += 1
+        if self._writes % 1000 == 0:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drops expired entries and the least recently used ones beyond max_entries."""
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (time.time() - self.max_age_seconds,)
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        return removed
+
+    def close(self) -> None:
+        self.prune()
+        self._conn.close()
+
+
+_default_cache: Optional[LLMCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_cache() -> Optional[LLMCache]:
+    """Process-wide cache, or None when disabled with LLM_CACHE_DISABLED=1."""
+    global _default_cache
+    if os.getenv("LLM_CACHE_DISABLED") == "1":
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
@@ -0,0 +1,394 @@
+"""
+Hedged requests and automatic failover between LLM backends.
+
+FailoverGenerator is a ContentGenerator over several backends (one ContentGenerator per
+model, e.g. Gemini and GPT) that share one conversation:
+  - Routing: backends whose circuit breaker is open are skipped; of the rest, the first
+    configured one is used unless another has been clearly faster recently (p50 latency
+    more than latency_margin times lower).
+  - Hedging: when the primary has not answered within its recent p95 latency (clamped to
+    hedge_min_delay..hedge_max_delay), the same turn is sent to the next backend and the
+    first answer wins. The other request is cancelled if it has not started yet; a running
+    SDK call cannot be interrupted, so its answer is discarded when it arrives.
+  - Failover: an error moves the turn to the next backend immediately. Backends are built
+    with max_retries=1, so an overloaded provider is not waited out with 2+4+8+16s backoffs.
+  - Circuit breakers: breaker_threshold consecutive failures open a backend's breaker for
+    breaker_reset seconds; after that a single trial request decides whether it closes.
+
+Only the winning answer is added to the shared history, so every backend continues the
+same conversation. Streaming hedges and fails over the same way on the time to the first
+chunk (tracked separately from full-answer latencies); once a stream has produced its
+first chunk it is used to the end. Translations and summaries fail over sequentially
+without hedging. Log lines and translation cache entries name the backend that answered.
+
+    generator = FailoverGenerator.from_models(["gemini-2.5-flash", "gpt-4o"])
+    text = generator.generate("...")
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+from metrics import error_class, record_retry
+from post_to_threads import ContentGenerator, Logger, _emit
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single trial request after the reset timeout."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BREAKER_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a request may be sent now; in half-open state only one trial at a time."""
+        with self._lock:
+            if self.state == BREAKER_OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = BREAKER_HALF_OPEN
+            if self.state == BREAKER_CLOSED:
+                return True
+            if self.state == BREAKER_HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def available(self) -> bool:
+        """Like allow() but without claiming the trial request (for routing decisions)."""
+        with self._lock:
+            if self.state == BREAKER_OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return self.state == BREAKER_CLOSED or not self._trial_running
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = BREAKER_CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the breaker."""
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == BREAKER_HALF_OPEN or (self.state == BREAKER_CLOSED and self.failures >= self.failure_threshold):
+                self.state = BREAKER_OPEN
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+
+class BackendHealth:
+    """Recent latencies (full answers and time to first streamed chunk) and circuit breaker of one backend."""
+
+    def __init__(self, breaker: CircuitBreaker, window: int = 50):
+        self.breaker = breaker
+        self.latencies = deque(maxlen=window)
+        self.first_chunk_latencies = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self.hedges_won = 0
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+            self.successes += 1
+        self.breaker.record_success()
+
+    def record_first_chunk(self, seconds: float) -> None:
+        with self._lock:
+            self.first_chunk_latencies.append(seconds)
+            self.successes += 1
+        self.breaker.record_success()
+
+    def record_failure(self) -> bool:
+        with self._lock:
+            self.failures += 1
+        return self.breaker.record_failure()
+
+    def percentile(self, q: float, min_samples: int = 1, first_chunk: bool = False) -> Optional[float]:
+        with self._lock:
+            samples = self.first_chunk_latencies if first_chunk else self.latencies
+            if len(samples) < min_samples:
+                return None
+            ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class FailoverGenerator(ContentGenerator):
+    def __init__(
+        self,
+        backends: List[ContentGenerator],
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 2.0,
+        hedge_max_delay: float = 30.0,
+        initial_hedge_delay: float = 15.0,
+        min_samples: int = 5,
+        latency_margin: float = 1.5,
+        breaker_threshold: int = 3,
+        breaker_reset: float = 30.0,
+        max_workers: int = 8,
+        logger: Logger = None,
+    ):
+        if not backends:
+            raise ValueError("backends는 비어 있을 수 없습니다.")
+        if len({backend.model for backend in backends}) != len(backends):
+            raise ValueError("백엔드마다 다른 모델이어야 합니다.")
+        primary = backends[0]
+        # The generator itself holds the shared conversation; dedupe and the translation
+        # cache are the primary's.
+        super().__init__(
+            model=primary.model,
+            logger=logger or primary.logger,
+            history_policy=primary.history_policy,
+            cache=primary.cache,
+            use_cache=False,
+            dedupe=primary.dedupe,
+            use_dedupe=False,
+            max_regenerations=primary.max_regenerations,
+            client=primary.client,
+            use_prompt_cache=False,
+        )
+        self.system_prompt = primary.system_prompt
+        self.backends = list(backends)
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_samples = min_samples
+        self.latency_margin = latency_margin
+        self.health: Dict[str, BackendHealth] = {
+            backend.model: BackendHealth(CircuitBreaker(breaker_threshold, breaker_reset)) for backend in backends
+        }
+        self.max_workers = max(max_workers, 2 * len(backends))
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Model of the backend that produced the last answer, per calling thread.
+        self._answered = threading.local()
+
+    @classmethod
+    def from_models(cls, models: List[str], clients: Optional[dict] = None, **kwargs) -> "FailoverGenerator":
+        """Builds one fail-fast ContentGenerator per model (clients: optional {model: client})."""
+        clients = clients or {}
+        backends = [
+            ContentGenerator(model=model, logger=kwargs.get("logger"), max_retries=1, client=clients.get(model))
+            for model in models
+        ]
+        return cls(backends, **kwargs)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # Created on the first request. Abandoned hedge losers keep a worker until their
+        # SDK call returns, hence the headroom.
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="llm-failover")
+            return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # --- Routing ---
+
+    def _route(self) -> List[ContentGenerator]:
+        """Backends with a closed (or trial-ready) breaker, the preferred one first."""
+        candidates = [b for b in self.backends if self.health[b.model].breaker.available()]
+        if len(candidates) < 2:
+            return candidates
+        first = candidates[0]
+        first_p50 = self.health[first.model].percentile(0.5, self.min_samples)
+        fastest = min(
+            candidates[1:],
+            key=lambda b: self.health[b.model].percentile(0.5, self.min_samples) or float("inf"),
+        )
+        fastest_p50 = self.health[fastest.model].percentile(0.5, self.min_samples)
+        if first_p50 is not None and fastest_p50 is not None and fastest_p50 * self.latency_margin < first_p50:
+            candidates.remove(fastest)
+            candidates.insert(0, fastest)
+        return candidates
+
+    def _hedge_delay(self, backend: ContentGenerator, first_chunk: bool = False) -> float:
+        p95 = self.health[backend.model].percentile(self.hedge_quantile, self.min_samples, first_chunk)
+        delay = self.initial_hedge_delay if p95 is None else p95
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, delay))
+
+    def _share_history(self, backend: ContentGenerator) -> None:
+        # Backends only read the conversation (via _conversation); _record updates it here.
+        backend.pinned, backend.history, backend.summary = self.pinned, self.history, self.summary
+
+    def _run(self, backend: ContentGenerator, prompt: str) -> str:
+        health = self.health[backend.model]
+        if not health.breaker.allow():
+            raise RuntimeError(f"{backend.model} 차단 중 (서킷 브레이커)")
+        start = time.perf_counter()
+        try:
+            content = backend._request(prompt)
+        except Exception:
+            if health.record_failure():
+                _emit(f"🚫 {backend.model} 연속 실패로 {health.breaker.reset_timeout:g}초간 사용하지 않습니다.", self.logger)
+            raise
+        health.record_success(time.perf_counter() - start)
+        return content
+
+    def _open_stream(self, backend: ContentGenerator, prompt: str):
+        """Opens a stream on backend and waits for its first chunk. Returns (first, chunks)."""
+        health = self.health[backend.model]
+        if not health.breaker.allow():
+            raise RuntimeError(f"{backend.model} 차단 중 (서킷 브레이커)")
+        start = time.perf_counter()
+        chunks = backend._stream_chunks(prompt)
+        try:
+            # The first chunk is fetched inside the backend's limiter; errors surface here.
+            first = next(chunks, None)
+        except Exception:
+            if health.record_failure():
+                _emit(f"🚫 {backend.model} 연속 실패로 {health.breaker.reset_timeout:g}초간 사용하지 않습니다.", self.logger)
+            raise
+        health.record_first_chunk(time.perf_counter() - start)
+        return first, chunks
+
+    def _hedged(self, call, first_chunk: bool = False, discard=None):
+        """
+        Runs call(backend) on the routed backend, hedging on the next one when it is slower
+        than its recent p95 and failing over on errors. Returns (backend, result) of the
+        first success; results of the losers are passed to discard(), if given.
+        """
+        discard = discard or (lambda result: None)
+        order = self._route()
+        if not order:
+            raise RuntimeError("사용 가능한 LLM 백엔드가 없습니다 (모든 백엔드 차단 중).")
+        for backend in order:
+            self._share_history(backend)
+
+        remaining = list(order)
+        pending = {}
+        hedges = set()
+        errors = []
+
+        def _start(backend):
+            pending[self._pool().submit(call, backend)] = backend
+
+        primary = remaining.pop(0)
+        _start(primary)
+        hedge_delay = self._hedge_delay(primary, first_chunk)
+        while pending:
+            done, _ = wait(list(pending), timeout=hedge_delay if remaining else None, return_when=FIRST_COMPLETED)
+            if not done:
+                backend = remaining.pop(0)
+                record_retry("llm.hedge", backend.model)
+                _emit(f"🐢 {primary.model} 응답이 {hedge_delay:.1f}초를 넘어 {backend.model}에도 요청합니다.", self.logger)
+                _start(backend)
+                hedges.add(backend.model)
+                continue
+            winner = None
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    if remaining and not pending:
+                        fallback = remaining.pop(0)
+                        record_retry("llm.failover", error_class(e))
+                        _emit(f"🔀 {backend.model} 실패, {fallback.model}(으)로 전환합니다: {e}", self.logger)
+                        _start(fallback)
+                    continue
+                if winner is None:
+                    winner = (backend, result)
+                else:
+                    discard(result)
+            if winner is None:
+                continue
+            for other in pending:
+                if not other.cancel():
+                    other.add_done_callback(lambda f: f.exception() is None and discard(f.result()))
+            if winner[0].model in hedges:
+                self.health[winner[0].model].hedges_won += 1
+            self._answered.model = winner[0].model
+            return winner
+        raise errors[-1]
+
+    def _answered_by(self) -> str:
+        return getattr(self._answered, "model", self.model)
+
+    def _translation_models(self) -> List[str]:
+        return [backend.model for backend in self.backends]
+
+    # --- ContentGenerator overrides ---
+
+    def _request(self, prompt: str) -> str:
+        """
+        Sends the turn to the routed backend, hedges on the next one when the primary is
+        slower than its recent p95, fails over on errors. Returns the first answer.
+        """
+        return self._hedged(lambda backend: self._run(backend, prompt))[1]
+
+    def _stream_chunks(self, prompt: str):
+        """
+        Streams from the backend whose first chunk arrives first: the next backend is
+        started when the primary's first chunk is slower than its recent p95, or on errors.
+        """
+        # A losing stream is closed so its connection is released.
+        first, chunks = self._hedged(
+            lambda backend: self._open_stream(backend, prompt), first_chunk=True,
+            discard=lambda opened: opened[1].close(),
+        )[1]
+        if first is not None:
+            yield first
+        yield from chunks
+
+    def _complete(self, messages: list, max_tokens: int = 500, json_mode: bool = False) -> str:
+        """Stateless request on the routed backend, failing over sequentially."""
+        errors = []
+        for backend in self._route():
+            health = self.health[backend.model]
+            if not health.breaker.allow():
+                continue
+            start = time.perf_counter()
+            try:
+                content = backend._complete(messages, max_tokens=max_tokens, json_mode=json_mode)
+            except Exception as e:
+                errors.append(e)
+                health.record_failure()
+                record_retry("llm.failover", error_class(e))
+                continue
+            health.record_success(time.perf_counter() - start)
+            self._answered.model = backend.model
+            return content
+        if errors:
+            raise errors[-1]
+        raise RuntimeError("사용 가능한 LLM 백엔드가 없습니다 (모든 백엔드 차단 중).")
+
+    def status(self) -> List[dict]:
+        """One row per backend: breaker state, recent p50/p95 latency (and p95 to first chunk), counters."""
+        rows = []
+        for backend in self.backends:
+            health = self.health[backend.model]
+            rows.append({
+                "model": backend.model,
+                "breaker": health.breaker.state,
+                "p50": health.percentile(0.5),
+                "p95": health.percentile(0.95),
+                "first_chunk_p95": health.percentile(0.95, first_chunk=True),
+                "successes": health.successes,
+                "failures": health.failures,
+                "hedges_won": health.hedges_won,
+            })
+        return rows
@@ -0,0 +1,269 @@
+"""
+Per-stage latency, retry, token and error metrics.
+
+Every outbound round-trip is timed under a stage name:
+  llm.generate, llm.translate, llm.openai, llm.gemini, llm.cache_create,
+  llm.batch_submit, llm.batch_status, llm.batch_results,
+  sheets.read, sheets.write, sheets.pop, sheets.snapshot, sheets.revision,
+  threads.me, threads.create, threads.status, threads.poll, threads.publish, threads.permalink,
+  ratelimit.<provider> (time spent waiting for a rate limiter).
+Hedged and failed-over LLM requests (llm_failover.py) are counted as retries of llm.hedge
+and llm.failover.
+
+The registry keeps a latency histogram per stage plus counters for retries, errors (by
+error class) and LLM tokens. It can be read in three ways:
+  - snapshot(): in-memory summary for the Streamlit chart;
+  - JSONLSink: one JSON line per event, for offline analysis;
+  - serve_prometheus(port): Prometheus text format on http://localhost:<port>/metrics.
+
+METRICS_JSONL_PATH and METRICS_PORT attach the JSONL sink / HTTP endpoint to the
+process-wide registry on first use.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+# Prometheus-style latency buckets in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+
+
+def error_class(error: BaseException) -> str:
+    """Short error label: exception type plus HTTP status when the error carries one."""
+    status = getattr(error, "status", None) or getattr(error, "status_code", None)
+    response = getattr(error, "response", None)
+    if status is None and response is not None:
+        status = getattr(response, "status_code", None) or getattr(response, "status", None)
+    name = type(error).__name__
+    return f"{name}:{status}" if isinstance(status, int) else name
+
+
+class Histogram:
+    """Cumulative bucket counts plus a window of recent samples for percentiles."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, window: int = 1000):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float) -> None:
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class JSONLSink:
+    """Appends every event to a JSON Lines file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, event: dict) -> None:
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class MetricsRegistry:
+    """Thread-safe store of per-stage histograms and counters, with optional event sinks."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self._counters: Dict[tuple, float] = {}
+        self._sinks: List[Callable[[dict], None]] = []
+        self._server = None
+
+    def add_sink(self, sink: Callable[[dict], None]) -> None:
+        self._sinks.append(sink)
+
+    def _emit(self, event: dict) -> None:
+        for sink in self._sinks:
+            try:
+                sink(event)
+            except Exception as e:
+                print(f"Metrics sink failed: {e}")
+
+    def _increment(self, name: str, labels: tuple, amount: float = 1) -> None:
+        key = (name,) + labels
+        self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, stage: str, seconds: float, error: Optional[str] = None) -> None:
+        """Records one call of a stage. error is an error class (see error_class) for failed calls."""
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+            self._increment("calls", (stage,))
+            if error:
+                self._increment("errors", (stage, error))
+        self._emit({"ts": time.time(), "type": "latency", "stage": stage, "seconds": seconds, "error": error})
+
+    def retry(self, stage: str, reason: str = "") -> None:
+        with self._lock:
+            self._increment("retries", (stage,))
+        self._emit({"ts": time.time(), "type": "retry", "stage": stage, "reason": reason})
+
+    def tokens(self, provider: str, amount: Optional[float]) -> None:
+        if not amount:
+            return
+        with self._lock:
+            self._increment("tokens", (provider,), amount)
+        self._emit({"ts": time.time(), "type": "tokens", "provider": provider, "tokens": amount})
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Times the block under stage; an exception is recorded by class and re-raised."""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self.observe(stage, time.perf_counter() - start, error_class(e))
+            raise
+        self.observe(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> List[dict]:
+        """One row per stage: calls, errors, retries, mean/p50/p95/max latency (seconds)."""
+        with self._lock:
+            rows = []
+            for stage, histogram in sorted(self._histograms.items()):
+                errors = sum(v for k, v in self._counters.items() if k[0] == "errors" and k[1] == stage)
+                rows.append({
+                    "stage": stage,
+                    "calls": histogram.count,
+                    "errors": int(errors),
+                    "retries": int(self._counters.get(("retries", stage), 0)),
+                    "mean": histogram.total / histogram.count if histogram.count else None,
+                    "p50": histogram.percentile(0.5),
+                    "p95": histogram.percentile(0.95),
+                    "max": max(histogram.recent) if histogram.recent else None,
+                })
+            return rows
+
+    def error_counts(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            result = {}
+            for key, value in self._counters.items():
+                if key[0] == "errors":
+                    result.setdefault(key[1], {})[key[2]] = int(value)
+            return result
+
+    def token_counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {key[1]: int(value) for key, value in self._counters.items() if key[0] == "tokens"}
+
+    def render_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        lines = [
+            "# TYPE threads_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'threads_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'threads_stage_seconds_sum{{stage="{stage}"}} {histogram.total}')
+                lines.append(f'threads_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append("# TYPE threads_stage_retries_total counter")
+            for key, value in sorted(self._counters.items()):
+                if key[0] == "retries":
+                    lines.append(f'threads_stage_retries_total{{stage="{key[1]}"}} {value:g}')
+            lines.append("# TYPE threads_stage_errors_total counter")
+            for key, value in sorted(self._counters.items()):
+                if key[0] == "errors":
+                    lines.append(f'threads_stage_errors_total{{stage="{key[1]}",error="{key[2]}"}} {value:g}')
+            lines.append("# TYPE threads_llm_tokens_total counter")
+            for key, value in sorted(self._counters.items()):
+                if key[0] == "tokens":
+                    lines.append(f'threads_llm_tokens_total{{provider="{key[1]}"}} {value:g}')
+        return "\n".join(lines) + "\n"
+
+    def serve_prometheus(self, port: int = 9464, host: str = "127.0.0.1"):
+        """Starts a background HTTP server exposing /metrics. Returns the server (call shutdown() to stop)."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        if self._server is not None:
+            return self._server
+        registry = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+_registry: Optional[MetricsRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MetricsRegistry:
+    """Process-wide registry, with sinks from METRICS_JSONL_PATH / METRICS_PORT attached on first use."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry()
+            if os.getenv("METRICS_JSONL_PATH"):
+                _registry.add_sink(JSONLSink(os.getenv("METRICS_JSONL_PATH")))
+            if os.getenv("METRICS_PORT"):
+                try:
+                    _registry.serve_prometheus(int(os.getenv("METRICS_PORT")))
+                except OSError as e:
+                    print(f"Metrics endpoint not started: {e}")
+        return _registry
+
+
+def timer(stage: str):
+    """Shortcut for get_registry().timer(stage)."""
+    return get_registry().timer(stage)
+
+
+def observe(stage: str, seconds: float, error: Optional[str] = None) -> None:
+    get_registry().observe(stage, seconds, error)
+
+
+def record_retry(stage: str, reason: str = "") -> None:
+    get_registry().retry(stage, reason)
+
+
+def record_tokens(provider: str, amount: Optional[float]) -> None:
+    get_registry().tokens(provider, amount)
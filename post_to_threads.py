@@ -58,22 +58,29 @@ PDRN 클렌징: 순하면서도 효과적인 세정을 돕는 거품 클렌저.
 """
 
 
+import email.utils
 import json
 import os
+import random
+import re
+import threading
 import time
 import sys
+import importlib.util
 from typing import Callable, List, Optional
 
-import requests
-from dotenv import load_dotenv
-from openai import OpenAI
+# requests, openai, google-genai and python-dotenv are imported on first use, so the
+# CLI, the scheduler and Streamlit reruns only pay for the backends they actually call.
+from dedupe import DuplicateIndex, get_index, record_posted
+from llm_cache import LLMCache, cache_key, get_cache
+from metrics import error_class, observe, record_retry, record_tokens, timer
+from prompt_cache import DEFAULT_TTL_SECONDS, PromptCacheRegistry, get_prompt_cache_registry, min_cache_tokens, prefix_key
+from rate_limit import get_limiter
 
 try:
-    from google import genai as google_genai
-    GOOGLE_GENAI_AVAILABLE = True
+    GOOGLE_GENAI_AVAILABLE = importlib.util.find_spec("google.genai") is not None
 except ImportError:
     GOOGLE_GENAI_AVAILABLE = False
-    google_genai = None
 
 # Windows 콘솔 UTF-8 인코딩 설정
 if sys.platform == 'win32':
@@ -86,8 +93,24 @@ if sys.platform == 'win32':
         sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
         sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
 
-# .env 파일에서 환경 변수 로드
-load_dotenv()
+def _find_dotenv() -> Optional[str]:
+    """Nearest .env in this file's directory or a parent (where load_dotenv() would look)."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    while True:
+        candidate = os.path.join(directory, ".env")
+        if os.path.isfile(candidate):
+            return candidate
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+# .env 파일에서 환경 변수 로드 (파일이 있을 때만 python-dotenv를 불러옵니다)
+_dotenv_path = _find_dotenv()
+if _dotenv_path:
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
 
 BASE = "https://graph.threads.net/v1.0"
 THREADS_API_BASE_URL = BASE
@@ -116,97 +139,706 @@ def get_google_api_key():
         raise ValueError("GOOGLE_API_KEY가 .env 파일에 설정되지 않았습니다.")
     return api_key.strip().strip('"').strip("'")
 
+# Bump when a translation prompt changes so cached translations are not reused.
+TRANSLATION_PROMPT_VERSION = "translate-v1"
+
+TRANSLATION_PROMPT = """
+        Translate the following text to {target_language}. 
+        Only output the translated text, without any additional explanation or quotes.
+        
+        Text to translate:
+        {text}
+        """
+
+BATCH_TRANSLATION_PROMPT = (
+    "Translate every item's text into each of the given languages. "
+    "Keep line breaks, emoji and tone. Respond with JSON only, in the form "
+    '{"items": [{"id": "<id>", "translations": {"<language>": "<translated text>"}}]} '
+    "with exactly one entry per input id.\n\nInput:\n"
+)
+
+
+def _estimate_tokens(text: str) -> int:
+    # Conservative: Korean runs close to one token per character.
+    return max(1, len(text))
+
+
+def _split_batches(texts: List[str], language_count: int, max_batch_tokens: int) -> List[List[int]]:
+    """Groups text indexes so each batch's estimated output stays under max_batch_tokens."""
+    batches, current, size = [], [], 0
+    for index, text in enumerate(texts):
+        cost = _estimate_tokens(text) * max(1, language_count)
+        if current and size + cost > max_batch_tokens:
+            batches.append(current)
+            current, size = [], 0
+        current.append(index)
+        size += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _error_status(error: Exception) -> Optional[int]:
+    # openai: status_code, google-genai: code, requests/gspread: response.status_code
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def _is_throttling_error(error: Exception) -> bool:
+    status = _error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    error_str = str(error)
+    return "503" in error_str or "overloaded" in error_str or "429" in error_str
+
+
+def _llm_retry_after(error: Exception) -> Optional[float]:
+    """Retry-After header (OpenAI) or RetryInfo.retryDelay (Gemini), if the error carries one."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if headers is not None:
+        value = retry_after_seconds(headers, 120.0)
+        if value is not None:
+            return value
+    match = re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    return min(120.0, float(match.group(1))) if match else None
+
+
+GPT_SYSTEM_PROMPT = "당신은 SNS 카피라이팅 전문가입니다. Meta Threads에 최적화된 반말/구어체 글을 작성합니다."
+
+
+# Bulk (batch API) requests are independent, so each one gets its own angle to keep the
+# posts of one batch apart; the rest is left to the dedupe check when they are written.
+BULK_ANGLES = (
+    "개인적인 경험담으로",
+    "질문을 던지는 형식으로",
+    "짧은 팁 목록으로",
+    "의외의 반전이 있는 이야기로",
+    "공감을 부르는 짧은 한마디로",
+    "오늘 있었던 작은 관찰로",
+    "흔한 오해를 바로잡는 글로",
+    "비교하거나 대조하는 글로",
+)
+BULK_VARIATION_PROMPT = (
+    "{prompt}\n\n(일괄 생성 {index}/{count}번째 글: {angle} 써줘. 같은 지침으로 다른 글도 함께 "
+    "만들고 있으니 주제와 첫 문장이 겹치지 않게.)"
+)
+
+
+def _usage_tokens(response, provider: str) -> Optional[int]:
+    """Total tokens of a response; prompt tokens served from the provider cache are recorded separately."""
+    if provider == "openai":
+        usage = getattr(response, "usage", None)
+        details = getattr(usage, "prompt_tokens_details", None)
+        record_tokens("openai.cached", getattr(details, "cached_tokens", None))
+        return getattr(usage, "total_tokens", None)
+    usage = getattr(response, "usage_metadata", None)
+    record_tokens("gemini.cached", getattr(usage, "cached_content_token_count", None))
+    return getattr(usage, "total_token_count", None)
+
+
+class HistoryPolicy:
+    """
+    Bounds the conversation ContentGenerator resends on every call.
+
+    - The first exchange (the instruction prompt and its reply) is pinned.
+    - Only the last max_turns exchanges are resent verbatim.
+    - Older exchanges are folded into a summary so "don't repeat earlier posts" still works:
+      summary_mode="digest" keeps the first digest_chars characters of each dropped reply
+      (at most max_digests), "llm" asks the model for a short summary, None drops them.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = 6,
+        pin_first_exchange: bool = True,
+        summary_mode: Optional[str] = "digest",
+        max_digests: int = 100,
+        digest_chars: int = 80,
+    ):
+        if summary_mode not in ("digest", "llm", None):
+            raise ValueError("summary_mode는 'digest', 'llm', None 중 하나여야 합니다.")
+        self.max_turns = max_turns
+        self.pin_first_exchange = pin_first_exchange
+        self.summary_mode = summary_mode
+        self.max_digests = max_digests
+        self.digest_chars = digest_chars
+
+
+def create_llm_client(model: str, api_key: Optional[str] = None):
+    """Builds the Gemini or OpenAI SDK client for a model; the key defaults to the environment."""
+    if model.startswith("gemini"):
+        if not GOOGLE_GENAI_AVAILABLE:
+            raise ImportError("google-genai 라이브러리가 설치되지 않았습니다.")
+        from google import genai as google_genai
+        return google_genai.Client(api_key=api_key or get_google_api_key())
+
+    if model.startswith("gpt"):
+        api_key = api_key or os.getenv('OPENAI_API_KEY')
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY가 필요합니다.")
+        from openai import OpenAI
+        # Retries are handled by _call_with_limits so they go through the shared limiter.
+        return OpenAI(api_key=api_key.strip().strip('"').strip("'"), max_retries=0)
+
+    return None
+
+
 class ContentGenerator:
-    def __init__(self, model="gemini-2.5-flash", logger: Logger = None):
+    def __init__(
+        self,
+        model="gemini-2.5-flash",
+        logger: Logger = None,
+        history_policy: Optional[HistoryPolicy] = None,
+        cache: Optional[LLMCache] = None,
+        use_cache: bool = True,
+        dedupe: Optional[DuplicateIndex] = None,
+        use_dedupe: bool = True,
+        max_regenerations: int = 2,
+        max_retries: int = 5,
+        client=None,
+        prompt_cache: Optional[PromptCacheRegistry] = None,
+        use_prompt_cache: bool = True,
+        prompt_cache_ttl: int = DEFAULT_TTL_SECONDS,
+    ):
         self.model = model
         self.logger = logger
-        self.history = [] # For GPT
-        self.gemini_chat = None # For Gemini
+        self.history_policy = history_policy or HistoryPolicy()
+        # Translations are looked up in the on-disk cache before calling the LLM.
+        self.cache = cache if cache is not None else (get_cache() if use_cache else None)
+        # Generated posts are checked against everything already queued or posted.
+        self.dedupe = dedupe if dedupe is not None else (get_index() if use_dedupe else None)
+        self.max_regenerations = max_regenerations
+        # Attempts per LLM call on throttling/5xx errors (1 = fail fast, e.g. behind a failover).
+        self.max_retries = max_retries
+        # The instruction prompt is served from a provider-side cache on later turns.
+        self.prompt_cache = prompt_cache if prompt_cache is not None else (
+            get_prompt_cache_registry() if use_prompt_cache else None
+        )
+        self.prompt_cache_ttl = prompt_cache_ttl
+        self.system_prompt = None
+        self.pinned = []   # First exchange, always resent
+        self.history = []  # Sliding window of recent messages
+        self.summary = []  # Digests / summary of exchanges that left the window
         
-        if model.startswith("gemini"):
-            if not GOOGLE_GENAI_AVAILABLE:
-                raise ImportError("google-genai 라이브러리가 설치되지 않았습니다.")
-            api_key = get_google_api_key()
-            self.client = google_genai.Client(api_key=api_key)
-            # Gemini chat session initialization
-            self.gemini_chat = self.client.chats.create(model="gemini-2.5-flash")
-            
-        elif model.startswith("gpt"):
-            self.api_key = os.getenv('OPENAI_API_KEY')
-            if not self.api_key:
-                raise ValueError("OPENAI_API_KEY가 필요합니다.")
-            self.client = OpenAI(api_key=self.api_key.strip().strip('"').strip("'"))
-            # System prompt can be set initially if needed, but we'll just start empty
-            self.history = [
-                {"role": "system", "content": "당신은 SNS 카피라이팅 전문가입니다. Meta Threads에 최적화된 반말/구어체 글을 작성합니다."}
-            ]
+        # A caller that keeps SDK clients across calls (e.g. Streamlit reruns) passes one in.
+        self.client = client if client is not None else create_llm_client(model)
+        if model.startswith("gpt"):
+            self.system_prompt = GPT_SYSTEM_PROMPT
 
     def generate(self, prompt: str) -> str:
+        """
+        Generates the next post. A near-duplicate of an already queued or posted text is
+        regenerated up to max_regenerations times, with the earlier text quoted as
+        something to avoid; the last attempt is returned either way.
+        """
+        with timer("llm.generate"):
+            content = self._generate_once(prompt)
+        for attempt in range(self.max_regenerations):
+            retry_prompt = self._regeneration_prompt(prompt, content, attempt)
+            if retry_prompt is None:
+                break
+            with timer("llm.generate"):
+                content = self._generate_once(retry_prompt)
+        return content
+
+    def _regeneration_prompt(self, prompt: str, content: str, attempt: int) -> Optional[str]:
+        """The prompt for regenerating a near-duplicate, or None if content is new or attempts are used up."""
+        if attempt >= self.max_regenerations or self.dedupe is None:
+            return None
+        match = self.dedupe.find(content)
+        if match is None:
+            return None
+        _emit(f"♻️ 이미 작성한 글과 거의 같아 다시 생성합니다 ({attempt + 1}/{self.max_regenerations})", self.logger)
+        return f"{prompt}\n\n아래 글과 주제와 표현이 겹치지 않게 완전히 다른 글을 써줘:\n{match.text[:300]}"
+
+    def _generate_once(self, prompt: str) -> str:
+        content = self._request(prompt)
+        self._record(prompt, content)
+        model_name = "Gemini" if self._answered_by().startswith("gemini") else "GPT"
+        _emit(f"✅ {model_name} 생성 완료 ({len(content)}자)", self.logger)
+        return content
+
+    def _answered_by(self) -> str:
+        """Model that produced the last answer (a FailoverGenerator may have used another backend)."""
+        return self.model
+
+    def _request(self, prompt: str) -> str:
+        """One generation request for the next turn; the history is left unchanged."""
         if self.model.startswith("gemini"):
-            return self._generate_gemini(prompt)
+            return self._request_gemini(prompt)
         else:
-            return self._generate_gpt(prompt)
+            return self._request_gpt(prompt)
+
+    def generate_stream(self, prompt: str) -> "GenerationStream":
+        """
+        Streaming version of generate().
+
+        Iterate the returned GenerationStream for text chunks as they arrive; once it is
+        exhausted, stream.text holds the cleaned result and the turn is added to the history.
+        Closing the stream early (stream.close()) aborts the request and leaves the history unchanged.
+        Near-duplicates are regenerated as in generate(): the stream then continues with the
+        chunks of the new attempt, partial_text starts over and stream.regenerations is increased.
+        """
+        def _attempt(attempt_prompt):
+            return self._stream_chunks(attempt_prompt), lambda raw: self._finish_stream(attempt_prompt, raw)
+
+        def _next_attempt(content, attempt):
+            retry_prompt = self._regeneration_prompt(prompt, content, attempt)
+            return None if retry_prompt is None else _attempt(retry_prompt)
+
+        return GenerationStream(*_attempt(prompt), next_attempt=_next_attempt)
+
+    def _stream_chunks(self, prompt: str):
+        fallback = None
+        if self.model.startswith("gemini"):
+            contents, config, full_request = self._gemini_request(prompt)
+            estimated = sum(_estimate_tokens(p["text"]) for c in contents for p in c["parts"]) + 1000
+            start = lambda: self.client.models.generate_content_stream(model=self.model, contents=contents, config=config)
+            if full_request is not None:
+                fallback = lambda: self.client.models.generate_content_stream(model=self.model, contents=full_request[0], config=full_request[1])
+            text_of = lambda chunk: chunk.text
+            provider = "gemini"
+        else:
+            messages = [{"role": "system", "content": self.system_prompt}] + self._conversation(prompt)
+            estimated = sum(_estimate_tokens(m["content"]) for m in messages) + 500
+            extra = self._openai_cache_kwargs(prompt)
+            start = lambda: self.client.chat.completions.create(
+                model="gpt-4o", messages=messages, temperature=0.7, max_tokens=500, stream=True, **extra
+            )
+            text_of = lambda chunk: chunk.choices[0].delta.content if chunk.choices else None
+            provider = "openai"
+
+        def _open():
+            # Pull the first chunk inside the limiter so throttling errors are retried
+            # before anything has been shown to the user.
+            try:
+                iterator = iter(start())
+                return next(iterator, None), iterator
+            except Exception as e:
+                if fallback is None or _is_throttling_error(e):
+                    raise
+                self._drop_prefix_cache(e)
+                iterator = iter(fallback())
+                return next(iterator, None), iterator
+
+        first, iterator = self._call_with_limits(provider, estimated, _open, lambda _: None)
+        if first is not None and text_of(first):
+            yield text_of(first)
+        for chunk in iterator:
+            text = text_of(chunk)
+            if text:
+                yield text
+
+    def _finish_stream(self, prompt: str, raw: str) -> str:
+        content = self._clean_content(raw.strip())
+        self._record(prompt, content)
+        model_name = "Gemini" if self._answered_by().startswith("gemini") else "GPT"
+        _emit(f"✅ {model_name} 생성 완료 ({len(content)}자)", self.logger)
+        return content
+
+    def _conversation(self, prompt: str) -> list:
+        """Messages sent for the next turn: pinned exchange, summary, recent window, new prompt."""
+        messages = list(self.pinned)
+        if self.summary:
+            note = "지금까지 이미 작성한 글 (내용과 표현을 반복하지 말 것):\n" + "\n".join(f"- {item}" for item in self.summary)
+            messages.append({"role": "user", "content": note})
+            messages.append({"role": "assistant", "content": "확인했어. 겹치지 않게 쓸게."})
+        messages.extend(self.history)
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def _record(self, prompt: str, content: str) -> None:
+        exchange = [{"role": "user", "content": prompt}, {"role": "assistant", "content": content}]
+        policy = self.history_policy
+        if policy.pin_first_exchange and not self.pinned:
+            self.pinned = exchange
+            return
+
+        self.history.extend(exchange)
+        overflow = len(self.history) - 2 * policy.max_turns
+        if overflow > 0:
+            dropped, self.history = self.history[:overflow], self.history[overflow:]
+            self._fold_into_summary(dropped)
+
+    def _fold_into_summary(self, dropped: list) -> None:
+        policy = self.history_policy
+        replies = [m["content"] for m in dropped if m["role"] == "assistant"]
+        if policy.summary_mode is None or not replies:
+            return
+
+        if policy.summary_mode == "llm":
+            try:
+                request = (
+                    "아래는 지금까지 작성한 글 요약과 새로 요약할 글이야. 다음 글을 쓸 때 겹치지 않도록 "
+                    "주제와 핵심 표현만 한 줄씩 bullet 없이 정리해줘.\n\n"
+                    + "\n".join(self.summary) + "\n\n" + "\n---\n".join(replies)
+                )
+                summary = self._complete([{"role": "user", "content": request}], max_tokens=500)
+                self.summary = [line.strip("-• ").strip() for line in summary.splitlines() if line.strip()]
+                return
+            except Exception as e:
+                _emit(f"⚠️ 대화 요약 실패, 앞부분만 보관합니다: {e}", self.logger)
+
+        for reply in replies:
+            self.summary.append(" ".join(reply.split())[:policy.digest_chars])
+        self.summary = self.summary[-policy.max_digests:]
+
+    def _gemini_contents(self, messages: list) -> list:
+        return [
+            {"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+            for m in messages
+        ]
+
+    def _gemini_config(self, **extra) -> dict:
+        config = dict(extra)
+        if self.system_prompt:
+            config["system_instruction"] = self.system_prompt
+        return config
+
+    # --- Provider prompt caching (see prompt_cache.py) ---
+
+    def _brief(self, prompt: Optional[str] = None) -> Optional[str]:
+        """The instruction prompt every turn starts with: the pinned first prompt, or this one on turn one."""
+        if self.pinned:
+            return self.pinned[0]["content"]
+        return prompt
 
-    def _generate_gemini(self, prompt: str) -> str:
-        max_retries = 5
+    def _prefix_key(self, provider: str, brief: str) -> str:
+        return prefix_key(provider, self.model, self.system_prompt or "", brief)
+
+    def _openai_cache_kwargs(self, prompt: str) -> dict:
+        """
+        Requests already start with the system prompt and the brief, which OpenAI caches
+        automatically; the key keeps the turns of one brief on the same cache.
+        """
+        brief = self._brief(prompt)
+        if self.prompt_cache is None or not brief:
+            return {}
+        return {"extra_body": {"prompt_cache_key": self._prefix_key("openai", brief)[:32]}}
+
+    def _gemini_prefix_cache(self):
+        """Live cached-content handle for system prompt + brief, created on first use, or None."""
+        registry = self.prompt_cache
+        if registry is None or not self.pinned or not registry.is_available("gemini", self.model):
+            return None
+        brief = self._brief()
+        tokens = _estimate_tokens(brief) + _estimate_tokens(self.system_prompt or "")
+        if tokens < min_cache_tokens(self.model) or not hasattr(self.client, "caches"):
+            return None
+
+        def _create():
+            config = {
+                "contents": self._gemini_contents(self.pinned[:1]),
+                "ttl": f"{int(self.prompt_cache_ttl)}s",
+                "display_name": "threads-brief",
+            }
+            if self.system_prompt:
+                config["system_instruction"] = self.system_prompt
+            start = time.perf_counter()
+            try:
+                cached = self.client.caches.create(model=self.model, config=config)
+            except Exception as e:
+                observe("llm.cache_create", time.perf_counter() - start, error_class(e))
+                if not _is_throttling_error(e):
+                    # Unsupported model, prefix too short, ...: stop trying for a while.
+                    registry.mark_unavailable("gemini", self.model)
+                _emit(f"⚠️ 프롬프트 캐시를 만들지 못해 캐시 없이 요청합니다: {e}", self.logger)
+                return None
+            observe("llm.cache_create", time.perf_counter() - start)
+            _emit(f"🗂️ 프롬프트 캐시 생성 (약 {tokens} 토큰, {int(self.prompt_cache_ttl)}초)", self.logger)
+            return registry.put(key, cached.name, "gemini", self.model, self.prompt_cache_ttl, tokens)
+
+        key = self._prefix_key("gemini", brief)
+        return registry.get_or_create(key, _create)
+
+    def _drop_prefix_cache(self, error: Exception) -> None:
+        """Forgets a cached-content handle the provider rejected (expired or deleted)."""
+        _emit(f"⚠️ 프롬프트 캐시를 사용할 수 없어 전체 프롬프트로 다시 요청합니다: {error}", self.logger)
+        if self.prompt_cache is not None and self.pinned:
+            self.prompt_cache.invalidate(self._prefix_key("gemini", self._brief()))
+
+    def _gemini_request(self, prompt: str, **extra):
+        """
+        (contents, config, full_request) for the next turn. With a cached brief, contents
+        omit it and config references the cache; full_request is the uncached
+        (contents, config) to fall back to, or None when no cache is used.
+        """
+        messages = self._conversation(prompt)
+        full_request = (self._gemini_contents(messages), self._gemini_config(**extra))
+        handle = self._gemini_prefix_cache()
+        if handle is None:
+            return full_request[0], full_request[1], None
+        # The system instruction lives in the cache and must not be repeated.
+        return self._gemini_contents(messages[1:]), dict(extra, cached_content=handle.name), full_request
+
+    def _complete(self, messages: list, max_tokens: int = 500, json_mode: bool = False) -> str:
+        """One stateless request (history is neither sent nor updated)."""
+        if self.model.startswith("gemini"):
+            config = self._gemini_config(max_output_tokens=max_tokens)
+            if json_mode:
+                config["response_mime_type"] = "application/json"
+            return self._call_gemini(self._gemini_contents(messages), config)
+
+        system = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+        return self._call_openai(
+            system + messages,
+            temperature=0.3 if json_mode else 0.7,
+            max_tokens=max_tokens,
+            **extra
+        )
+
+    def _call_with_limits(self, provider: str, estimated_tokens: int, call: Callable, usage: Callable):
+        """
+        Runs call() through the provider's shared rate limiter.
+        Throttling errors (429/5xx) slow the limiter down and are retried with backoff,
+        waiting for Retry-After / retryDelay when the provider sends one.
+        """
+        limiter = get_limiter(provider)
+        stage = f"llm.{provider}"
+        max_retries = self.max_retries
         base_delay = 2
         
         for attempt in range(max_retries):
+            limiter.acquire(estimated_tokens)
+            start = time.perf_counter()
             try:
-                response = self.gemini_chat.send_message(prompt)
-                content = response.text.strip()
-                content = self._clean_content(content)
-                _emit(f"✅ Gemini 생성 완료 ({len(content)}자)", self.logger)
-                return content
+                response = call()
             except Exception as e:
+                observe(stage, time.perf_counter() - start, error_class(e))
                 # Check for 503 or other transient errors
-                error_str = str(e)
-                if "503" in error_str or "overloaded" in error_str or "429" in error_str:
-                    if attempt < max_retries - 1:
-                        wait_time = base_delay * (2 ** attempt)  # Exponential backoff: 2, 4, 8, 16...
-                        _emit(f"⚠️ 모델 과부하로 대기 중... ({wait_time}초 후 재시도 {attempt+1}/{max_retries})", self.logger)
+                if _is_throttling_error(e) and attempt < max_retries - 1:
+                    record_retry(stage, error_class(e))
+                    retry_after = _llm_retry_after(e)
+                    limiter.on_throttle(retry_after)
+                    wait_time = retry_after if retry_after is not None else base_delay * (2 ** attempt)  # 2, 4, 8, 16...
+                    _emit(f"⚠️ 모델 과부하로 대기 중... ({wait_time:.0f}초 후 재시도 {attempt+1}/{max_retries})", self.logger)
+                    if retry_after is None:
                         time.sleep(wait_time)
-                        continue
-                
-                _emit(f"❌ Gemini 오류: {e}", self.logger)
+                    continue
                 raise
+            observe(stage, time.perf_counter() - start)
+            tokens = usage(response)
+            record_tokens(provider, tokens)
+            limiter.on_success()
+            limiter.record_tokens(estimated_tokens, tokens)
+            return response
+
+    def _call_openai(self, messages: list, **kwargs) -> str:
+        estimated = sum(_estimate_tokens(m["content"]) for m in messages) + kwargs.get("max_tokens", 500)
+        response = self._call_with_limits(
+            "openai",
+            estimated,
+            lambda: self.client.chat.completions.create(model="gpt-4o", messages=messages, **kwargs),
+            lambda r: _usage_tokens(r, "openai"),
+        )
+        return response.choices[0].message.content.strip()
+
+    def _call_gemini(self, contents: list, config: dict) -> str:
+        estimated = sum(_estimate_tokens(p["text"]) for c in contents for p in c["parts"])
+        estimated += config.get("max_output_tokens", 1000)
+        response = self._call_with_limits(
+            "gemini",
+            estimated,
+            lambda: self.client.models.generate_content(model=self.model, contents=contents, config=config),
+            lambda r: _usage_tokens(r, "gemini"),
+        )
+        return response.text.strip()
 
-    def _generate_gpt(self, prompt: str) -> str:
+    def _request_gemini(self, prompt: str) -> str:
         try:
-            self.history.append({"role": "user", "content": prompt})
-            
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=self.history,
-                temperature=0.7,
-                max_tokens=500
-            )
-            
-            content = response.choices[0].message.content.strip()
-            content = self._clean_content(content)
-            
-            # Add assistant response to history
-            self.history.append({"role": "assistant", "content": content})
-            
-            _emit(f"✅ GPT 생성 완료 ({len(content)}자)", self.logger)
-            return content
+            contents, config, full_request = self._gemini_request(prompt)
+            try:
+                content = self._call_gemini(contents, config)
+            except Exception as e:
+                if full_request is None or _is_throttling_error(e):
+                    raise
+                self._drop_prefix_cache(e)
+                content = self._call_gemini(*full_request)
+        except Exception as e:
+            _emit(f"❌ Gemini 오류: {e}", self.logger)
+            raise
+        return self._clean_content(content)
+
+    def _request_gpt(self, prompt: str) -> str:
+        try:
+            messages = [{"role": "system", "content": self.system_prompt}] + self._conversation(prompt)
+            content = self._call_openai(messages, temperature=0.7, max_tokens=500, **self._openai_cache_kwargs(prompt))
         except Exception as e:
             _emit(f"❌ GPT 오류: {e}", self.logger)
             raise
+        return self._clean_content(content)
 
     def translate(self, text: str, target_language: str) -> str:
-        prompt = f"""
-        Translate the following text to {target_language}. 
-        Only output the translated text, without any additional explanation or quotes.
-        
-        Text to translate:
-        {text}
+        """Translates one text in a stateless request, outside the generation history."""
+        cached = self._cached_translation(text, target_language)
+        if cached is not None:
+            return cached
+
+        prompt = TRANSLATION_PROMPT.format(target_language=target_language, text=text)
+        try:
+            with timer("llm.translate"):
+                content = self._clean_content(self._complete([{"role": "user", "content": prompt}], max_tokens=2000))
+        except Exception as e:
+            _emit(f"❌ 번역 오류: {e}", self.logger)
+            raise
+        self._store_translation(text, target_language, content)
+        _emit(f"✅ {target_language} 번역 완료 ({len(content)}자)", self.logger)
+        return content
+
+    def _translation_key(self, text: str, target_language: str, model: Optional[str] = None) -> str:
+        return cache_key("translate", text, target_language, model or self.model, TRANSLATION_PROMPT_VERSION)
+
+    def _translation_models(self) -> List[str]:
+        """Models whose cached translations may be served, in order of preference."""
+        return [self.model]
+
+    def _cached_translation(self, text: str, target_language: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        for model in self._translation_models():
+            cached = self.cache.get(self._translation_key(text, target_language, model))
+            if cached is not None:
+                return cached
+        return None
+
+    def _store_translation(self, text: str, target_language: str, translated: str) -> None:
+        # Keyed on the model that produced the translation, not the one that was asked.
+        if self.cache is not None and translated:
+            self.cache.set(self._translation_key(text, target_language, self._answered_by()), translated, kind="translate")
+
+    def translate_batch(
+        self,
+        texts: List[str],
+        target_languages: List[str],
+        max_batch_tokens: int = 4000,
+        progress: Optional[Callable[[int, int], None]] = None,
+    ) -> List[dict]:
         """
-        
-        if self.model.startswith("gemini"):
-            return self._generate_gemini(prompt)
-        else:
-            return self._generate_gpt(prompt)
+        Translates many texts into one or more languages with one JSON request per batch.
+
+        Texts are packed into batches whose estimated output (input size x languages) stays
+        under max_batch_tokens. Results are mapped back by item ID; items missing from a
+        response are retried one by one with translate().
+
+        Returns:
+            List[dict]: one {language: translation} dict per input text, in input order.
+        """
+        results = [dict() for _ in texts]
+        for index, text in enumerate(texts):
+            for lang in target_languages:
+                cached = self._cached_translation(text, lang)
+                if cached is not None:
+                    results[index][lang] = cached
+
+        # Only items with a missing language go to the LLM.
+        todo = [i for i in range(len(texts)) if len(results[i]) < len(target_languages)]
+        done = len(texts) - len(todo)
+        if done:
+            _emit(f"♻️ 캐시에서 번역 {done}개를 가져왔습니다.", self.logger)
+            if progress:
+                progress(done, len(texts))
+
+        todo_texts = [texts[i] for i in todo]
+        for local_batch in _split_batches(todo_texts, len(target_languages), max_batch_tokens):
+            batch = [todo[i] for i in local_batch]
+            payload = {
+                "languages": list(target_languages),
+                "items": [{"id": str(i), "text": texts[i]} for i in batch],
+            }
+            prompt = BATCH_TRANSLATION_PROMPT + json.dumps(payload, ensure_ascii=False)
+            estimate = sum(_estimate_tokens(texts[i]) for i in batch) * len(target_languages)
+            try:
+                with timer("llm.translate"):
+                    raw = self._complete(
+                        [{"role": "user", "content": prompt}],
+                        max_tokens=min(16000, int(estimate * 1.5) + 256),
+                        json_mode=True,
+                    )
+                for item in json.loads(raw).get("items", []):
+                    index = int(item.get("id", -1))
+                    translations = item.get("translations") or {}
+                    if index in batch:
+                        for lang, value in translations.items():
+                            if lang in target_languages and value and lang not in results[index]:
+                                translated = self._clean_content(str(value).strip())
+                                results[index][lang] = translated
+                                self._store_translation(texts[index], lang, translated)
+            except Exception as e:
+                _emit(f"⚠️ 일괄 번역 응답 처리 실패, 개별 번역으로 전환합니다: {e}", self.logger)
+
+            for index in batch:
+                for lang in target_languages:
+                    if lang not in results[index]:
+                        results[index][lang] = self.translate(texts[index], lang)
+
+            done += len(batch)
+            _emit(f"✅ 일괄 번역 {done}/{len(texts)} 완료", self.logger)
+            if progress:
+                progress(done, len(texts))
+        return results
+
+    # --- Bulk generation through the provider batch APIs (see batch_jobs.py) ---
+
+    def bulk_requests(self, prompt: str, count: int) -> List[dict]:
+        """
+        count independent batch requests for prompt, each on top of the current conversation
+        (pinned exchange, summary, recent window) with its own variation angle.
+        """
+        requests = []
+        for index in range(count):
+            variant = BULK_VARIATION_PROMPT.format(
+                prompt=prompt, index=index + 1, count=count, angle=BULK_ANGLES[index % len(BULK_ANGLES)]
+            )
+            requests.append({
+                "custom_id": f"post-{index + 1}",
+                "system": self.system_prompt,
+                "messages": self._conversation(variant),
+                "max_tokens": 500 if self.model.startswith("gpt") else 1000,
+                "temperature": 0.9,
+            })
+        return requests
+
+    def submit_bulk(self, prompt: str, count: int, sheet_name: Optional[str] = None,
+                    store=None, provider=None) -> int:
+        """
+        Submits count posts for prompt as one batch job and returns its local batch ID.
+        Results arrive within the provider's completion window (up to 24h); pick them up
+        with collect_bulk(). The generation history is not changed.
+        """
+        import batch_jobs
+
+        store = store or batch_jobs.BatchJobStore()
+        provider = provider or batch_jobs.provider_for(self.model, self.client)
+        batch_id = batch_jobs.submit(
+            store, provider, self.model, self.bulk_requests(prompt, count),
+            sheet_name=sheet_name or batch_jobs.google_sheets.SHEET_NAME,
+        )
+        _emit(f"📦 배치 #{batch_id} 제출 완료 ({count}개, 결과는 최대 24시간 이내)", self.logger)
+        return batch_id
+
+    def collect_bulk(self, batch_id: int, writer=None, store=None, provider=None,
+                     wait: bool = False, poll_interval: float = 30.0, timeout: Optional[float] = None) -> dict:
+        """
+        Writes the results of a finished batch to its sheet and returns the item counts by
+        status. wait=True polls until the batch finishes; otherwise a batch that is still
+        running raises RuntimeError.
+        """
+        import batch_jobs
+
+        store = store or batch_jobs.BatchJobStore()
+        provider = provider or batch_jobs.provider_for(self.model, self.client)
+        log = lambda message: _emit(message, self.logger)
+        if wait:
+            batch_jobs.wait_for_batch(store, provider, batch_id, poll_interval=poll_interval, timeout=timeout, logger=log)
+        if writer is not None:
+            return batch_jobs.collect(store, provider, batch_id, writer, self._clean_content, log)
+        from google_sheets import SheetWriter
+        with SheetWriter() as writer:
+            return batch_jobs.collect(store, provider, batch_id, writer, self._clean_content, log)
 
     def _clean_content(self, content: str) -> str:
         if content.startswith('"') and content.endswith('"'):
@@ -215,86 +847,452 @@ class ContentGenerator:
             return content[1:-1]
         return content
 
+class GenerationStream:
+    """
+    Iterator over the text chunks of a streaming generation.
+    After the iteration finishes, .text holds the assembled and cleaned text.
+
+    next_attempt(text, regenerations) may return (chunks, on_complete) for another
+    attempt (e.g. to regenerate a near-duplicate); the iteration then continues with
+    those chunks and partial_text holds only the new attempt.
+    """
+
+    def __init__(
+        self,
+        chunks,
+        on_complete: Callable[[str], str],
+        next_attempt: Optional[Callable[[str, int], Optional[tuple]]] = None,
+    ):
+        self._chunks = chunks
+        self._on_complete = on_complete
+        self._next_attempt = next_attempt
+        self._parts = []
+        self.regenerations = 0
+        self.text = None
+
+    @property
+    def partial_text(self) -> str:
+        return "".join(self._parts)
+
+    @property
+    def completed(self) -> bool:
+        return self.text is not None
+
+    def __iter__(self):
+        if self.completed:
+            return
+        while True:
+            for chunk in self._chunks:
+                self._parts.append(chunk)
+                yield chunk
+            text = self._on_complete(self.partial_text)
+            retry = self._next_attempt(text, self.regenerations) if self._next_attempt else None
+            if retry is None:
+                self.text = text
+                return
+            self._chunks, self._on_complete = retry
+            self._parts = []
+            self.regenerations += 1
+
+    def close(self) -> None:
+        """Aborts the stream; the partial text is discarded from the history."""
+        self._chunks.close()
+
+    def result(self) -> str:
+        """Consumes the rest of the stream and returns the final text."""
+        for _ in self:
+            pass
+        return self.text
+
+
 # Legacy wrapper for backward compatibility if needed, or just remove
-def generate_text_with_ai(model="gpt-4o", prompt=None, logger: Logger = None):
+def generate_text_with_ai(model="gpt-4o", prompt=None, logger: Logger = None, stream: bool = False):
     generator = ContentGenerator(model=model, logger=logger)
-    return generator.generate(prompt)
+    if not stream:
+        return generator.generate(prompt)
+
+    # Print tokens as they arrive (CLI)
+    result = generator.generate_stream(prompt)
+    for chunk in result:
+        print(chunk, end="", flush=True)
+    print()
+    return result.text
+
+def retry_after_seconds(headers, cap: float) -> Optional[float]:
+    """Parses a Retry-After header (seconds or HTTP date), capped at cap seconds."""
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return min(cap, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return min(cap, max(0.0, retry_at.timestamp() - time.time()))
+    except (TypeError, ValueError):
+        return None
+
+
+def _request_token(kwargs: dict) -> Optional[str]:
+    """Returns the access token of a request, which keys its per-account rate limiter."""
+    for field in ("params", "json", "data"):
+        body = kwargs.get(field)
+        if isinstance(body, dict) and body.get("access_token"):
+            return body["access_token"]
+    return None
+
+
+class ThreadsClient:
+    """
+    Threads Graph API client.
+
+    Owns a keep-alive requests.Session with a sized connection pool so every step of a post
+    reuses the same TLS connection to graph.threads.net, and retries 429/5xx responses and
+    connection errors with jittered exponential backoff, honouring Retry-After.
+    Timeouts can be set per endpoint ("me", "create", "status", "publish", "permalink").
+    """
+
+    DEFAULT_TIMEOUTS = {
+        "me": 20,
+        "create": 30,
+        "status": 10,
+        "publish": 20,
+        "permalink": 20,
+    }
+
+    def __init__(
+        self,
+        base_url: str = BASE,
+        timeouts: Optional[dict] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        pool_maxsize: int = 10,
+    ):
+        self.base_url = base_url
+        self.timeouts = {**self.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        # Retries are handled in request() so Retry-After and per-call idempotency are respected.
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spread concurrent retries instead of retrying in lockstep.
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+    def request(self, method: str, path: str, endpoint: str, idempotent: bool = True, **kwargs) -> dict:
+        """
+        Sends a request and returns the decoded JSON body.
+
+        Non-idempotent calls (publish) are only retried when the server cannot have acted on
+        them: 429 responses and connection failures before the request was sent.
+        """
+        import requests
+
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        timeout = self.timeouts.get(endpoint, 20)
+        stage = f"threads.{endpoint}"
+
+        limiter = get_limiter("threads", key=_request_token(kwargs))
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt >= self.max_retries
+            limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, timeout=timeout, **kwargs)
+            except requests.exceptions.ConnectTimeout as e:
+                observe(stage, time.perf_counter() - start, error_class(e))
+                if last_attempt:
+                    raise
+                record_retry(stage, error_class(e))
+                time.sleep(self._backoff(attempt))
+                continue
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                observe(stage, time.perf_counter() - start, error_class(e))
+                if last_attempt or not idempotent:
+                    raise
+                record_retry(stage, error_class(e))
+                time.sleep(self._backoff(attempt))
+                continue
+
+            status = response.status_code
+            observe(stage, time.perf_counter() - start, f"HTTPError:{status}" if status >= 400 else None)
+            if status == 429:
+                limiter.on_throttle(retry_after_seconds(response.headers, self.backoff_max))
+            retryable = status == 429 or (idempotent and status >= 500)
+            if retryable and not last_attempt:
+                record_retry(stage, str(status))
+                wait = retry_after_seconds(response.headers, self.backoff_max)
+                time.sleep(wait if wait is not None else self._backoff(attempt))
+                continue
+
+            response.raise_for_status()
+            limiter.on_success()
+            return response.json()
+
+    def me(self, token: str) -> dict:
+        return self.request("GET", "me", "me", params={"fields": "id,username", "access_token": token})
+
+    def create_text_container(self, user_id: str, text: str, token: str) -> str:
+        payload = {
+            'media_type': 'TEXT',
+            'text': text,
+            'access_token': token
+        }
+        # Creating a container has no visible effect until it is published, so retrying is safe.
+        return self.request("POST", f"{user_id}/threads", "create", json=payload)['id']
+
+    def get_container_status(self, container_id: str, token: str) -> dict:
+        params = {'fields': 'status,error_message', 'access_token': token}
+        return self.request("GET", container_id, "status", params=params)
 
-def me(token=None):
+    def publish_container(self, user_id: str, container_id: str, token: str) -> dict:
+        payload = {'creation_id': container_id, 'access_token': token}
+        return self.request("POST", f"{user_id}/threads_publish", "publish", idempotent=False, data=payload)
+
+    def get_permalink(self, media_id: str, token: str) -> str:
+        params = {"fields": "permalink", "access_token": token}
+        return self.request("GET", media_id, "permalink", params=params)["permalink"]
+
+    def get_media_fields(self, media_ids: List[str], token: str, fields=("permalink",)) -> dict:
+        """Looks up fields of many media objects in one multi-ID request. Returns {media_id: {...}}."""
+        params = {"ids": ",".join(media_ids), "fields": ",".join(fields), "access_token": token}
+        return self.request("GET", "", "permalink", params=params)
+
+
+_default_client: Optional[ThreadsClient] = None
+_default_client_lock = threading.Lock()
+
+
+def get_client() -> ThreadsClient:
+    """Returns the process-wide ThreadsClient used by the module-level helpers."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = ThreadsClient()
+        return _default_client
+
+
+# The identity behind a token does not change, so me() is resolved once per token.
+_identity_cache = {}
+_identity_lock = threading.Lock()
+
+
+def me(token=None, refresh=False):
     if token is None:
         token = get_token()
-    r = requests.get(f"{BASE}/me", params={"fields":"id,username","access_token":token}, timeout=20)
-    r.raise_for_status()
-    return r.json()
+    with _identity_lock:
+        if not refresh and token in _identity_cache:
+            return dict(_identity_cache[token])
+    user = get_client().me(token)
+    with _identity_lock:
+        _identity_cache[token] = user
+    return dict(user)
 
 
 def create_text_container(user_id, text, token, logger=None):
-    url = f"{THREADS_API_BASE_URL}/{user_id}/threads"
-    payload = {
-        'media_type': 'TEXT',
-        'text': text,
-        'access_token': token
-    }
-    response = requests.post(url, data=json.dumps(payload), headers={"Content-Type":"application/json"}, timeout=30)
+    import requests
+
     try:
-        response.raise_for_status()
-        return response.json()['id']
+        return get_client().create_text_container(user_id, text, token)
     except requests.exceptions.HTTPError as e:
         _emit(f"❌ 컨테이너 생성 실패: {e}", logger)
-        _emit(f"응답 내용: {response.text}", logger)
+        _emit(f"응답 내용: {e.response.text}", logger)
         raise
 
-def check_container_status(container_id, token, logger=None):
-    url = f"{BASE}/{container_id}"
-    params = {
-        'fields': 'status,error_message',
-        'access_token': token
-    }
-    
-    for _ in range(5): # Try 5 times
-        response = requests.get(url, params=params, timeout=10)
+class PollPolicy:
+    """
+    Container status polling schedule.
+
+    The first probe is sent after first_delay seconds, then the interval grows by multiplier
+    from initial_interval up to max_interval until deadline seconds have been spent waiting.
+    Transient errors (timeouts, 429, 5xx) keep polling, up to max_transient_errors in a row.
+    """
+
+    TERMINAL_STATUSES = ('ERROR', 'EXPIRED')
+
+    def __init__(
+        self,
+        first_delay: float = 0.0,
+        initial_interval: float = 0.5,
+        multiplier: float = 2.0,
+        max_interval: float = 5.0,
+        deadline: float = 60.0,
+        max_transient_errors: int = 5,
+    ):
+        self.first_delay = first_delay
+        self.initial_interval = initial_interval
+        self.multiplier = multiplier
+        self.max_interval = max_interval
+        self.deadline = deadline
+        self.max_transient_errors = max_transient_errors
+
+    def intervals(self):
+        """Yields the sleep before each probe until the deadline is reached."""
+        elapsed = self.first_delay
+        yield self.first_delay
+        interval = self.initial_interval
+        while elapsed + interval <= self.deadline:
+            elapsed += interval
+            yield interval
+            interval = min(self.max_interval, interval * self.multiplier)
+        if elapsed < self.deadline:
+            yield self.deadline - elapsed
+
+
+DEFAULT_POLL_POLICY = PollPolicy()
+
+# Multi-ID lookups are limited to 50 IDs per request by the Graph API.
+MAX_IDS_PER_REQUEST = 50
+
+
+def _is_transient_error(error: Exception) -> bool:
+    import requests
+
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+def check_container_status(container_id, token, logger=None, policy: Optional[PollPolicy] = None):
+    """
+    Polls a single container: a fast first probe, then exponential backoff until the policy
+    deadline. An ERROR/EXPIRED status or a non-transient HTTP error fails immediately.
+    """
+    start = time.perf_counter()
+    ready = _wait_for_container(container_id, token, logger, policy)
+    observe("threads.poll", time.perf_counter() - start, None if ready else "NotReady")
+    return ready
+
+
+def _wait_for_container(container_id, token, logger=None, policy: Optional[PollPolicy] = None) -> bool:
+    policy = policy or DEFAULT_POLL_POLICY
+    client = get_client()
+    transient_errors = 0
+
+    for interval in policy.intervals():
+        if interval:
+            time.sleep(interval)
         try:
-            response.raise_for_status()
-            data = response.json()
-            status = data.get('status')
-            if status == 'FINISHED':
-                return True
-            elif status == 'ERROR':
-                _emit(f"❌ 컨테이너 상태 오류: {data.get('error_message')}", logger)
-                return False
-            
-            _emit(f"⏳ 컨테이너 처리 중... (Status: {status})", logger)
-            time.sleep(1)
+            data = client.get_container_status(container_id, token)
         except Exception as e:
-            _emit(f"⚠️ 상태 확인 중 오류: {e}", logger)
-            time.sleep(1)
-            
+            if not _is_transient_error(e) or transient_errors >= policy.max_transient_errors:
+                _emit(f"❌ 상태 확인 실패: {e}", logger)
+                return False
+            transient_errors += 1
+            _emit(f"⚠️ 상태 확인 중 일시적 오류: {e}", logger)
+            continue
+
+        transient_errors = 0
+        status = data.get('status')
+        if status == 'FINISHED':
+            return True
+        elif status in PollPolicy.TERMINAL_STATUSES:
+            _emit(f"❌ 컨테이너 상태 오류: {data.get('error_message') or status}", logger)
+            return False
+
+        _emit(f"⏳ 컨테이너 처리 중... (Status: {status})", logger)
+
+    _emit(f"❌ 컨테이너 상태 확인 시간 초과 ({policy.deadline:.0f}초)", logger)
     return False
 
 def publish_container(user_id, container_id, token, logger=None):
-    url = f"{BASE}/{user_id}/threads_publish"
-    payload = {
-        'creation_id': container_id,
-        'access_token': token
-    }
-    response = requests.post(url, data=payload, timeout=20)
+    import requests
+
     try:
-        response.raise_for_status()
-        return response.json()
+        return get_client().publish_container(user_id, container_id, token)
     except requests.exceptions.HTTPError as e:
         _emit(f"❌ 게시 실패: {e}", logger)
-        _emit(f"응답 내용: {response.text}", logger)
+        _emit(f"응답 내용: {e.response.text}", logger)
         raise
 
 def get_permalink(media_id, token=None):
     if token is None:
         token = get_token()
-    r = requests.get(f"{BASE}/{media_id}", params={"fields":"permalink","access_token":token}, timeout=20)
-    r.raise_for_status()
-    return r.json()["permalink"]
+    return get_client().get_permalink(media_id, token)
+
+
+class MediaMetadataFetcher:
+    """
+    Collects media IDs and resolves their metadata with multi-ID requests
+    (one request per MAX_IDS_PER_REQUEST IDs). Resolved entries are cached.
+
+    Example:
+        fetcher = MediaMetadataFetcher(token)
+        for result in results:
+            fetcher.add(result["media_id"])
+        permalinks = fetcher.permalinks()
+    """
 
-def _post_text_to_threads(user_id: str, text: str, token: str, logger: Logger = None):
-    """Create, publish, and return metadata for a single Threads post."""
+    def __init__(self, token=None, fields=("permalink", "timestamp", "shortcode")):
+        self.token = token or get_token()
+        self.fields = tuple(dict.fromkeys(("permalink",) + tuple(fields)))
+        self._pending = []
+        self._resolved = {}
+
+    def add(self, media_id) -> None:
+        if media_id and media_id not in self._resolved and media_id not in self._pending:
+            self._pending.append(media_id)
+
+    def resolve(self) -> dict:
+        """Fetches every pending ID. Returns {media_id: {field: value}} for all known IDs."""
+        client = get_client()
+        while self._pending:
+            chunk = self._pending[:MAX_IDS_PER_REQUEST]
+            data = client.get_media_fields(chunk, self.token, self.fields)
+            for media_id in chunk:
+                self._resolved[media_id] = data.get(media_id, {})
+            del self._pending[:len(chunk)]
+        return dict(self._resolved)
+
+    def permalinks(self) -> dict:
+        return {media_id: meta.get("permalink") for media_id, meta in self.resolve().items()}
+
+
+def get_permalinks(media_ids, token=None) -> dict:
+    """Resolves many permalinks in bulk. Returns {media_id: permalink}."""
+    fetcher = MediaMetadataFetcher(token, fields=("permalink",))
+    for media_id in media_ids:
+        fetcher.add(media_id)
+    return fetcher.permalinks()
+
+
+def fill_permalinks(results, token=None, logger: Logger = None) -> None:
+    """Fills in 'permalink' for results published with fetch_permalink=False."""
+    missing = [r for r in results if r and r.get("media_id") and not r.get("permalink")]
+    if not missing:
+        return
+    _emit(f"🔗 Permalink {len(missing)}개 일괄 조회 중...", logger)
+    try:
+        permalinks = get_permalinks([r["media_id"] for r in missing], token=token)
+    except Exception as e:
+        _emit(f"⚠️ Permalink 일괄 조회 실패: {e}", logger)
+        return
+    for result in missing:
+        result["permalink"] = permalinks.get(result["media_id"])
+
+def _post_text_to_threads(user_id: str, text: str, token: str, logger: Logger = None, fetch_permalink: bool = True):
+    """
+    Create, publish, and return metadata for a single Threads post.
+    With fetch_permalink=False the permalink is left as None so callers can
+    resolve many of them at once with fill_permalinks().
+    """
     try:
         # 1. Create Container
         _emit("📦 컨테이너 생성 중...", logger)
@@ -310,10 +1308,13 @@ def _post_text_to_threads(user_id: str, text: str, token: str, logger: Logger =
         _emit("🚀 Threads에 게시 중...", logger)
         publish_result = publish_container(user_id, container_id, token, logger)
         media_id = publish_result.get('id')
+        record_posted(text)
         
         # 4. Get Permalink
-        _emit("🔗 Permalink 가져오는 중...", logger)
-        permalink = get_permalink(media_id, token=token)
+        permalink = None
+        if fetch_permalink:
+            _emit("🔗 Permalink 가져오는 중...", logger)
+            permalink = get_permalink(media_id, token=token)
         
         return {
             "media_id": media_id,
@@ -331,7 +1332,8 @@ def post_gpt_generated_text(
     topic=None,
     model="gpt-4o",
     token=None,
-    logger: Logger = None
+    logger: Logger = None,
+    stream: bool = False,
 ):
     """
     AI 모델로 텍스트를 생성하고 Threads에 게시하는 전체 플로우를 실행합니다.
@@ -341,6 +1343,7 @@ def post_gpt_generated_text(
         model (str): 사용할 AI 모델 ("gpt-4o" 또는 "gemini-2.5-flash")
         token (str, optional): Threads 액세스 토큰 (None이면 .env에서 읽음)
         logger (Logger, optional): 로그 함수
+        stream (bool): True이면 생성 중인 텍스트를 실시간으로 출력
     
     Returns:
         dict: 게시 결과 (media_id, permalink 등 포함)
@@ -348,7 +1351,7 @@ def post_gpt_generated_text(
     # 1단계: AI로 텍스트 생성
     model_name = "GPT" if model.startswith("gpt") else "Gemini"
     _emit(f"🤖 {model_name}로 텍스트 생성 중...", logger)
-    text = generate_text_with_ai(model=model, topic=topic, logger=logger)
+    text = generate_text_with_ai(model=model, prompt=topic, logger=logger, stream=stream)
     _emit(f"생성된 텍스트: {text[:100]}...", logger)
 
     # 2단계: Threads 사용자 정보 가져오기
@@ -377,6 +1380,7 @@ def post_multiple_gpt_texts(
     model="gpt-4o",
     token=None,
     logger: Logger = None,
+    stream: bool = False,
 ) -> List[dict]:
     """
     지정된 횟수만큼 Threads에 AI 생성 게시물을 순차적으로 업로드합니다.
@@ -388,6 +1392,7 @@ def post_multiple_gpt_texts(
         model (str): 사용할 AI 모델 ("gpt-4o" 또는 "gemini-2.5-flash").
         token (str, optional): Threads 액세스 토큰.
         logger (callable, optional): 로그 메시지를 처리할 콜백.
+        stream (bool): True이면 생성 중인 텍스트를 실시간으로 출력.
 
     Returns:
         List[dict]: 각 게시물의 결과 정보 목록.
@@ -413,31 +1418,57 @@ def post_multiple_gpt_texts(
     for idx in range(count):
         _emit(f"\n===== 게시 {idx + 1}/{count} 시작 =====", logger)
         _emit(f"🤖 {model_name}로 텍스트 생성 중...", logger)
-        text = generate_text_with_ai(model=model, topic=topic, logger=logger)
+        text = generate_text_with_ai(model=model, prompt=topic, logger=logger, stream=stream)
         _emit(f"생성된 텍스트: {text[:100]}...", logger)
 
-        result = _post_text_to_threads(threads_user_id, text, token, logger=logger)
-        result["sequence"] = idx + 1
-        result["username"] = username
-        results.append(result)
-
-        _emit(f"✅ 게시 {idx + 1}/{count} 완료! Permalink: {result['permalink']}", logger)
+        # Permalinks are resolved in one batch after the last post.
+        result = _post_text_to_threads(threads_user_id, text, token, logger=logger, fetch_permalink=False)
+        if result is None:
+            _emit(f"❌ 게시 {idx + 1}/{count} 실패", logger)
+        else:
+            result["sequence"] = idx + 1
+            result["username"] = username
+            results.append(result)
+            _emit(f"✅ 게시 {idx + 1}/{count} 완료! Media ID: {result['media_id']}", logger)
 
         if idx < count - 1 and interval_seconds > 0:
             _emit(f"⏳ 다음 게시까지 {interval_seconds}초 대기합니다...", logger)
             time.sleep(interval_seconds)
 
+    fill_permalinks(results, token=token, logger=logger)
+    for result in results:
+        _emit(f"🔗 [{result['sequence']}] {result['permalink']}", logger)
+
     _emit("\n🎉 모든 게시가 완료되었습니다!", logger)
     return results
 
 if __name__ == "__main__":
     import argparse
 
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        # Headless scheduler daemon: python post_to_threads.py serve [--db PATH]
+        from scheduler import main as scheduler_main
+        scheduler_main(sys.argv[1:])
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "accounts":
+        # Account registry and multi-account publishing: python post_to_threads.py accounts publish
+        from accounts import main as accounts_main
+        accounts_main(sys.argv[2:])
+        sys.exit(0)
+
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # Bulk generation through the batch APIs: python post_to_threads.py batch submit --prompt-file brief.txt
+        from batch_jobs import main as batch_main
+        batch_main(sys.argv[2:])
+        sys.exit(0)
+
     parser = argparse.ArgumentParser(description="Threads에 AI 생성 콘텐츠를 자동 게시합니다.")
     parser.add_argument("topic", nargs="?", help="AI가 생성할 콘텐츠 주제 (미입력 시 기본 테스트 모드 실행)")
     parser.add_argument("--count", type=int, default=5, help="게시할 게시물 수 (기본값: 5)")
     parser.add_argument("--interval", dest="interval_seconds", type=int, default=60, help="게시 간격(초) (기본값: 60)")
     parser.add_argument("--model", default="gpt-4o", choices=["gpt-4o", "gemini-2.5-flash"], help="사용할 AI 모델 (기본값: gpt-4o)")
+    parser.add_argument("--stream", action="store_true", help="생성 중인 텍스트를 실시간으로 출력")
     args = parser.parse_args()
 
     if args.topic:
@@ -449,6 +1480,7 @@ if __name__ == "__main__":
             count=args.count,
             interval_seconds=args.interval_seconds,
             model=args.model,
+            stream=args.stream,
         )
     else:
         print("=" * 60)
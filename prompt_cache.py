@@ -0,0 +1,142 @@
+"""
+Provider-side prompt caching for long, repeated generation prefixes.
+
+A generation session resends the same instruction prompt (the brand brief) on every
+"write one more" turn. Both providers can serve such a prefix from a cache:
+  - Gemini: the brief is uploaded once with caches.create and later requests pass the
+    returned cachedContents/... name as cached_content, sending only the rest of the turn.
+  - OpenAI: prompts that start with the same >=1024 tokens are cached automatically;
+    ContentGenerator keeps the system prompt and the brief at the very front of every
+    request and passes a prompt_cache_key derived from them so the requests are routed
+    to the same cache.
+
+PromptCacheRegistry remembers the Gemini handles with their expiry time, so every
+generator of the process (e.g. each button press in Streamlit) reuses a live cache for
+the same model, system prompt and brief. A provider/model whose cache creation fails is
+skipped for a cool-down period and requests go out uncached.
+
+PROMPT_CACHE_DISABLED=1 turns provider caching off; PROMPT_CACHE_TTL_SECONDS sets the
+lifetime of new Gemini caches (default one hour).
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+
+DEFAULT_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", "3600"))
+
+# Smallest prefix (estimated tokens) worth an explicit Gemini cache; smaller ones are rejected.
+GEMINI_MIN_CACHE_TOKENS = 1024
+GEMINI_PRO_MIN_CACHE_TOKENS = 4096
+
+
+def min_cache_tokens(model: str) -> int:
+    return GEMINI_PRO_MIN_CACHE_TOKENS if "pro" in model else GEMINI_MIN_CACHE_TOKENS
+
+
+def prefix_key(provider: str, model: str, *parts: str) -> str:
+    """Content address of a cached prefix."""
+    digest = hashlib.sha256()
+    for part in (provider, model) + parts:
+        digest.update((part or "").encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class CacheHandle(NamedTuple):
+    name: str
+    provider: str
+    model: str
+    expires_at: float
+    tokens: int
+
+
+class PromptCacheRegistry:
+    """
+    Process-wide registry of provider cache handles.
+
+    A handle is considered gone safety_margin seconds before it expires, so a request
+    never references a cache that expires on the way. Creation is serialized per key:
+    concurrent generators with the same prefix create one cache, not one each.
+    """
+
+    def __init__(self, safety_margin: float = 60.0, unavailable_cooldown: float = 3600.0):
+        self.safety_margin = safety_margin
+        self.unavailable_cooldown = unavailable_cooldown
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._handles: Dict[str, CacheHandle] = {}
+        self._creating: Dict[str, threading.Lock] = {}
+        self._unavailable: Dict[tuple, float] = {}
+
+    def get(self, key: str) -> Optional[CacheHandle]:
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None and handle.expires_at - self.safety_margin <= time.time():
+                del self._handles[key]
+                handle = None
+            return handle
+
+    def put(self, key: str, name: str, provider: str, model: str, ttl_seconds: float, tokens: int = 0) -> CacheHandle:
+        handle = CacheHandle(name, provider, model, time.time() + ttl_seconds, tokens)
+        with self._lock:
+            self._handles[key] = handle
+        return handle
+
+    def get_or_create(self, key: str, create: Callable[[], Optional[CacheHandle]]) -> Optional[CacheHandle]:
+        """Returns the live handle for key, calling create() (once across threads) when there is none."""
+        handle = self.get(key)
+        if handle is not None:
+            self.hits += 1
+            return handle
+        with self._lock:
+            creating = self._creating.setdefault(key, threading.Lock())
+        with creating:
+            handle = self.get(key)
+            if handle is not None:
+                self.hits += 1
+                return handle
+            self.misses += 1
+            return create()
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._handles.pop(key, None)
+
+    def mark_unavailable(self, provider: str, model: str) -> None:
+        """Skips caching for provider/model during the cool-down (e.g. unsupported model, prefix too short)."""
+        with self._lock:
+            self._unavailable[(provider, model)] = time.time() + self.unavailable_cooldown
+
+    def is_available(self, provider: str, model: str) -> bool:
+        with self._lock:
+            until = self._unavailable.get((provider, model))
+            if until is not None and until <= time.time():
+                del self._unavailable[(provider, model)]
+                until = None
+            return until is None
+
+    def handles(self):
+        with self._lock:
+            return list(self._handles.values())
+
+    def __len__(self) -> int:
+        return len(self.handles())
+
+
+_default_registry: Optional[PromptCacheRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_prompt_cache_registry() -> Optional[PromptCacheRegistry]:
+    """Process-wide registry, or None when disabled with PROMPT_CACHE_DISABLED=1."""
+    global _default_registry
+    if os.getenv("PROMPT_CACHE_DISABLED") == "1":
+        return None
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = PromptCacheRegistry()
+        return _default_registry
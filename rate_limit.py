@@ -0,0 +1,185 @@
+"""
+Shared per-provider rate limiting.
+
+Every outbound call to OpenAI, Gemini, Google Sheets and the Threads Graph API acquires
+from the provider's limiter first. Each limiter has a request bucket (requests/minute) and
+optionally a token bucket (tokens/minute), so throughput runs at the configured quota
+instead of a fixed sleep per item.
+
+In adaptive mode the effective rate is halved on every throttling signal (429/503,
+Retry-After) and recovers additively on successful calls.
+
+Quotas are read from the environment, e.g. OPENAI_RPM=500, OPENAI_TPM=30000. Threads
+quotas apply per access token: get_limiter("threads", key=token) gives every account its
+own buckets, so publishing for several accounts is not capped by a single 120 RPM bucket.
+"""
+
+import os
+import threading
+import time
+from typing import Optional
+
+from metrics import observe
+
+# Requests/minute and tokens/minute per provider. Tokens are only limited for LLMs.
+# "threads" is a per-account default: each key passed to get_limiter() gets these quotas.
+DEFAULT_QUOTAS = {
+    "openai": (500, 30000),
+    "gemini": (1000, 1000000),
+    "sheets": (60, None),
+    "threads": (120, None),
+}
+
+
+class TokenBucket:
+    """
+    Token bucket that allows debt: reserve() always succeeds and returns how long the
+    caller has to wait, so concurrent callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity if capacity is not None else max(1.0, per_minute / 6.0)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float, factor: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate * factor)
+        self.updated_at = now
+
+    def reserve(self, amount: float, factor: float = 1.0) -> float:
+        now = time.monotonic()
+        self._refill(now, factor)
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / (self.rate * factor)
+
+    def give_back(self, amount: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ProviderLimiter:
+    """Request and token buckets for one provider, with optional adaptive slow-down."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        adaptive: bool = True,
+        min_factor: float = 0.1,
+        recovery_step: float = 0.05,
+    ):
+        self.name = name
+        self.adaptive = adaptive
+        self.min_factor = min_factor
+        self.recovery_step = recovery_step
+        self.factor = 1.0
+        self.throttle_count = 0
+        self._blocked_until = 0.0
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: float) -> float:
+        with self._lock:
+            wait = self._requests.reserve(1, self.factor)
+            if self._tokens is not None and tokens:
+                wait = max(wait, self._tokens.reserve(tokens, self.factor))
+            return max(wait, self._blocked_until - time.monotonic())
+
+    def acquire(self, tokens: float = 0) -> float:
+        """Blocks until one request (and the estimated tokens) may be sent. Returns the wait in seconds."""
+        wait = self._reserve(tokens)
+        observe(f"ratelimit.{self.name}", max(0.0, wait))
+        if wait > 0:
+            time.sleep(wait)
+        return max(0.0, wait)
+
+    async def acquire_async(self, tokens: float = 0) -> float:
+        """Async version of acquire()."""
+        import asyncio
+
+        wait = self._reserve(tokens)
+        observe(f"ratelimit.{self.name}", max(0.0, wait))
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return max(0.0, wait)
+
+    def record_tokens(self, estimated: float, actual: Optional[float]) -> None:
+        """Corrects the token bucket once the real usage of a call is known."""
+        if self._tokens is None or actual is None:
+            return
+        with self._lock:
+            if actual > estimated:
+                self._tokens.reserve(actual - estimated, self.factor)
+            else:
+                self._tokens.give_back(estimated - actual)
+
+    def on_throttle(self, retry_after: Optional[float] = None) -> None:
+        """Call on 429/503: halves the rate (adaptive mode) and pauses until Retry-After."""
+        with self._lock:
+            self.throttle_count += 1
+            if self.adaptive:
+                self.factor = max(self.min_factor, self.factor / 2)
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, time.monotonic() + retry_after)
+
+    def on_success(self) -> None:
+        """Call after a successful request so an adaptive limiter speeds back up."""
+        if self.adaptive and self.factor < 1.0:
+            with self._lock:
+                self.factor = min(1.0, self.factor + self.recovery_step)
+
+
+_limiters = {}
+_configured = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_number(key: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(key)
+    if not value:
+        return default
+    return float(value) if float(value) > 0 else None
+
+
+def get_limiter(provider: str, key: Optional[str] = None) -> ProviderLimiter:
+    """
+    Returns the process-wide limiter for a provider ("openai", "gemini", "sheets", "threads"),
+    or for one key of it (e.g. an access token) when the quota is per account.
+    Quotas come from configure(), then <PROVIDER>_RPM / <PROVIDER>_TPM, falling back to
+    DEFAULT_QUOTAS; RATE_LIMIT_ADAPTIVE=0 disables adaptive slow-down.
+    """
+    cache_key = provider if key is None else (provider, key)
+    with _limiters_lock:
+        limiter = _limiters.get(cache_key)
+        if limiter is None:
+            if provider in _configured:
+                limiter = ProviderLimiter(provider, *_configured[provider])
+            else:
+                rpm, tpm = DEFAULT_QUOTAS.get(provider, (60, None))
+                prefix = provider.upper()
+                limiter = ProviderLimiter(
+                    provider,
+                    requests_per_minute=_env_number(f"{prefix}_RPM", rpm) or rpm,
+                    tokens_per_minute=_env_number(f"{prefix}_TPM", tpm),
+                    adaptive=os.getenv("RATE_LIMIT_ADAPTIVE", "1") != "0",
+                )
+            _limiters[cache_key] = limiter
+        return limiter
+
+
+def configure(provider: str, requests_per_minute: float, tokens_per_minute: Optional[float] = None, adaptive: bool = True) -> ProviderLimiter:
+    """
+    Replaces a provider's limiter, e.g. after upgrading a quota tier. Per-key limiters of the
+    provider are dropped and pick up the new quotas on their next get_limiter() call.
+    """
+    limiter = ProviderLimiter(provider, requests_per_minute, tokens_per_minute, adaptive)
+    with _limiters_lock:
+        _configured[provider] = (requests_per_minute, tokens_per_minute, adaptive)
+        for cache_key in [k for k in _limiters if isinstance(k, tuple) and k[0] == provider]:
+            del _limiters[cache_key]
+        _limiters[provider] = limiter
+    return limiter
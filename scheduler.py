@@ -0,0 +1,577 @@
+"""
+Headless auto-posting scheduler.
+
+Schedules ("jobs") are persisted in a SQLite file shared with the Streamlit app. Streamlit
+only submits and inspects jobs; the daemon started with `python post_to_threads.py serve`
+drives the pop → publish → mark flow of every active job from a single asyncio event loop,
+ordered by a priority queue of due times. Sheets calls run in the default thread pool and
+Threads calls share one pooled AsyncThreadsClient, so many schedules need no thread each.
+
+    python post_to_threads.py serve
+    python scheduler.py add --sheets 영어,스페인어 --interval 60
+    python scheduler.py add --account brand-en --interval 30
+    python scheduler.py list
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional
+
+import google_sheets
+from dedupe import record_posted
+from metrics import JSONLSink, get_registry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.getenv("SCHEDULER_DB_PATH", os.path.join(BASE_DIR, "scheduler.sqlite3"))
+
+STATUS_ACTIVE = "active"
+STATUS_PAUSED = "paused"
+STATUS_FINISHED = "finished"
+STATUS_CANCELLED = "cancelled"
+
+# Delay before retrying a job whose run raised (e.g. Sheets outage).
+ERROR_RETRY_SECONDS = 60
+
+# How long before its slot the next item is popped and its container created and verified.
+DEFAULT_LEAD_SECONDS = 120
+# Staged containers older than this are recreated at publish time instead of published.
+STAGED_MAX_AGE_SECONDS = 12 * 3600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    sheets TEXT NOT NULL,
+    interval_seconds REAL NOT NULL,
+    token_env TEXT NOT NULL,
+    next_run REAL NOT NULL,
+    counter INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    last_result TEXT,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    job_id INTEGER NOT NULL,
+    sheet TEXT NOT NULL,
+    text TEXT,
+    ok INTEGER NOT NULL,
+    permalink TEXT,
+    error TEXT,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_job_id ON runs (job_id, id);
+CREATE TABLE IF NOT EXISTS staged (
+    job_id INTEGER PRIMARY KEY,
+    sheet TEXT NOT NULL,
+    row_index INTEGER,
+    text TEXT NOT NULL,
+    container_id TEXT,
+    staged_at REAL NOT NULL
+);
+"""
+
+
+def _log(message: str) -> None:
+    print(f"[{time.strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+class JobStore:
+    """SQLite store of schedules and their run history, shared by the daemon and Streamlit."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def data_version(self) -> int:
+        """Changes whenever another connection (e.g. Streamlit) commits to the store."""
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def add_job(
+        self,
+        sheets: List[str],
+        interval_seconds: float,
+        name: Optional[str] = None,
+        token_env: str = "LONG_LIVED_ACCESS_TOKEN",
+        start_at: Optional[float] = None,
+    ) -> int:
+        if not sheets:
+            raise ValueError("sheets는 비어 있을 수 없습니다.")
+        if interval_seconds <= 0:
+            raise ValueError("interval_seconds는 0보다 커야 합니다.")
+        now = time.time()
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (name, sheets, interval_seconds, token_env, next_run, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    name or "+".join(sheets),
+                    json.dumps(list(sheets), ensure_ascii=False),
+                    interval_seconds,
+                    token_env,
+                    start_at if start_at is not None else now,
+                    STATUS_ACTIVE,
+                    now,
+                    now,
+                ),
+            )
+            return cursor.lastrowid
+
+    def _to_dict(self, row) -> dict:
+        job = dict(row)
+        job["sheets"] = json.loads(job["sheets"])
+        return job
+
+    def list_jobs(self, status: Optional[str] = None) -> List[dict]:
+        query = "SELECT * FROM jobs"
+        params = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY id", params).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def get_job(self, job_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def set_status(self, job_id: int, status: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?", (status, time.time(), job_id)
+            )
+
+    def update_after_run(self, job_id: int, next_run: float, counter: int, **fields) -> None:
+        columns = {"next_run": next_run, "counter": counter, "updated_at": time.time(), **fields}
+        assignments = ", ".join(f"{key} = ?" for key in columns)
+        with self._lock, self._conn:
+            self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*columns.values(), job_id))
+
+    def record_run(self, job_id: int, sheet: str, text: Optional[str], ok: bool,
+                   permalink: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (job_id, sheet, text, ok, permalink, error, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, sheet, text, int(ok), permalink, error, time.time()),
+            )
+
+    def recent_runs(self, limit: int = 50, job_id: Optional[int] = None) -> List[dict]:
+        query = "SELECT * FROM runs"
+        params = []
+        if job_id is not None:
+            query += " WHERE job_id = ?"
+            params.append(job_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_staged(self, job_id: int) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM staged WHERE job_id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def save_staged(self, job_id: int, sheet: str, row_index: Optional[int], text: str,
+                    container_id: Optional[str]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO staged (job_id, sheet, row_index, text, container_id, staged_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, sheet, row_index, text, container_id, time.time()),
+            )
+
+    def clear_staged(self, job_id: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM staged WHERE job_id = ?", (job_id,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _resolve_token(token_env: str) -> str:
+    token = os.getenv(token_env)
+    if not token:
+        raise ValueError(f"{token_env}이 환경 변수에 설정되지 않았습니다.")
+    return token.strip().strip('"').strip("'")
+
+
+class Scheduler:
+    """
+    Runs every active job of a JobStore from one event loop.
+
+    Each job alternates between two events kept in a heap:
+      - "stage", lead_seconds before the slot: pop the next item, create its container
+        and wait until it is FINISHED;
+      - "publish", at the slot: only threads_publish runs, so the post goes live on time.
+    Slots are computed from the previous slot (not from when the publish finished), so
+    the schedule does not drift. The loop sleeps until the earliest event (or poll_interval,
+    to pick up jobs changed from Streamlit). A job is pushed back onto the heap only after
+    its current event finished, so events of one job never overlap.
+    """
+
+    def __init__(self, store: JobStore, poll_interval: float = 5.0, max_concurrency: int = 10,
+                 lead_seconds: float = DEFAULT_LEAD_SECONDS):
+        self.store = store
+        self.poll_interval = poll_interval
+        self.max_concurrency = max_concurrency
+        self.lead_seconds = lead_seconds
+        self._heap = []
+        self._planned = {}
+        self._running = set()
+        self._users = {}
+        self._data_version = None
+        self._stop = None
+        self.client = None
+
+    def _lead(self, job: dict) -> float:
+        return min(self.lead_seconds, job["interval_seconds"] / 2)
+
+    def _load(self) -> None:
+        """Rebuilds the heap from the store, leaving running jobs to reschedule themselves."""
+        self._heap = []
+        self._planned = {}
+        for job in self.store.list_jobs(STATUS_ACTIVE):
+            if job["id"] in self._running:
+                continue
+            if self.store.get_staged(job["id"]):
+                self._planned[job["id"]] = (job["next_run"], "publish")
+            else:
+                self._planned[job["id"]] = (job["next_run"] - self._lead(job), "stage")
+            due, kind = self._planned[job["id"]]
+            self._heap.append((due, job["id"], kind))
+        heapq.heapify(self._heap)
+        self._data_version = self.store.data_version()
+
+    def _push(self, job_id: int, due: float, kind: str) -> None:
+        self._planned[job_id] = (due, kind)
+        heapq.heappush(self._heap, (due, job_id, kind))
+
+    def stop(self) -> None:
+        if self._stop is not None:
+            self._stop.set()
+
+    async def run(self) -> None:
+        # Imported here so the job CLI and the Streamlit job panel do not load aiohttp.
+        from threads_async import AsyncThreadsClient
+
+        self._stop = asyncio.Event()
+        tasks = set()
+        async with AsyncThreadsClient(max_concurrency=self.max_concurrency) as client:
+            self.client = client
+            self._load()
+            _log(f"🗓️ 스케줄러 시작: 활성 작업 {len(self._heap)}개")
+
+            while not self._stop.is_set():
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    due, job_id, kind = heapq.heappop(self._heap)
+                    # Skip stale heap entries left by reloads or reschedules.
+                    if self._planned.get(job_id) != (due, kind) or job_id in self._running:
+                        continue
+                    del self._planned[job_id]
+                    self._running.add(job_id)
+                    task = asyncio.create_task(self._run_job(job_id, kind))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                wait = self.poll_interval
+                if self._heap:
+                    wait = max(0.0, min(wait, self._heap[0][0] - time.time()))
+                try:
+                    await asyncio.wait_for(self._stop.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+
+                if self.store.data_version() != self._data_version:
+                    self._load()
+
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        _log("🛑 스케줄러 종료")
+
+    async def _user_id(self, token: str) -> str:
+        if token not in self._users:
+            self._users[token] = await self.client.me(token)
+        return self._users[token]["id"]
+
+    async def _run_job(self, job_id: int, kind: str) -> None:
+        try:
+            job = self.store.get_job(job_id)
+            if job is None or job["status"] != STATUS_ACTIVE:
+                return
+            if kind == "stage":
+                await self._stage(job)
+                # Publish at the slot whether or not staging worked; an unstaged slot
+                # falls back to the full flow.
+                job = self.store.get_job(job_id)
+                if job["status"] == STATUS_ACTIVE:
+                    self._push(job_id, job["next_run"], "publish")
+            else:
+                next_run = await self._publish(job)
+                if next_run is not None:
+                    if self.store.get_staged(job_id):
+                        # The run failed with a popped item still staged: publish that item
+                        # again instead of staging (and popping) another one over it.
+                        self._push(job_id, self.store.get_job(job_id)["next_run"], "publish")
+                    else:
+                        self._push(job_id, next_run - self._lead(job), "stage")
+        finally:
+            self._running.discard(job_id)
+
+    def _log_job(self, job: dict, message: str) -> None:
+        _log(f"[{job['name']}#{job['id']}] {message}")
+
+    async def _pop_next(self, job: dict):
+        """Round-robin over the job's sheets, skipping empty ones. Returns (sheet, text, row_index, counter)."""
+        counter = job["counter"]
+        # One batched read of all the job's sheets; the pick and the pop both use it.
+        snapshot = await asyncio.to_thread(google_sheets.queue_snapshot, job["sheets"])
+        sheet, skipped = snapshot.next_sheet(counter)
+        if sheet is None:
+            return None, None, None, counter
+        text, row_index = await asyncio.to_thread(google_sheets.pop_from_queue, sheet, None, snapshot)
+        return sheet, text, row_index, counter + skipped + 1
+
+    async def _mark_failed(self, job: dict, sheet: str, text: str, row_index: Optional[int], error: str) -> None:
+        if row_index:
+            await asyncio.to_thread(google_sheets.mark_as_failed, sheet, row_index)
+        self.store.record_run(job["id"], sheet, text, False, error=error)
+        self._log_job(job, f"❌ [{sheet}] 게시 실패. (시트에 실패로 표시합니다)")
+
+    async def _stage(self, job: dict) -> None:
+        """Pops the next item and prepares its container ahead of the slot."""
+        logger = lambda message: self._log_job(job, message)
+        if self.store.get_staged(job["id"]):
+            # An earlier item is still waiting to be published; never pop over it.
+            return
+        try:
+            token = _resolve_token(job["token_env"])
+            user_id = await self._user_id(token)
+            while True:
+                sheet, text, row_index, counter = await self._pop_next(job)
+                if not text:
+                    logger("모든 시트의 콘텐츠가 소진되었습니다. 작업을 종료합니다.")
+                    self.store.update_after_run(job["id"], job["next_run"], counter, status=STATUS_FINISHED)
+                    return
+                self.store.update_after_run(job["id"], job["next_run"], counter)
+                job["counter"] = counter
+                # Persist the popped item before touching Threads so a restart cannot lose it.
+                self.store.save_staged(job["id"], sheet, row_index, text, None)
+
+                logger(f"[{sheet}] 게시 준비 중: {text[:30]}...")
+                container_id = await self.client.prepare_container(user_id, text, token, logger=logger)
+                if container_id:
+                    self.store.save_staged(job["id"], sheet, row_index, text, container_id)
+                    logger(f"📦 [{sheet}] 컨테이너 준비 완료, {job['next_run'] - time.time():.0f}초 후 게시")
+                    return
+
+                # The container failed: mark the item and stage the next one if there is time.
+                self.store.clear_staged(job["id"])
+                await self._mark_failed(job, sheet, text, row_index, "container failed")
+                if time.time() >= job["next_run"]:
+                    return
+        except Exception as e:
+            logger(f"⚠️ 사전 준비 실패, 게시 시각에 다시 시도합니다: {e}")
+
+    async def _failed_publish_outcome(self, container_id: str, token: str, error: Exception) -> str:
+        """
+        After threads_publish raised: "published" if the container went live anyway,
+        "recreate" if it can never be published (expired/errored container, or a definitive
+        4xx), "retry" if that cannot be told (timeouts, 5xx, status lookup failing).
+        """
+        from post_to_threads import PollPolicy
+
+        status = getattr(error, "status", None)
+        definitive = status is not None and 400 <= status < 500 and status not in (408, 429)
+        try:
+            state = (await self.client.get_container_status(container_id, token)).get("status")
+        except Exception:
+            return "recreate" if definitive else "retry"
+        if state == "PUBLISHED":
+            return "published"
+        if state in PollPolicy.TERMINAL_STATUSES or definitive:
+            return "recreate"
+        return "retry"
+
+    async def _publish(self, job: dict) -> Optional[float]:
+        """Publishes the staged container at the slot. Returns the next slot, or None if the job ended."""
+        logger = lambda message: self._log_job(job, message)
+        slot = job["next_run"]
+        try:
+            token = _resolve_token(job["token_env"])
+            user_id = await self._user_id(token)
+
+            staged = self.store.get_staged(job["id"])
+            if staged is None:
+                # Staging did not happen (error or restart): run the full flow now.
+                sheet, text, row_index, counter = await self._pop_next(job)
+                if not text:
+                    logger("모든 시트의 콘텐츠가 소진되었습니다. 작업을 종료합니다.")
+                    self.store.update_after_run(job["id"], slot, counter, status=STATUS_FINISHED)
+                    return None
+                self.store.update_after_run(job["id"], slot, counter)
+                self.store.save_staged(job["id"], sheet, row_index, text, None)
+                staged = self.store.get_staged(job["id"])
+
+            sheet, text, row_index = staged["sheet"], staged["text"], staged["row_index"]
+            container_id = staged["container_id"]
+            if container_id and time.time() - staged["staged_at"] > STAGED_MAX_AGE_SECONDS:
+                container_id = None
+
+            result = None
+            if container_id:
+                try:
+                    published = await self.client.publish_container(user_id, container_id, token)
+                    record_posted(text)
+                    result = {
+                        "media_id": published.get("id"),
+                        "creation_id": container_id,
+                        "permalink": None,
+                        "text": text,
+                        "user_id": user_id,
+                    }
+                except Exception as e:
+                    outcome = await self._failed_publish_outcome(container_id, token, e)
+                    if outcome == "published":
+                        # The request failed on the way back, but the post is live.
+                        record_posted(text)
+                        result = {"media_id": None, "creation_id": container_id, "permalink": None,
+                                  "text": text, "user_id": user_id}
+                    elif outcome == "retry":
+                        # Timeout / 5xx: the post may be live, so do not create a new one.
+                        # The staged row stays and the publish is retried (see _run_job).
+                        raise RuntimeError(f"게시 결과를 알 수 없어 같은 컨테이너로 다시 시도합니다: {e}")
+                    else:
+                        logger(f"⚠️ 준비된 컨테이너를 게시할 수 없어 다시 생성합니다: {e}")
+                if result is not None and result["media_id"]:
+                    # The post is live; the permalink is only metadata and may fail on its own.
+                    try:
+                        result["permalink"] = await self.client.get_permalink(result["media_id"], token)
+                    except Exception as e:
+                        logger(f"⚠️ Permalink 조회 실패: {e}")
+            if result is None:
+                result = await self.client.post_text(user_id, text, token, logger=logger)
+
+            self.store.clear_staged(job["id"])
+            if result:
+                await asyncio.to_thread(google_sheets.ack_item, sheet, row_index)
+                self.store.record_run(job["id"], sheet, text, True, permalink=result.get("permalink"))
+                delay = time.time() - slot
+                logger(f"✅ [{sheet}] 게시 성공! (예정 대비 {delay:+.1f}초) Link: {result.get('permalink')}")
+            else:
+                await self._mark_failed(job, sheet, text, row_index, "publish failed")
+
+            # Next slot from the previous one, skipping slots missed while the daemon was down.
+            next_run = slot + job["interval_seconds"]
+            while next_run <= time.time():
+                next_run += job["interval_seconds"]
+            self.store.update_after_run(
+                job["id"], next_run, self.store.get_job(job["id"])["counter"],
+                last_result="ok" if result else "failed", last_error=None,
+            )
+            return next_run
+        except Exception as e:
+            logger(f"❌ 오류 발생: {e}")
+            next_run = time.time() + ERROR_RETRY_SECONDS
+            self.store.update_after_run(job["id"], next_run, self.store.get_job(job["id"])["counter"], last_error=str(e))
+            return next_run + self._lead(job)
+
+
+def serve(db_path=DEFAULT_DB_PATH, poll_interval: float = 5.0, max_concurrency: int = 10,
+          lead_seconds: float = DEFAULT_LEAD_SECONDS) -> None:
+    store = JobStore(db_path)
+    scheduler = Scheduler(store, poll_interval=poll_interval, max_concurrency=max_concurrency,
+                          lead_seconds=lead_seconds)
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+
+def main(argv=None) -> None:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=DEFAULT_DB_PATH, help="작업 저장소 SQLite 경로")
+    parser = argparse.ArgumentParser(description="Threads 자동 게시 스케줄러")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = sub.add_parser("serve", parents=[common], help="스케줄러 데몬 실행")
+    serve_parser.add_argument("--poll", type=float, default=5.0, help="작업 변경 확인 주기(초)")
+    serve_parser.add_argument("--concurrency", type=int, default=10, help="동시 Threads 요청 수")
+    serve_parser.add_argument("--lead", type=float, default=DEFAULT_LEAD_SECONDS, help="게시 시각 몇 초 전에 컨테이너를 준비할지")
+    serve_parser.add_argument("--metrics-port", type=int, help="Prometheus 지표를 노출할 포트 (/metrics)")
+    serve_parser.add_argument("--metrics-jsonl", help="단계별 지표를 기록할 JSONL 파일 경로")
+
+    add_parser = sub.add_parser("add", parents=[common], help="작업 등록")
+    add_parser.add_argument("--sheets", help="쉼표로 구분한 시트 이름 (예: 영어,스페인어)")
+    add_parser.add_argument("--account", action="append", help="계정 레지스트리(accounts.py)의 계정 이름, 여러 번 지정 가능")
+    add_parser.add_argument("--interval", type=float, required=True, help="게시 간격(분)")
+    add_parser.add_argument("--name", help="작업 이름")
+    add_parser.add_argument("--token-env", default="LONG_LIVED_ACCESS_TOKEN", help="토큰이 들어 있는 환경 변수 이름")
+
+    sub.add_parser("list", parents=[common], help="작업 목록")
+    for command in ("pause", "resume", "cancel"):
+        sub.add_parser(command, parents=[common]).add_argument("job_id", type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        registry = get_registry()
+        if args.metrics_port:
+            registry.serve_prometheus(args.metrics_port)
+            _log(f"📊 지표: http://127.0.0.1:{args.metrics_port}/metrics")
+        if args.metrics_jsonl:
+            registry.add_sink(JSONLSink(args.metrics_jsonl))
+        serve(args.db, poll_interval=args.poll, max_concurrency=args.concurrency, lead_seconds=args.lead)
+        return
+
+    store = JobStore(args.db)
+    try:
+        if args.command == "add":
+            sheets = [s.strip() for s in (args.sheets or "").split(",") if s.strip()]
+            if args.account:
+                # One job per account, with the account's token and (unless given) its sheets.
+                from accounts import load_registry
+
+                registry = load_registry()
+                for account in registry.select(args.account):
+                    job_id = store.add_job(sheets or account.sheets, args.interval * 60,
+                                           name=args.name or account.name, token_env=account.token_env)
+                    print(f"✅ 작업 #{job_id} 등록 완료 (계정: {account.name})")
+            elif not sheets:
+                parser.error("--sheets 또는 --account가 필요합니다.")
+            else:
+                job_id = store.add_job(sheets, args.interval * 60, name=args.name, token_env=args.token_env)
+                print(f"✅ 작업 #{job_id} 등록 완료")
+        elif args.command == "list":
+            for job in store.list_jobs():
+                next_run = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(job["next_run"]))
+                print(f"#{job['id']} {job['name']} [{job['status']}] 시트={','.join(job['sheets'])} "
+                      f"간격={job['interval_seconds'] / 60:.0f}분 다음={next_run}")
+        else:
+            status = {"pause": STATUS_PAUSED, "resume": STATUS_ACTIVE, "cancel": STATUS_CANCELLED}[args.command]
+            store.set_status(args.job_id, status)
+            print(f"✅ 작업 #{args.job_id} → {status}")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
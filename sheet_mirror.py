@@ -0,0 +1,373 @@
+"""
+Local SQLite write-behind mirror of the Google Sheets queues.
+
+Pops, emptiness checks and failure marks are served from a local database, and the
+resulting status changes are written back to the spreadsheet in batches by a background
+thread. The mirror uses the "cursor" queue layout of google_sheets (items stay in Column A,
+Column B holds the status, HEAD_CELL the next row), so row numbers never shift while
+changes are waiting to be synced. The mirror therefore requires SHEETS_QUEUE_MODE=cursor:
+in the "move" layout the rows left in Column A above the head would be popped again by
+any process reading the sheet without the mirror. Run google_sheets.compact_queue() to
+convert a mirrored sheet back to the "move" layout.
+
+Rows edited by hand in the sheet are detected at sync time: a status is only written if
+Column A still holds the text that was popped locally, otherwise the change is recorded
+in the conflicts table and left for an operator.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+import google_sheets
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DB_PATH = os.path.join(BASE_DIR, "queue_mirror.sqlite3")
+MIRRORED_SHEETS = ("쓰레드", "영어", "스페인어")
+
+STATUS_PENDING = ""
+STATUS_CONFLICT = "CONFLICT"
+
+Logger = Optional[Callable[[str], None]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    sheet TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (sheet, row)
+);
+CREATE TABLE IF NOT EXISTS heads (
+    sheet TEXT PRIMARY KEY,
+    head INTEGER NOT NULL,
+    refreshed_at REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conflicts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    sheet TEXT NOT NULL,
+    row INTEGER NOT NULL,
+    local_text TEXT NOT NULL,
+    sheet_text TEXT NOT NULL,
+    status TEXT NOT NULL,
+    detected_at REAL NOT NULL
+);
+"""
+
+
+def _emit(message: str, logger: Logger = None) -> None:
+    if logger:
+        logger(message)
+    else:
+        print(message)
+
+
+class QueueMirror:
+    """
+    SQLite mirror of the queue sheets.
+
+    The queue methods have the same names and return values as the module-level
+    functions in google_sheets, so callers can switch between the two:
+
+        queue = QueueMirror() if use_mirror else google_sheets
+        text, row_index = queue.pop_from_queue(sheet_name="영어")
+    """
+
+    def __init__(
+        self,
+        db_path=DEFAULT_DB_PATH,
+        sheets=MIRRORED_SHEETS,
+        sync_interval=15.0,
+        refresh_interval=300.0,
+        batch_size=200,
+        logger: Logger = None,
+    ):
+        if google_sheets.QUEUE_MODE != "cursor":
+            raise ValueError(
+                "로컬 미러는 커서 방식 대기열에서만 사용할 수 있습니다. "
+                "SHEETS_QUEUE_MODE=cursor 로 설정하세요."
+            )
+        self.sheets = tuple(sheets)
+        self.sync_interval = sync_interval
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.logger = logger
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._stop = threading.Event()
+        self._thread = None
+
+    # --- Local queue operations ---
+
+    def pop_from_queue(self, sheet_name=google_sheets.SHEET_NAME):
+        """Leases the next pending item locally. Returns (text, row_index) or (None, None)."""
+        with self._lock, self._conn:
+            head = self._head(sheet_name)
+            row = self._conn.execute(
+                "SELECT row, text FROM items WHERE sheet = ? AND row >= ? AND status = ? "
+                "ORDER BY row LIMIT 1",
+                (sheet_name, head, STATUS_PENDING),
+            ).fetchone()
+            if row is None:
+                return None, None
+
+            row_index, text = row
+            lease = f"{google_sheets.STATUS_LEASED} {time.strftime('%Y-%m-%dT%H:%M:%S')}"
+            self._set_status(sheet_name, row_index, text, lease)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO heads (sheet, head, refreshed_at) VALUES "
+                "(?, ?, COALESCE((SELECT refreshed_at FROM heads WHERE sheet = ?), 0))",
+                (sheet_name, row_index + 1, sheet_name),
+            )
+            return text, row_index
+
+    def has_pending(self, sheet_name=google_sheets.SHEET_NAME):
+        """Returns True if the local copy of the sheet still has pending items."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM items WHERE sheet = ? AND row >= ? AND status = ? LIMIT 1",
+                (sheet_name, self._head(sheet_name), STATUS_PENDING),
+            ).fetchone()
+        return row is not None
+
+    def get_all_from_queue(self, sheet_name=google_sheets.SHEET_NAME):
+        """Returns the pending items of the local copy of the sheet."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT text FROM items WHERE sheet = ? AND row >= ? AND status = ? ORDER BY row",
+                (sheet_name, self._head(sheet_name), STATUS_PENDING),
+            ).fetchall()
+        return [text for (text,) in rows]
+
+    def ack_item(self, sheet_name, row_index):
+        """Marks a popped item as posted."""
+        self._update_status(sheet_name, row_index, google_sheets.STATUS_DONE)
+
+    def mark_as_failed(self, sheet_name, row_index):
+        """Marks a popped item as failed. The sheet row is formatted red on the next sync."""
+        self._update_status(sheet_name, row_index, google_sheets.STATUS_FAILED)
+
+    def pending_changes(self):
+        """Number of local changes not yet written to the spreadsheet."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def conflicts(self):
+        """Returns the recorded conflicts as a list of dicts, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sheet, row, local_text, sheet_text, status, detected_at "
+                "FROM conflicts ORDER BY id DESC"
+            ).fetchall()
+        keys = ("sheet", "row", "local_text", "sheet_text", "status", "detected_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _head(self, sheet_name):
+        row = self._conn.execute("SELECT head FROM heads WHERE sheet = ?", (sheet_name,)).fetchone()
+        return row[0] if row else 1
+
+    def _update_status(self, sheet_name, row_index, status):
+        if not row_index:
+            return
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT text FROM items WHERE sheet = ? AND row = ?", (sheet_name, row_index)
+            ).fetchone()
+            if row is not None:
+                self._set_status(sheet_name, row_index, row[0], status)
+
+    def _set_status(self, sheet_name, row_index, text, status):
+        now = time.time()
+        self._conn.execute(
+            "UPDATE items SET status = ?, updated_at = ? WHERE sheet = ? AND row = ?",
+            (status, now, sheet_name, row_index),
+        )
+        self._conn.execute(
+            "INSERT INTO outbox (sheet, row, text, status, created_at) VALUES (?, ?, ?, ?, ?)",
+            (sheet_name, row_index, text, status, now),
+        )
+
+    # --- Synchronisation with the spreadsheet ---
+
+    def refresh(self, sheet_names=None):
+        """
+        Loads Columns A:B and the head pointer of each sheet into the mirror.
+        Rows with unsynced local changes are left alone; their conflicts are handled by sync().
+        """
+        for sheet_name in sheet_names or self.sheets:
+            rows, head_values = google_sheets._with_worksheet(
+                sheet_name, lambda ws: ws.batch_get(["A:B", google_sheets.HEAD_CELL]),
+            )
+            sheet_head = google_sheets._parse_head(head_values)
+            now = time.time()
+            with self._lock, self._conn:
+                dirty = {
+                    row for (row,) in self._conn.execute(
+                        "SELECT DISTINCT row FROM outbox WHERE sheet = ?", (sheet_name,)
+                    )
+                }
+                for offset, values in enumerate(rows):
+                    row_index = offset + 1
+                    if row_index in dirty:
+                        continue
+                    text = values[0] if values else ""
+                    status = values[1] if len(values) > 1 else STATUS_PENDING
+                    if not text:
+                        self._conn.execute(
+                            "DELETE FROM items WHERE sheet = ? AND row = ?", (sheet_name, row_index)
+                        )
+                        continue
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO items (sheet, row, text, status, updated_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (sheet_name, row_index, text, status, now),
+                    )
+                self._conn.execute(
+                    "DELETE FROM items WHERE sheet = ? AND row > ?", (sheet_name, len(rows))
+                )
+                head = max(self._head(sheet_name), sheet_head)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO heads (sheet, head, refreshed_at) VALUES (?, ?, ?)",
+                    (sheet_name, head, now),
+                )
+
+    def sync(self):
+        """
+        Writes pending local changes back to the spreadsheet, one read and one batched
+        write per sheet. Returns the number of queued changes processed.
+        Errors (quota, outages) are raised and the changes stay queued for the next attempt.
+        """
+        with self._lock:
+            ops = self._conn.execute(
+                "SELECT id, sheet, row, text, status FROM outbox ORDER BY id LIMIT ?",
+                (self.batch_size,),
+            ).fetchall()
+        if not ops:
+            return 0
+
+        # Only the latest status per row needs to reach the sheet.
+        latest = {}
+        for op_id, sheet_name, row_index, text, status in ops:
+            latest[(sheet_name, row_index)] = (op_id, text, status)
+
+        for sheet_name in sorted({sheet for sheet, _ in latest}):
+            changes = sorted(
+                (row_index, text, status)
+                for (sheet, row_index), (_, text, status) in latest.items()
+                if sheet == sheet_name
+            )
+            self._sync_sheet(sheet_name, changes)
+            op_ids = [op[0] for op in ops if op[1] == sheet_name]
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in op_ids])
+        return len(ops)
+
+    def _sync_sheet(self, sheet_name, changes):
+        with self._lock:
+            head = self._head(sheet_name)
+
+        def _apply(ws):
+            *current, head_values = ws.batch_get(
+                [f"A{row_index}" for row_index, _, _ in changes] + [google_sheets.HEAD_CELL]
+            )
+            updates = []
+            failed_rows = []
+            conflicts = []
+            for (row_index, text, status), values in zip(changes, current):
+                sheet_text = values[0][0] if values and values[0] else ""
+                if sheet_text != text:
+                    conflicts.append((row_index, text, sheet_text, status))
+                    continue
+                updates.append({"range": f"B{row_index}", "values": [[status]]})
+                if status == google_sheets.STATUS_FAILED:
+                    failed_rows.append(row_index)
+            applied = len(updates)
+            # Never move the head back: another process may have advanced it past ours.
+            if head > google_sheets._parse_head(head_values):
+                updates.append({"range": google_sheets.HEAD_CELL, "values": [[head]]})
+            if updates:
+                ws.batch_update(updates)
+            if hasattr(ws, 'format'):
+                for row_index in failed_rows:
+                    ws.format(f"A{row_index}", google_sheets.FAILED_FORMAT)
+            return applied, conflicts
+
+        applied, conflicts = google_sheets._with_worksheet(sheet_name, _apply, requests=2, stage="sheets.write")
+        if conflicts:
+            now = time.time()
+            with self._lock, self._conn:
+                for row_index, text, sheet_text, status in conflicts:
+                    self._conn.execute(
+                        "INSERT INTO conflicts (sheet, row, local_text, sheet_text, status, detected_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (sheet_name, row_index, text, sheet_text, status, now),
+                    )
+                    self._conn.execute(
+                        "UPDATE items SET status = ?, updated_at = ? WHERE sheet = ? AND row = ?",
+                        (STATUS_CONFLICT, now, sheet_name, row_index),
+                    )
+            _emit(f"⚠️ [{sheet_name}] 시트에서 수정된 행 {len(conflicts)}개를 충돌로 기록했습니다.", self.logger)
+        return applied
+
+    # --- Background worker ---
+
+    def start(self):
+        """Starts the background sync thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sheet-mirror-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, flush=True):
+        """Stops the background thread, optionally attempting a final sync."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if flush:
+            try:
+                while self.sync():
+                    pass
+            except Exception as e:
+                _emit(f"⚠️ 시트 동기화 실패, 변경 {self.pending_changes()}건은 다음 실행 시 반영됩니다: {e}", self.logger)
+
+    def _run(self):
+        delay = self.sync_interval
+        last_refresh = time.monotonic()
+        while not self._stop.wait(delay):
+            try:
+                while self.sync() >= self.batch_size:
+                    pass
+                if time.monotonic() - last_refresh >= self.refresh_interval:
+                    self.refresh()
+                    last_refresh = time.monotonic()
+                delay = self.sync_interval
+            except Exception as e:
+                # Quota errors and outages: keep serving locally, back off the sync.
+                delay = min(delay * 2, 600)
+                _emit(f"⚠️ 시트 동기화 오류, {delay:.0f}초 후 재시도: {e}", self.logger)
+
+    def close(self):
+        self.stop()
+        self._conn.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -1,9 +1,17 @@
+import hashlib
 import os
+import threading
 import time
 from typing import List
 import streamlit as st
-from post_to_threads import ContentGenerator, _post_text_to_threads, me, get_token
+from post_to_threads import ContentGenerator, _post_text_to_threads, create_llm_client, me, get_token
 import google_sheets
+from sheet_mirror import QueueMirror
+from scheduler import JobStore
+from metrics import get_registry
+from accounts import MultiAccountPublisher, load_registry
+from llm_failover import FailoverGenerator
+from batch_jobs import BATCH_COLLECTED, BATCH_FAILED, ITEM_FAILED, ITEM_SKIPPED, ITEM_WRITTEN, BatchJobStore
 
 st.set_page_config(page_title="Threads Auto Poster", page_icon="🧵")
 st.title("Threads Auto Poster")
@@ -18,6 +26,63 @@ def _ensure_env_var(key: str, value: str) -> None:
     if value:
         os.environ[key] = value
 
+def _fingerprint(value: str) -> str:
+    """Short hash of a secret, used as a cache key instead of the secret itself."""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16] if value else ""
+
+# --- Cached resources (kept across reruns) ---
+# SDK clients, the job store and the Threads identity survive reruns; they are keyed by
+# a fingerprint of the key they were built with and dropped when that key changes.
+QUEUE_SNAPSHOT_TTL_SECONDS = 30
+
+@st.cache_resource(show_spinner=False)
+def _llm_client(model: str, key_fingerprint: str, _api_key: str):
+    return create_llm_client(model, _api_key)
+
+@st.cache_resource(show_spinner=False)
+def _job_store() -> JobStore:
+    return JobStore()
+
+@st.cache_resource(show_spinner=False)
+def _batch_store() -> BatchJobStore:
+    return BatchJobStore()
+
+@st.cache_data(ttl=QUEUE_SNAPSHOT_TTL_SECONDS, show_spinner=False)
+def _queue_snapshot(sheet_names: tuple) -> dict:
+    """Pending texts per sheet, re-read from Sheets at most once per TTL."""
+    snapshot = google_sheets.queue_snapshot(sheet_names)
+    return {name: snapshot.pending(name) for name in sheet_names}
+
+def _generator(model: str, max_retries: int = 5) -> ContentGenerator:
+    api_key = openai_key if model.startswith("gpt") else google_key
+    return ContentGenerator(model=model, client=_llm_client(model, _fingerprint(api_key), api_key), max_retries=max_retries)
+
+def _failover_generator(model: str) -> FailoverGenerator:
+    """model first, the other model as hedge/failover backend; both fail fast instead of backing off."""
+    other = "gpt-4o" if model.startswith("gemini") else "gemini-2.5-flash"
+    return FailoverGenerator([_generator(model, max_retries=1), _generator(other, max_retries=1)])
+
+def _threads_identity(token: str) -> dict:
+    """me() for the token, remembered in the session until the token changes."""
+    cached = st.session_state.get("threads_identity")
+    if cached and cached[0] == _fingerprint(token):
+        return cached[1]
+    user = me(token=token)
+    st.session_state["threads_identity"] = (_fingerprint(token), user)
+    return user
+
+def _invalidate_on_key_change(keys: dict) -> None:
+    """Drops cached clients and identities built with a key that was changed in the sidebar."""
+    current = {name: _fingerprint(value) for name, value in keys.items()}
+    previous = st.session_state.get("key_fingerprints")
+    st.session_state["key_fingerprints"] = current
+    if previous is None or previous == current:
+        return
+    if previous.get("OPENAI_API_KEY") != current["OPENAI_API_KEY"] or previous.get("GOOGLE_API_KEY") != current["GOOGLE_API_KEY"]:
+        _llm_client.clear()
+    if previous.get("LONG_LIVED_ACCESS_TOKEN") != current["LONG_LIVED_ACCESS_TOKEN"]:
+        st.session_state.pop("threads_identity", None)
+
 # --- Sidebar: Configuration ---
 with st.sidebar:
     st.header("환경 변수 설정")
@@ -37,6 +102,11 @@ with st.sidebar:
     _ensure_env_var("OPENAI_API_KEY", openai_key)
     _ensure_env_var("GOOGLE_API_KEY", google_key)
     _ensure_env_var("LONG_LIVED_ACCESS_TOKEN", threads_token)
+    _invalidate_on_key_change({
+        "OPENAI_API_KEY": openai_key,
+        "GOOGLE_API_KEY": google_key,
+        "LONG_LIVED_ACCESS_TOKEN": threads_token,
+    })
 
     # Check GCP Service Account in secrets
     has_gcp_creds = "gcp_service_account" in st.secrets
@@ -47,6 +117,30 @@ with st.sidebar:
     st.write(f"Threads Token: {'✅' if threads_token else '❌'}")
     st.write(f"GCP Service Account: {'✅' if has_gcp_creds else '❌'}")
 
+    if st.button("🔄 연결 초기화", help="캐시된 API 클라이언트, 시트 연결, Threads 계정 정보를 모두 다시 만듭니다."):
+        _llm_client.clear()
+        _queue_snapshot.clear()
+        google_sheets.invalidate_cache()
+        st.session_state.pop("threads_identity", None)
+        st.success("연결 정보를 초기화했습니다.")
+
+    # Per-stage latency of this Streamlit process (updated on every rerun)
+    with st.expander("📊 단계별 성능 지표"):
+        registry = get_registry()
+        stage_rows = registry.snapshot()
+        if stage_rows:
+            st.bar_chart(stage_rows, x="stage", y="p95", horizontal=True)
+            st.caption("단계별 p95 지연 시간(초)")
+            st.dataframe(stage_rows, hide_index=True)
+            errors = registry.error_counts()
+            if errors:
+                st.write("오류 유형:", errors)
+            tokens = registry.token_counts()
+            if tokens:
+                st.write("LLM 토큰 사용량:", tokens)
+        else:
+            st.caption("아직 기록된 호출이 없습니다.")
+
 # --- Tabs ---
 tab1, tab2, tab3 = st.tabs(["📝 콘텐츠 생성", "🌐 자동 번역", "🚀 자동 게시"])
 
@@ -67,6 +161,12 @@ with tab1:
     
     # 1. Add generation count
     gen_count = st.number_input("생성할 게시글 수", min_value=1, max_value=100, value=1)
+    use_failover = st.checkbox(
+        "느리거나 장애 시 다른 모델로 자동 전환",
+        value=bool(openai_key and google_key),
+        disabled=not (openai_key and google_key),
+        help="응답 시작이 평소(p95)보다 늦으면 다른 모델에도 요청해 먼저 시작한 답을 쓰고, 오류가 이어지는 모델은 잠시 사용하지 않습니다. 두 API 키가 모두 필요합니다.",
+    )
     
     if st.button("생성 및 시트에 저장", type="primary"):
         if not prompt:
@@ -77,36 +177,89 @@ with tab1:
             try:
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                live_preview = st.empty()
                 
-                # Initialize Generator Session
-                generator = ContentGenerator(model=model)
+                # New conversation on the cached SDK client(s)
+                generator = _failover_generator(model) if use_failover else _generator(model)
                 
-                for i in range(gen_count):
-                    status_text.text(f"[{i+1}/{gen_count}] 콘텐츠 생성 중...")
-                    
-                    # First iteration: Use user prompt
-                    # Subsequent: Use "continue" prompt
-                    current_prompt = prompt if i == 0 else "위의 지침에 따라 새로운 게시글을 하나 더 작성해줘. (이전과 겹치지 않게)"
-                    
-                    with st.spinner(f"{model}로 {i+1}번째 콘텐츠 생성 중..."):
-                        generated_text = generator.generate(current_prompt)
-                    
-                    # Show preview of the last generated text
-                    if i == gen_count - 1:
-                        st.text_area(f"마지막 생성된 텍스트 ({i+1}/{gen_count})", value=generated_text, height=150)
-                    
-                    status_text.text(f"[{i+1}/{gen_count}] 구글 시트에 저장 중...")
-                    google_sheets.append_to_sheet(generated_text)
+                with google_sheets.SheetWriter() as writer:
+                    for i in range(gen_count):
+                        status_text.text(f"[{i+1}/{gen_count}] 콘텐츠 생성 중...")
+                        
+                        # First iteration: Use user prompt
+                        # Subsequent: Use "continue" prompt
+                        current_prompt = prompt if i == 0 else "위의 지침에 따라 새로운 게시글을 하나 더 작성해줘. (이전과 겹치지 않게)"
+                        
+                        # Render tokens as they arrive
+                        # A near-duplicate is regenerated within the stream; the preview then
+                        # restarts with the new attempt (stream.partial_text).
+                        with live_preview.container():
+                            caption = st.empty()
+                            body = st.empty()
+                            stream = generator.generate_stream(current_prompt)
+                            for _ in stream:
+                                if stream.regenerations:
+                                    caption.caption(f"♻️ {i+1}번째 콘텐츠가 이미 작성한 글과 비슷해 다시 생성 중... ({stream.regenerations}회)")
+                                else:
+                                    caption.caption(f"{model}로 {i+1}번째 콘텐츠 생성 중...")
+                                body.markdown(stream.partial_text)
+                        generated_text = stream.text
+                        
+                        # Show preview of the last generated text
+                        if i == gen_count - 1:
+                            live_preview.empty()
+                            st.text_area(f"마지막 생성된 텍스트 ({i+1}/{gen_count})", value=generated_text, height=150)
+                        
+                        # Rows are buffered and written in bulk with append_rows;
+                        # near-duplicates of queued/posted texts are skipped.
+                        if not writer.append(generated_text):
+                            st.warning(f"♻️ {i+1}번째 콘텐츠는 이미 작성한 글과 거의 같아 저장하지 않았습니다.")
+                        
+                        progress_bar.progress((i + 1) / gen_count)
                     
-                    progress_bar.progress((i + 1) / gen_count)
-                    time.sleep(1) # Rate limit safety
-                
+                _queue_snapshot.clear()
                 status_text.text("모든 작업 완료!")
-                st.success(f"✅ {gen_count}개의 콘텐츠가 구글 스프레드시트 A열에 저장되었습니다.")
+                st.success(f"✅ {writer.rows_written}개의 콘텐츠가 구글 스프레드시트 A열에 저장되었습니다.")
                 
             except Exception as e:
                 st.error(f"오류 발생: {e}")
 
+    with st.expander("🌙 배치 생성 (대량 보충, 최대 24시간)"):
+        st.caption("위 프롬프트로 여러 글을 한 번에 배치 API에 제출합니다. 결과는 몇 분~최대 24시간 뒤에 "
+                   "나오며 요금이 더 저렴합니다. 완료된 배치는 '결과 저장'으로 시트에 저장하거나 "
+                   "`python batch_jobs.py collect` 로 가져옵니다.")
+        batch_store = _batch_store()
+        batch_count = st.number_input("배치로 생성할 게시글 수", min_value=1, max_value=5000, value=100, key="batch_count")
+        if st.button("배치 제출"):
+            if not prompt:
+                st.warning("프롬프트를 입력해주세요.")
+            elif (model == "gpt-4o" and not openai_key) or (model == "gemini-2.5-flash" and not google_key):
+                st.error(f"{model} 사용을 위한 API 키가 필요합니다.")
+            else:
+                try:
+                    batch_id = _generator(model).submit_bulk(prompt, int(batch_count), store=batch_store)
+                    st.success(f"✅ 배치 #{batch_id} 제출 완료")
+                except Exception as e:
+                    st.error(f"배치 제출 실패: {e}")
+
+        for batch in reversed(batch_store.list_batches()[-10:]):
+            counts = batch_store.item_counts(batch["id"])
+            cols = st.columns([4, 1])
+            cols[0].write(
+                f"#{batch['id']} {batch['model']} · {batch['status']} · {batch['requested']}개 → "
+                f"저장 {counts.get(ITEM_WRITTEN, 0)} / 중복 {counts.get(ITEM_SKIPPED, 0)} / 실패 {counts.get(ITEM_FAILED, 0)}"
+                + (f" · ⚠️ {batch['error']}" if batch["error"] else "")
+            )
+            if batch["status"] not in (BATCH_COLLECTED, BATCH_FAILED) and cols[1].button("결과 저장", key=f"collect_{batch['id']}"):
+                try:
+                    counts = _generator(batch["model"]).collect_bulk(batch["id"], store=batch_store)
+                    _queue_snapshot.clear()
+                    st.success(f"✅ 배치 #{batch['id']}: {counts.get(ITEM_WRITTEN, 0)}개 저장")
+                except RuntimeError:
+                    st.info(f"⏳ 배치 #{batch['id']}는 아직 처리 중입니다.")
+                except Exception as e:
+                    st.error(f"결과 저장 실패: {e}")
+
 # --- Tab 2: Auto Translation ---
 with tab2:
     st.header("자동 번역 (Auto Translation)")
@@ -140,27 +293,38 @@ with tab2:
                     progress_bar = st.progress(0)
                     status_text = st.empty()
                     
-                    generator = ContentGenerator(model=trans_model)
+                    generator = _generator(trans_model)
                     
-                    for i, text in enumerate(contents):
-                        status_text.text(f"[{i+1}/{len(contents)}] 번역 중...")
-                        
-                        targets = []
-                        if target_lang == "영어" or target_lang == "둘 다 (영어 + 스페인어)":
-                            targets.append(("English", "영어"))
-                        if target_lang == "스페인어" or target_lang == "둘 다 (영어 + 스페인어)":
-                            targets.append(("Spanish", "스페인어"))
+                    targets = []
+                    if target_lang == "영어" or target_lang == "둘 다 (영어 + 스페인어)":
+                        targets.append(("English", "영어"))
+                    if target_lang == "스페인어" or target_lang == "둘 다 (영어 + 스페인어)":
+                        targets.append(("Spanish", "스페인어"))
+                    languages = [lang_code for lang_code, _ in targets]
+                    
+                    # Items are translated in multi-item JSON requests, chunk by chunk,
+                    # so finished chunks are saved even if a later one fails.
+                    chunk_size = 20
+                    with google_sheets.SheetWriter() as writer:
+                        for start in range(0, len(contents), chunk_size):
+                            chunk = contents[start:start + chunk_size]
+                            end = start + len(chunk)
+                            status_text.text(f"[{end}/{len(contents)}] 번역 중...")
                             
-                        for lang_code, sheet_name in targets:
-                            with st.spinner(f"[{i+1}/{len(contents)}] {lang_code}로 번역 중..."):
-                                translated = generator.translate(text, lang_code)
-                                google_sheets.append_to_sheet(translated, sheet_name=sheet_name)
+                            with st.spinner(f"[{start+1}-{end}/{len(contents)}] {', '.join(languages)}로 번역 중..."):
+                                translations = generator.translate_batch(chunk, languages)
+                            
+                            for translated in translations:
+                                for lang_code, sheet_name in targets:
+                                    writer.append(translated[lang_code], sheet_name=sheet_name)
+                            
+                            progress_bar.progress(end / len(contents))
                         
-                        progress_bar.progress((i + 1) / len(contents))
-                        time.sleep(1)
-                    
+                    _queue_snapshot.clear()
                     status_text.text("번역 완료!")
                     st.success(f"✅ {len(contents)}개의 콘텐츠 번역이 완료되었습니다.")
+                    if writer.rows_skipped:
+                        st.info(f"♻️ 이미 대기열에 있거나 게시된 번역 {writer.rows_skipped}개는 저장하지 않았습니다.")
                     
             except Exception as e:
                 st.error(f"오류 발생: {e}")
@@ -171,14 +335,122 @@ with tab3:
     st.info("구글 스프레드시트 A열의 콘텐츠를 순서대로 가져와 Threads에 게시합니다.")
     st.warning("⚠️ 주의: 자동 게시가 진행되는 동안에는 이 브라우저 탭을 닫거나 새로고침하지 마세요. (탭이 닫히면 중단됩니다)")
     
+    POST_LANG_SHEETS = {
+        "기본 (쓰레드)": ["쓰레드"],
+        "영어": ["영어"],
+        "스페인어": ["스페인어"],
+        "둘 다 (영어 + 스페인어)": ["영어", "스페인어"],
+    }
     post_lang = st.radio(
         "게시 언어 선택",
-        options=["기본 (쓰레드)", "영어", "스페인어", "둘 다 (영어 + 스페인어)"],
+        options=list(POST_LANG_SHEETS),
         horizontal=True
     )
 
     interval_minutes = st.number_input("게시 간격 (분)", min_value=1, max_value=1440, value=60, help="최소 1분, 최대 24시간(1440분)")
+    use_mirror = st.checkbox(
+        "로컬 SQLite 미러 사용",
+        value=False,
+        disabled=google_sheets.QUEUE_MODE != "cursor",
+        help="대기열을 로컬에 복제해 게시하고 변경 사항은 백그라운드에서 시트에 일괄 반영합니다. "
+             "시트 할당량 오류나 장애 중에도 게시가 계속됩니다. "
+             "(SHEETS_QUEUE_MODE=cursor 일 때만 사용할 수 있습니다)"
+    )
     
+    with st.expander("📋 대기열 미리보기"):
+        st.caption(f"선택한 언어의 대기열을 최대 {QUEUE_SNAPSHOT_TTL_SECONDS}초 간격으로 다시 불러옵니다.")
+        if st.toggle("대기열 불러오기", key="show_queue"):
+            if st.button("지금 새로고침", key="refresh_queue"):
+                _queue_snapshot.clear()
+            try:
+                snapshot = _queue_snapshot(tuple(POST_LANG_SHEETS[post_lang]))
+                for sheet_name, pending in snapshot.items():
+                    st.write(f"**{sheet_name}** · 대기 {len(pending)}개")
+                    if pending:
+                        st.dataframe([{"내용": text[:80]} for text in pending[:10]], hide_index=True)
+            except Exception as e:
+                st.error(f"대기열을 불러오지 못했습니다: {e}")
+
+    with st.expander("🗓️ 백그라운드 스케줄러 (탭을 닫아도 계속 게시)"):
+        st.caption("`python post_to_threads.py serve` 프로세스가 등록된 작업을 실행합니다. "
+                   "토큰은 스케줄러 프로세스의 LONG_LIVED_ACCESS_TOKEN 환경 변수를 사용합니다.")
+        job_store = _job_store()
+        if st.button("스케줄러에 작업 등록"):
+            job_id = job_store.add_job(POST_LANG_SHEETS[post_lang], interval_minutes * 60)
+            st.success(f"✅ 작업 #{job_id} 등록 완료")
+        
+        jobs = job_store.list_jobs()
+        if not jobs:
+            st.write("등록된 작업이 없습니다.")
+        for job in jobs:
+            next_run = time.strftime("%m-%d %H:%M", time.localtime(job["next_run"]))
+            cols = st.columns([4, 1, 1])
+            cols[0].write(
+                f"#{job['id']} **{job['name']}** · {job['status']} · "
+                f"{job['interval_seconds'] / 60:.0f}분 간격 · 다음 {next_run}"
+                + (f" · ⚠️ {job['last_error']}" if job["last_error"] else "")
+            )
+            if job["status"] == "active" and cols[1].button("일시정지", key=f"pause_{job['id']}"):
+                job_store.set_status(job["id"], "paused")
+                st.rerun()
+            if job["status"] == "paused" and cols[1].button("재개", key=f"resume_{job['id']}"):
+                job_store.set_status(job["id"], "active")
+                st.rerun()
+            if job["status"] in ("active", "paused") and cols[2].button("취소", key=f"cancel_{job['id']}"):
+                job_store.set_status(job["id"], "cancelled")
+                st.rerun()
+        
+        runs = job_store.recent_runs(limit=20)
+        if runs:
+            st.dataframe(
+                [{
+                    "작업": run["job_id"],
+                    "시트": run["sheet"],
+                    "결과": "✅" if run["ok"] else "❌",
+                    "링크": run["permalink"] or run["error"],
+                    "시각": time.strftime("%m-%d %H:%M:%S", time.localtime(run["finished_at"])),
+                } for run in runs],
+                hide_index=True,
+            )
+    
+    with st.expander("👥 멀티 계정 게시 (accounts.json)"):
+        st.caption("계정 레지스트리의 모든 계정을 한 프로세스에서 동시에 게시합니다. "
+                   "계정마다 시간당 게시 한도가 있고, 한 계정의 글은 순서대로 게시됩니다. "
+                   "`python accounts.py add` 로 계정을 등록합니다.")
+        try:
+            account_registry = load_registry()
+        except Exception as e:
+            st.error(f"계정 레지스트리를 불러오지 못했습니다: {e}")
+            account_registry = None
+        if account_registry is not None:
+            st.dataframe([{
+                "계정": account.name,
+                "토큰 변수": account.token_env,
+                "시트": ", ".join(account.sheets),
+                "시간당 한도": account.posts_per_hour,
+            } for account in account_registry], hide_index=True)
+            selected_accounts = st.multiselect(
+                "게시할 계정", options=[account.name for account in account_registry],
+                default=[account.name for account in account_registry],
+            )
+            if st.button("선택한 계정 대기열 모두 게시") and selected_accounts:
+                account_logs = []
+                account_log_area = st.empty()
+                # Workers cannot draw on the page, so logs are collected and rendered here.
+                with MultiAccountPublisher(account_registry, logger=account_logs.append) as publisher:
+                    outcome = {}
+                    worker = threading.Thread(
+                        target=lambda: outcome.update(publisher.publish_queues(selected_accounts)), daemon=True
+                    )
+                    worker.start()
+                    while worker.is_alive():
+                        account_log_area.code("\n".join(account_logs[-15:]), language="text")
+                        worker.join(timeout=1.0)
+                account_log_area.code("\n".join(account_logs[-15:]), language="text")
+                _queue_snapshot.clear()
+                st.dataframe([{"계정": name, "성공": stats["posted"], "실패": stats["failed"], "오류": stats["errors"]}
+                              for name, stats in outcome.items()], hide_index=True)
+
     if st.button("자동 게시 시작", type="primary"):
         if not threads_token:
             st.error("Threads Access Token이 필요합니다.")
@@ -199,7 +471,7 @@ with tab3:
             
             # Verify user first
             try:
-                user = me(token=threads_token)
+                user = _threads_identity(threads_token)
                 log_callback(f"로그인 확인: @{user.get('username', 'unknown')}")
             except Exception as e:
                 st.error(f"Threads 인증 실패: {e}")
@@ -208,14 +480,16 @@ with tab3:
             count = 0
             
             # Determine target sheets based on selection
-            if post_lang == "기본 (쓰레드)":
-                target_sheets = ["쓰레드"]
-            elif post_lang == "영어":
-                target_sheets = ["영어"]
-            elif post_lang == "스페인어":
-                target_sheets = ["스페인어"]
-            else: # 둘 다
-                target_sheets = ["영어", "스페인어"]
+            target_sheets = POST_LANG_SHEETS[post_lang]
+            
+            queue = google_sheets
+            if use_mirror:
+                queue = QueueMirror(sheets=target_sheets)
+                try:
+                    queue.refresh()
+                except Exception as e:
+                    log_callback(f"⚠️ 시트를 불러오지 못해 로컬 미러로 계속합니다: {e}")
+                queue.start()
             
             while True:
                 # Determine which sheet to use for this turn
@@ -223,11 +497,24 @@ with tab3:
                 current_sheet_idx = count % len(target_sheets)
                 current_sheet_name = target_sheets[current_sheet_idx]
                 
-                log_callback(f"[{current_sheet_name}] 시트에서 게시글 가져오는 중...")
-                
                 try:
+                    snapshot = None
+                    if not use_mirror:
+                        # One batched read of all target sheets per tick: the round-robin pick,
+                        # the emptiness check and the pop below all work on this snapshot.
+                        snapshot = google_sheets.queue_snapshot(target_sheets)
+                        next_sheet, skipped = snapshot.next_sheet(count, target_sheets)
+                        if next_sheet is not None:
+                            count += skipped
+                            current_sheet_name = next_sheet
+                    
+                    log_callback(f"[{current_sheet_name}] 시트에서 게시글 가져오는 중...")
+                    
                     # 1. Get content from Google Sheet
-                    text_to_post, row_index = google_sheets.pop_from_queue(sheet_name=current_sheet_name)
+                    if snapshot is not None:
+                        text_to_post, row_index = google_sheets.pop_from_queue(sheet_name=current_sheet_name, snapshot=snapshot)
+                    else:
+                        text_to_post, row_index = queue.pop_from_queue(sheet_name=current_sheet_name)
                     
                     if not text_to_post:
                         log_callback(f"⚠️ [{current_sheet_name}] 시트의 A열이 비어있습니다.")
@@ -240,19 +527,21 @@ with tab3:
                             break
                         else:
                             # Multi mode. Check if all target sheets are empty.
-                            all_target_sheets_empty = True
-                            for sheet in target_sheets:
-                                try:
-                                    ws = google_sheets.get_worksheet(sheet)
-                                    if ws.col_values(1): # Check if column A has any values
-                                        all_target_sheets_empty = False
+                            if snapshot is not None:
+                                all_target_sheets_empty = snapshot.is_empty()
+                            else:
+                                all_target_sheets_empty = True
+                                for sheet in target_sheets:
+                                    try:
+                                        if queue.has_pending(sheet): # Check if column A has any pending values
+                                            all_target_sheets_empty = False
+                                            break
+                                    except Exception as e:
+                                        log_callback(f"시트 '{sheet}' 확인 중 오류 발생: {e}")
+                                        # If we can't even check, assume it might have content or skip.
+                                        # For robustness, let's assume it's not empty if we can't check.
+                                        all_target_sheets_empty = False 
                                         break
-                                except Exception as e:
-                                    log_callback(f"시트 '{sheet}' 확인 중 오류 발생: {e}")
-                                    # If we can't even check, assume it might have content or skip.
-                                    # For robustness, let's assume it's not empty if we can't check.
-                                    all_target_sheets_empty = False 
-                                    break
                             
                             if all_target_sheets_empty:
                                 log_callback("모든 시트의 콘텐츠가 소진되었습니다. 자동 게시를 종료합니다.")
@@ -273,12 +562,13 @@ with tab3:
                         
                         if result and 'permalink' in result:
                             log_callback(f"✅ [{current_sheet_name}] 게시 성공! Link: {result['permalink']}")
+                            queue.ack_item(current_sheet_name, row_index)
                             count += 1
                         else:
-                            log_callback(f"❌ [{current_sheet_name}] 게시 실패. (시트 C열을 빨간색으로 표시합니다)")
+                            log_callback(f"❌ [{current_sheet_name}] 게시 실패. (시트에 실패로 표시합니다)")
                             # Mark as failed in Google Sheet
                             if row_index:
-                                google_sheets.mark_as_failed(current_sheet_name, row_index)
+                                queue.mark_as_failed(current_sheet_name, row_index)
                             
                             count += 1 # Still increment count to move to next sheet/language
                     
@@ -290,3 +580,6 @@ with tab3:
                     log_callback(f"❌ 오류 발생: {e}")
                     time.sleep(60) # Wait 1 min on error before retrying
 
+            if use_mirror:
+                queue.close()
+
@@ -0,0 +1,481 @@
+"""
+Asyncio publishing engine for Threads.
+
+AsyncThreadsClient runs the create → poll → publish → permalink flow on aiohttp with a
+bounded concurrency semaphore, so many posts (and many accounts) can be in flight at once.
+Containers waiting to become ready under the same token are polled together with one
+multi-ID status request per round, and permalink lookups arriving within a short window
+are resolved together the same way.
+AsyncPublisher adds per-account ordering: containers for one account are created and
+polled concurrently, but they are published in the order they were submitted.
+
+post_texts_concurrently() is a blocking wrapper for callers that are not async.
+"""
+
+import asyncio
+import random
+from collections import defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    aiohttp = None
+
+from post_to_threads import (
+    BASE,
+    DEFAULT_POLL_POLICY,
+    MAX_IDS_PER_REQUEST,
+    Logger,
+    PollPolicy,
+    ThreadsClient,
+    _emit,
+    _request_token,
+    retry_after_seconds,
+)
+from dedupe import record_posted
+from metrics import error_class, observe, record_retry
+from rate_limit import get_limiter
+
+
+def _is_transient_error(error: Exception) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError)):
+        return True
+    status = getattr(error, "status", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+class _ContainerWaiter:
+    """A container waiting for FINISHED, with its own PollPolicy schedule."""
+
+    def __init__(self, logger: Logger, policy: PollPolicy, now: float):
+        self.logger = logger
+        self.policy = policy
+        self.future = asyncio.get_running_loop().create_future()
+        self.transient_errors = 0
+        self._intervals = policy.intervals()
+        self.due = now + next(self._intervals)
+
+    def advance(self, now: float) -> bool:
+        """Schedules the next probe. Returns False once the policy deadline has passed."""
+        interval = next(self._intervals, None)
+        if interval is None:
+            return False
+        self.due = now + interval
+        return True
+
+    def resolve(self, ready: bool, message: Optional[str] = None) -> None:
+        if message:
+            _emit(message, self.logger)
+        if not self.future.done():
+            self.future.set_result(ready)
+
+
+class AsyncThreadsClient:
+    """
+    Async counterpart of post_to_threads.ThreadsClient.
+
+    Use as an async context manager so the pooled aiohttp session is closed:
+
+        async with AsyncThreadsClient(max_concurrency=20) as client:
+            result = await client.post_text(user_id, text, token)
+    """
+
+    def __init__(
+        self,
+        base_url: str = BASE,
+        timeouts: Optional[dict] = None,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        max_concurrency: int = 10,
+        permalink_window: float = 0.05,
+    ):
+        if not AIOHTTP_AVAILABLE:
+            raise ImportError("aiohttp 라이브러리가 설치되지 않았습니다.")
+        self.base_url = base_url
+        self.timeouts = {**ThreadsClient.DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_concurrency = max_concurrency
+        self.permalink_window = permalink_window
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._session = None
+        # Per token: containers waiting for FINISHED, the task polling them and its wakeup event.
+        self._waiters = defaultdict(dict)
+        self._pollers = {}
+        self._wakeups = defaultdict(asyncio.Event)
+        # Per token: media IDs waiting for the next multi-ID permalink lookup, and its task.
+        self._permalink_batches = {}
+        self._permalink_tasks = {}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    async def open(self) -> None:
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self) -> None:
+        for task in [*self._pollers.values(), *self._permalink_tasks.values()]:
+            task.cancel()
+        self._pollers.clear()
+        self._permalink_tasks.clear()
+        for batch in self._permalink_batches.values():
+            for future in batch.values():
+                future.cancel()
+        self._permalink_batches.clear()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(self, method: str, path: str, endpoint: str, idempotent: bool = True, **kwargs) -> dict:
+        """Same retry rules as ThreadsClient.request; at most max_concurrency requests run at once."""
+        await self.open()
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        timeout = aiohttp.ClientTimeout(total=self.timeouts.get(endpoint, 20))
+        stage = f"threads.{endpoint}"
+
+        limiter = get_limiter("threads", key=_request_token(kwargs))
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt >= self.max_retries
+            await limiter.acquire_async()
+            try:
+                async with self._semaphore:
+                    start = asyncio.get_running_loop().time()
+                    async with self._session.request(method, url, timeout=timeout, **kwargs) as response:
+                        status = response.status
+                        headers = response.headers
+                        body = await response.text()
+                        elapsed = asyncio.get_running_loop().time() - start
+                        if status < 400:
+                            observe(stage, elapsed)
+                            limiter.on_success()
+                            return await response.json(content_type=None)
+            except aiohttp.ClientConnectorError as e:
+                # Connection could not be established, so nothing was sent.
+                observe(stage, asyncio.get_running_loop().time() - start, error_class(e))
+                if last_attempt:
+                    raise
+                record_retry(stage, error_class(e))
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                observe(stage, asyncio.get_running_loop().time() - start, error_class(e))
+                if last_attempt or not idempotent:
+                    raise
+                record_retry(stage, error_class(e))
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+
+            observe(stage, elapsed, f"HTTPError:{status}")
+            if status == 429:
+                limiter.on_throttle(retry_after_seconds(headers, self.backoff_max))
+            retryable = status == 429 or (idempotent and status >= 500)
+            if retryable and not last_attempt:
+                record_retry(stage, str(status))
+                wait = retry_after_seconds(headers, self.backoff_max)
+                await asyncio.sleep(wait if wait is not None else self._backoff(attempt))
+                continue
+
+            raise aiohttp.ClientResponseError(
+                response.request_info, response.history, status=status, message=body, headers=headers
+            )
+
+    async def me(self, token: str) -> dict:
+        return await self.request("GET", "me", "me", params={"fields": "id,username", "access_token": token})
+
+    async def create_text_container(self, user_id: str, text: str, token: str) -> str:
+        payload = {'media_type': 'TEXT', 'text': text, 'access_token': token}
+        data = await self.request("POST", f"{user_id}/threads", "create", json=payload)
+        return data['id']
+
+    async def get_container_status(self, container_id: str, token: str) -> dict:
+        params = {'fields': 'status,error_message', 'access_token': token}
+        return await self.request("GET", container_id, "status", params=params)
+
+    async def get_container_statuses(self, container_ids: List[str], token: str) -> dict:
+        """Looks up many containers in one multi-ID request. Returns {container_id: {...}}."""
+        params = {'ids': ",".join(container_ids), 'fields': 'status,error_message', 'access_token': token}
+        return await self.request("GET", "", "status", params=params)
+
+    async def wait_for_container(
+        self, container_id: str, token: str, logger: Logger = None, policy: Optional[PollPolicy] = None
+    ) -> bool:
+        """
+        Async version of post_to_threads.check_container_status, using the same PollPolicy.
+        The container joins the set polled for its token, so concurrent posts share the
+        status requests instead of polling one container each.
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        waiter = _ContainerWaiter(logger, policy or DEFAULT_POLL_POLICY, start)
+        waiters = self._waiters[token]
+        waiters[container_id] = waiter
+        poller = self._pollers.get(token)
+        if poller is None or poller.done():
+            self._pollers[token] = loop.create_task(self._poll_containers(token))
+        else:
+            self._wakeups[token].set()
+        try:
+            ready = await waiter.future
+        finally:
+            if waiters.get(container_id) is waiter:
+                del waiters[container_id]
+        observe("threads.poll", loop.time() - start, None if ready else "NotReady")
+        return ready
+
+    async def _poll_containers(self, token: str) -> None:
+        """Polls every waiting container of a token until none is left."""
+        loop = asyncio.get_running_loop()
+        waiters = self._waiters[token]
+        wakeup = self._wakeups[token]
+
+        while waiters:
+            delay = min(waiter.due for waiter in waiters.values()) - loop.time()
+            if delay > 0:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Everything waiting is probed in the same round: the extra IDs cost nothing.
+            polled = dict(waiters)
+            ids = list(polled)
+            try:
+                statuses = {}
+                for offset in range(0, len(ids), MAX_IDS_PER_REQUEST):
+                    statuses.update(await self.get_container_statuses(ids[offset:offset + MAX_IDS_PER_REQUEST], token))
+            except Exception as e:
+                now = loop.time()
+                for waiter in polled.values():
+                    if not _is_transient_error(e) or waiter.transient_errors >= waiter.policy.max_transient_errors:
+                        waiter.resolve(False, f"❌ 상태 확인 실패: {e}")
+                        continue
+                    waiter.transient_errors += 1
+                    _emit(f"⚠️ 상태 확인 중 일시적 오류: {e}", waiter.logger)
+                    if not waiter.advance(now):
+                        waiter.resolve(False, f"❌ 컨테이너 상태 확인 시간 초과 ({waiter.policy.deadline:.0f}초)")
+                continue
+
+            now = loop.time()
+            for container_id, waiter in polled.items():
+                waiter.transient_errors = 0
+                data = statuses.get(container_id) or {}
+                status = data.get('status')
+                if status == 'FINISHED':
+                    waiter.resolve(True)
+                elif status in PollPolicy.TERMINAL_STATUSES:
+                    waiter.resolve(False, f"❌ 컨테이너 상태 오류: {data.get('error_message') or status}")
+                elif waiter.advance(now):
+                    _emit(f"⏳ 컨테이너 처리 중... (Status: {status})", waiter.logger)
+                else:
+                    waiter.resolve(False, f"❌ 컨테이너 상태 확인 시간 초과 ({waiter.policy.deadline:.0f}초)")
+            # Resolved waiters are removed by wait_for_container once it resumes.
+            for container_id, waiter in polled.items():
+                if waiter.future.done() and waiters.get(container_id) is waiter:
+                    del waiters[container_id]
+
+    async def publish_container(self, user_id: str, container_id: str, token: str) -> dict:
+        payload = {'creation_id': container_id, 'access_token': token}
+        return await self.request("POST", f"{user_id}/threads_publish", "publish", idempotent=False, data=payload)
+
+    async def get_permalinks(self, media_ids: List[str], token: str) -> dict:
+        """Resolves many permalinks with multi-ID requests. Returns {media_id: permalink}."""
+        media_ids = list(dict.fromkeys(media_ids))
+        permalinks = {}
+        for offset in range(0, len(media_ids), MAX_IDS_PER_REQUEST):
+            chunk = media_ids[offset:offset + MAX_IDS_PER_REQUEST]
+            params = {"ids": ",".join(chunk), "fields": "permalink", "access_token": token}
+            data = await self.request("GET", "", "permalink", params=params)
+            for media_id in chunk:
+                permalinks[media_id] = (data.get(media_id) or {}).get("permalink")
+        return permalinks
+
+    async def get_permalink(self, media_id: str, token: str) -> Optional[str]:
+        """
+        Permalink of one post. Lookups made under the same token within permalink_window
+        seconds of the first one are resolved together by get_permalinks.
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._permalink_batches.get(token)
+        if batch is None:
+            batch = self._permalink_batches[token] = {}
+            self._permalink_tasks[token] = loop.create_task(self._resolve_permalinks(token))
+        if media_id not in batch:
+            batch[media_id] = loop.create_future()
+        return await asyncio.shield(batch[media_id])
+
+    async def _resolve_permalinks(self, token: str) -> None:
+        await asyncio.sleep(self.permalink_window)
+        batch = self._permalink_batches.pop(token, {})
+        self._permalink_tasks.pop(token, None)
+        try:
+            permalinks = await self.get_permalinks(list(batch), token)
+        except Exception as e:
+            for future in batch.values():
+                future.set_exception(e)
+            return
+        for media_id, future in batch.items():
+            future.set_result(permalinks.get(media_id))
+
+    async def prepare_container(self, user_id: str, text: str, token: str, logger: Logger = None) -> Optional[str]:
+        """Creates a container and waits until it is ready. Returns the container ID or None."""
+        _emit("📦 컨테이너 생성 중...", logger)
+        container_id = await self.create_text_container(user_id, text, token)
+        _emit(f"컨테이너 생성 완료 ID: {container_id}", logger)
+        if not await self.wait_for_container(container_id, token, logger):
+            _emit("❌ 컨테이너가 준비되지 않아 게시를 중단합니다.", logger)
+            return None
+        return container_id
+
+    async def finish_post(
+        self, user_id: str, container_id: str, text: str, token: str, logger: Logger = None,
+        fetch_permalink: bool = True,
+    ) -> dict:
+        """
+        Publishes a ready container and returns the same metadata as _post_text_to_threads.
+        With fetch_permalink=False the permalink is left as None (see fill_permalinks).
+        """
+        _emit("🚀 Threads에 게시 중...", logger)
+        publish_result = await self.publish_container(user_id, container_id, token)
+        media_id = publish_result.get('id')
+        record_posted(text)
+
+        permalink = None
+        if fetch_permalink:
+            _emit("🔗 Permalink 가져오는 중...", logger)
+            permalink = await self.get_permalink(media_id, token)
+        return {
+            "media_id": media_id,
+            "creation_id": container_id,
+            "permalink": permalink,
+            "text": text,
+            "user_id": user_id,
+        }
+
+    async def post_text(self, user_id: str, text: str, token: str, logger: Logger = None) -> Optional[dict]:
+        """Async version of post_to_threads._post_text_to_threads. Returns None on failure."""
+        try:
+            container_id = await self.prepare_container(user_id, text, token, logger)
+            if container_id is None:
+                return None
+            return await self.finish_post(user_id, container_id, text, token, logger)
+        except Exception as e:
+            _emit(f"❌ Threads 게시 프로세스 오류: {e}", logger)
+            return None
+
+
+class AsyncPublisher:
+    """
+    Publishes posts for many accounts concurrently.
+
+    Container creation and status polling overlap freely, but each account publishes in
+    submission order: a post waits for the previous post of the same account to be
+    published (or to fail) before calling threads_publish.
+    """
+
+    def __init__(self, client: AsyncThreadsClient):
+        self.client = client
+        self._tails = defaultdict(lambda: None)
+
+    async def publish(
+        self, user_id: str, text: str, token: str, logger: Logger = None, fetch_permalink: bool = True,
+    ) -> Optional[dict]:
+        loop = asyncio.get_running_loop()
+        previous = self._tails[user_id]
+        done = loop.create_future()
+        self._tails[user_id] = done
+
+        try:
+            try:
+                container_id = await self.client.prepare_container(user_id, text, token, logger)
+            except Exception as e:
+                _emit(f"❌ Threads 게시 프로세스 오류: {e}", logger)
+                container_id = None
+
+            if previous is not None:
+                await asyncio.shield(previous)
+            if container_id is None:
+                return None
+
+            try:
+                result = await self.client.finish_post(user_id, container_id, text, token, logger, fetch_permalink=False)
+            except Exception as e:
+                _emit(f"❌ Threads 게시 프로세스 오류: {e}", logger)
+                return None
+        finally:
+            if not done.done():
+                done.set_result(None)
+            if self._tails[user_id] is done:
+                del self._tails[user_id]
+
+        # The next post of the account does not wait for the permalink, so consecutive
+        # lookups can share one multi-ID request (see AsyncThreadsClient.get_permalink).
+        if fetch_permalink and result.get("media_id"):
+            _emit("🔗 Permalink 가져오는 중...", logger)
+            try:
+                result["permalink"] = await self.client.get_permalink(result["media_id"], token)
+            except Exception as e:
+                _emit(f"⚠️ Permalink 조회 실패: {e}", logger)
+        return result
+
+    async def publish_many(self, posts: Iterable[Tuple[str, str, str]], logger: Logger = None) -> List[Optional[dict]]:
+        """
+        Publishes (user_id, text, token) tuples; results are returned in input order.
+        Permalinks are resolved after the last post, with one multi-ID lookup per token.
+        """
+        posts = list(posts)
+        tasks = [self.publish(user_id, text, token, logger, fetch_permalink=False) for user_id, text, token in posts]
+        results = await asyncio.gather(*tasks)
+        await self.fill_permalinks(results, [token for _, _, token in posts], logger)
+        return results
+
+    async def fill_permalinks(self, results: List[Optional[dict]], tokens: List[str], logger: Logger = None) -> None:
+        """Async counterpart of post_to_threads.fill_permalinks; tokens[i] belongs to results[i]."""
+        missing = defaultdict(list)
+        for result, token in zip(results, tokens):
+            if result and result.get("media_id") and not result.get("permalink"):
+                missing[token].append(result)
+        if not missing:
+            return
+        _emit(f"🔗 Permalink {sum(len(r) for r in missing.values())}개 일괄 조회 중...", logger)
+        for token, pending in missing.items():
+            try:
+                permalinks = await self.client.get_permalinks([r["media_id"] for r in pending], token)
+            except Exception as e:
+                _emit(f"⚠️ Permalink 일괄 조회 실패: {e}", logger)
+                continue
+            for result in pending:
+                result["permalink"] = permalinks.get(result["media_id"])
+
+
+def post_texts_concurrently(
+    posts: Iterable[Tuple[str, str, str]],
+    max_concurrency: int = 10,
+    logger: Logger = None,
+) -> List[Optional[dict]]:
+    """
+    Blocking wrapper: publishes (user_id, text, token) tuples through the async engine.
+    Each result has the same shape as _post_text_to_threads (None for failed posts).
+    """
+    async def _run():
+        async with AsyncThreadsClient(max_concurrency=max_concurrency) as client:
+            return await AsyncPublisher(client).publish_many(posts, logger)
+
+    return asyncio.run(_run())